@@ -0,0 +1 @@
+"""Benchmark and load-test the API against local stand-ins for the model providers."""
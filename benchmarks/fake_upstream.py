@@ -0,0 +1,416 @@
+"""Provides a local stand-in for the OpenAI chat completions and Bedrock runtime APIs."""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import struct
+import time
+import zlib
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass(frozen=True)
+class UpstreamProfile:
+    """
+    How a stand-in model provider behaves.
+
+    Attributes
+        latency_median_seconds (float): Median time taken to answer a call.
+        latency_sigma (float): Shape of the log-normal latency distribution. Larger
+            values give a longer tail, and 0 makes every call take the median time.
+        error_rate (float): Fraction of calls failing with a server error.
+        malformed_rate (float): Fraction of calls answered with output that cannot
+            be parsed as the prompt asks.
+    """
+
+    latency_median_seconds: float = 1.0
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """
+        Draw the latency of a call.
+
+        Args:
+            rng (random.Random): Random number generator.
+
+        Returns:
+            float: Seconds the call takes.
+        """
+        if self.latency_median_seconds <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(self.latency_median_seconds), self.latency_sigma)
+
+
+def model_output(user_search: str) -> dict[str, Any]:
+    """
+    Build a well-formed model response for a search.
+
+    Args:
+        user_search (str): User's search as a string.
+
+    Returns:
+        dict[str, Any]: Entities and connections as the prompts ask for them.
+    """
+    entities = [
+        {
+            "uri": f"{user_search} {index}",
+            "description": f"Entity {index} related to {user_search}.",
+            "wikipedia_url": f"https://en.wikipedia.org/wiki/Entity_{index}",
+        }
+        for index in range(5)
+    ]
+    connections = [
+        {"from": entities[0]["uri"], "to": entity["uri"], "description": "Related."}
+        for entity in entities[1:]
+    ]
+    return {"entities": entities, "connections": connections}
+
+
+def last_user_text(text: str) -> str:
+    """
+    Return the user's search from the end of a rendered prompt.
+
+    Args:
+        text (str): Rendered prompt or last message.
+
+    Returns:
+        str: Text between the last `Human:` marker and any `Assistant:` marker after it.
+    """
+    return text.rsplit("Human:", 1)[-1].split("Assistant:", 1)[0].strip()
+
+
+def encode_event(payload: dict[str, Any]) -> bytes:
+    """
+    Encode a Bedrock response stream chunk in the AWS event stream format.
+
+    Args:
+        payload (dict[str, Any]): Chunk of model output.
+
+    Returns:
+        bytes: Event stream message carrying the chunk.
+    """
+    headers = b""
+    for name, value in (
+        (":event-type", "chunk"),
+        (":content-type", "application/json"),
+        (":message-type", "event"),
+    ):
+        encoded_name, encoded_value = name.encode(), value.encode()
+        headers += struct.pack("!B", len(encoded_name)) + encoded_name
+        headers += struct.pack("!BH", 7, len(encoded_value)) + encoded_value
+    body = json.dumps({"bytes": base64.b64encode(json.dumps(payload).encode()).decode()}).encode()
+    prelude = struct.pack("!II", 16 + len(headers) + len(body), len(headers))
+    message = prelude + struct.pack("!I", zlib.crc32(prelude)) + headers + body
+    return message + struct.pack("!I", zlib.crc32(message))
+
+
+def split_text(text: str, chunk_size: int = 32) -> Iterator[str]:
+    """
+    Split model output into the pieces it is streamed in.
+
+    Args:
+        text (str): Model output.
+        chunk_size (int, optional): Characters per piece. Defaults to 32.
+
+    Yields:
+        str: Consecutive pieces of the output.
+    """
+    for start in range(0, len(text), chunk_size):
+        yield text[start : start + chunk_size]
+
+
+class FakeUpstream:
+    """Answer model calls according to a profile for each provider."""
+
+    def __init__(
+        self, openai: UpstreamProfile, bedrock: UpstreamProfile, seed: int | None = None
+    ) -> None:
+        """
+        Class constructor.
+
+        Args:
+            openai (UpstreamProfile): Behaviour of the OpenAI stand-in.
+            bedrock (UpstreamProfile): Behaviour of the Bedrock stand-in.
+            seed (int | None, optional): Seed for reproducible latencies and failures.
+                Defaults to None.
+        """
+        self.openai = openai
+        self.bedrock = bedrock
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def outcome(self, profile: UpstreamProfile) -> str:
+        """
+        Wait for a call's latency, then decide how it is answered.
+
+        Args:
+            profile (UpstreamProfile): Behaviour of the provider called.
+
+        Returns:
+            str: One of "error", "malformed" or "ok".
+        """
+        self.calls += 1
+        await asyncio.sleep(profile.sample_latency(self._rng))
+        draw = self._rng.random()
+        if draw < profile.error_rate:
+            return "error"
+        if draw < profile.error_rate + profile.malformed_rate:
+            return "malformed"
+        return "ok"
+
+    async def chat_completions(self, request: Request) -> Response:
+        """
+        Answer an OpenAI chat completions call.
+
+        Args:
+            request (Request): Chat completions request.
+
+        Returns:
+            Response: Chat completion, streamed as Server-Sent Events if requested.
+        """
+        body = await request.json()
+        outcome = await self.outcome(self.openai)
+        if outcome == "error":
+            return JSONResponse(
+                {"error": {"message": "Stand-in server error.", "type": "server_error"}},
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        user_search = last_user_text(str(body["messages"][-1]["content"]))
+        content = json.dumps(model_output(user_search))
+        if outcome == "malformed":
+            content = "Sure! Here are the entities: " + content[: len(content) // 2]
+        if body.get("stream"):
+            return StreamingResponse(
+                self._stream_chat(body["model"], content), media_type="text/event-stream"
+            )
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-{self.calls}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    async def _stream_chat(self, model: str, content: str) -> AsyncIterator[str]:
+        for piece in split_text(content):
+            chunk = {
+                "id": f"chatcmpl-{self.calls}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"content": piece},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    async def invoke(self, model_id: str, request: Request) -> Response:  # noqa: ARG002
+        """
+        Answer a Bedrock runtime invoke call to an Anthropic model.
+
+        Args:
+            model_id (str): Model called.
+            request (Request): Invoke request, in the text completions or messages format.
+
+        Returns:
+            Response: Model response in the format of the request.
+        """
+        body = json.loads(await request.body())
+        outcome = await self.outcome(self.bedrock)
+        if outcome == "error":
+            return self._bedrock_error()
+        text = self._bedrock_text(body, outcome)
+        if "messages" in body:
+            return JSONResponse(
+                {
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [{"type": "text", "text": text}],
+                    "stop_reason": "end_turn",
+                }
+            )
+        return JSONResponse({"completion": text, "stop_reason": "stop_sequence"})
+
+    async def invoke_with_response_stream(
+        self,
+        model_id: str,  # noqa: ARG002
+        request: Request,
+    ) -> Response:
+        """
+        Answer a Bedrock runtime streaming invoke call to an Anthropic model.
+
+        LangChain makes every asynchronous Bedrock call through this API.
+
+        Args:
+            model_id (str): Model called.
+            request (Request): Invoke request, in the text completions or messages format.
+
+        Returns:
+            Response: Model response in the format of the request, as an event stream.
+        """
+        body = json.loads(await request.body())
+        outcome = await self.outcome(self.bedrock)
+        if outcome == "error":
+            return self._bedrock_error()
+        text = self._bedrock_text(body, outcome)
+        if "messages" in body:
+            chunks = [
+                {
+                    "type": "content_block_delta",
+                    "index": 0,
+                    "delta": {"type": "text_delta", "text": piece},
+                }
+                for piece in split_text(text)
+            ]
+            chunks.append({"type": "message_stop"})
+        else:
+            chunks = [{"completion": piece, "stop_reason": None} for piece in split_text(text)]
+            chunks.append({"completion": "", "stop_reason": "stop_sequence"})
+        return Response(
+            b"".join(encode_event(chunk) for chunk in chunks),
+            media_type="application/vnd.amazon.eventstream",
+        )
+
+    @staticmethod
+    def _bedrock_error() -> Response:
+        return JSONResponse(
+            {"message": "Stand-in server error."},
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            headers={"x-amzn-ErrorType": "InternalServerException"},
+        )
+
+    @staticmethod
+    def _bedrock_text(body: dict[str, Any], outcome: str) -> str:
+        if "messages" in body:
+            prompt = str(body["messages"][-1]["content"])
+        else:
+            prompt = body.get("prompt", "")
+        content = json.dumps(model_output(last_user_text(prompt)))
+        if outcome == "malformed":
+            return f"Here is the JSON: {content}"
+        return f"Here is the JSON:\n```json\n{content}\n```"
+
+
+def build_app(upstream: FakeUpstream) -> FastAPI:
+    """
+    Create an application serving the stand-in APIs.
+
+    OpenAI calls are served under `/v1` and Bedrock calls at the root, so the
+    API can be pointed here with `LLM_API_OPENAI_BASE_URL=<url>/v1` and
+    `LLM_API_AWS_BEDROCK_ENDPOINT_URL=<url>`.
+
+    Args:
+        upstream (FakeUpstream): Stand-in answering calls.
+
+    Returns:
+        FastAPI: Stand-in application.
+    """
+    app = FastAPI(title="Model provider stand-in")
+    app.add_api_route("/v1/chat/completions", upstream.chat_completions, methods=["POST"])
+    app.add_api_route("/model/{model_id}/invoke", upstream.invoke, methods=["POST"])
+    app.add_api_route(
+        "/model/{model_id}/invoke-with-response-stream",
+        upstream.invoke_with_response_stream,
+        methods=["POST"],
+    )
+    return app
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser, provider: str) -> None:
+    """
+    Add options describing a provider's behaviour to a command line parser.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to add options to.
+        provider (str): Provider name, used as the options' prefix.
+    """
+    defaults = UpstreamProfile()
+    parser.add_argument(
+        f"--{provider}-latency-median",
+        type=float,
+        default=defaults.latency_median_seconds,
+        help="Median latency in seconds.",
+    )
+    parser.add_argument(
+        f"--{provider}-latency-sigma",
+        type=float,
+        default=defaults.latency_sigma,
+        help="Log-normal latency shape.",
+    )
+    parser.add_argument(
+        f"--{provider}-error-rate",
+        type=float,
+        default=defaults.error_rate,
+        help="Fraction of calls failing.",
+    )
+    parser.add_argument(
+        f"--{provider}-malformed-rate",
+        type=float,
+        default=defaults.malformed_rate,
+        help="Fraction of calls answered with unparsable output.",
+    )
+
+
+def profile_from_arguments(arguments: argparse.Namespace, provider: str) -> UpstreamProfile:
+    """
+    Build a provider's profile from parsed command line options.
+
+    Args:
+        arguments (argparse.Namespace): Parsed options.
+        provider (str): Provider name, used as the options' prefix.
+
+    Returns:
+        UpstreamProfile: Behaviour of the provider.
+    """
+    options = vars(arguments)
+    return UpstreamProfile(
+        latency_median_seconds=options[f"{provider}_latency_median"],
+        latency_sigma=options[f"{provider}_latency_sigma"],
+        error_rate=options[f"{provider}_error_rate"],
+        malformed_rate=options[f"{provider}_malformed_rate"],
+    )
+
+
+def main() -> None:
+    """Serve the stand-in APIs."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--seed", type=int, default=None)
+    for provider in ("openai", "bedrock"):
+        add_profile_arguments(parser, provider)
+    arguments = parser.parse_args()
+    upstream = FakeUpstream(
+        profile_from_arguments(arguments, "openai"),
+        profile_from_arguments(arguments, "bedrock"),
+        seed=arguments.seed,
+    )
+    uvicorn.run(build_app(upstream), host=arguments.host, port=arguments.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
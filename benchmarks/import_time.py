@@ -0,0 +1,159 @@
+"""
+Measure how long importing the API takes, using Python's `-X importtime`.
+
+Imports `llm_api.main` in fresh interpreters and reports the median total import
+time and the modules taking longest, including everything they import. Exits with
+an error if the median exceeds `--max-seconds`, or if any of the `--forbid`
+modules, by default the provider SDKs loaded on first use, were imported.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import NamedTuple
+
+LAZY_MODULES = ("openai", "langchain_openai", "langchain_aws", "boto3", "botocore")
+
+
+class ImportTime(NamedTuple):
+    """
+    Time taken to import one module, as reported by `-X importtime`.
+
+    Attributes
+        module (str): Fully qualified module name.
+        self_us (int): Microseconds spent in the module itself.
+        cumulative_us (int): Microseconds including the modules it imported.
+    """
+
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> list[ImportTime]:
+    """
+    Parse the lines written to stderr by `-X importtime`.
+
+    Args:
+        output (str): Captured stderr.
+
+    Returns:
+        list[ImportTime]: Time taken by each imported module, in import order.
+    """
+    times = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            continue
+        times.append(ImportTime(module.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def measure(module: str) -> list[ImportTime]:
+    """
+    Import a module in a fresh interpreter and return the time taken by every import.
+
+    Args:
+        module (str): Module to import.
+
+    Raises:
+        subprocess.CalledProcessError: If the import fails.
+
+    Returns:
+        list[ImportTime]: Time taken by each imported module, in import order.
+    """
+    # Only ever runs this interpreter, on a module named by the benchmark's own caller.
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    completed = subprocess.run(command, capture_output=True, text=True, check=True)  # noqa: S603
+    return parse_importtime(completed.stderr)
+
+
+def median_seconds(runs: list[list[ImportTime]], module: str) -> float:
+    """
+    Return the median time taken to import a module, including everything it imports.
+
+    Args:
+        runs (list[list[ImportTime]]): Import times of each run.
+        module (str): Module imported.
+
+    Returns:
+        float: Median import time in seconds.
+    """
+    return (
+        statistics.median(
+            next(time.cumulative_us for time in run if time.module == module) for run in runs
+        )
+        / 1e6
+    )
+
+
+def report(runs: list[list[ImportTime]], module: str, top: int, *, as_json: bool) -> str:
+    """
+    Format the import times of several runs.
+
+    Args:
+        runs (list[list[ImportTime]]): Import times of each run.
+        module (str): Module imported.
+        top (int): Number of slowest modules to list.
+        as_json (bool): Format as JSON instead of text.
+
+    Returns:
+        str: Formatted report.
+    """
+    slowest = sorted(runs[-1], key=lambda time: time.cumulative_us, reverse=True)[1 : top + 1]
+    summary = {
+        "module": module,
+        "median_seconds": median_seconds(runs, module),
+        "slowest": {time.module: time.cumulative_us / 1e6 for time in slowest},
+    }
+    if as_json:
+        return json.dumps(summary, indent=2)
+    lines = [f"import {module}: {summary['median_seconds'] * 1000:.0f} ms median"]
+    lines.extend(
+        f"  {seconds * 1000:>8.1f} ms  {name}" for name, seconds in summary["slowest"].items()
+    )
+    return "\n".join(lines)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line options.
+
+    Returns
+        argparse.Namespace: Parsed options.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--module", default="llm_api.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list.")
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--forbid", nargs="*", default=list(LAZY_MODULES))
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Measure import time, print the report and fail on regressions."""
+    arguments = parse_arguments()
+    runs = [measure(arguments.module) for _ in range(arguments.runs)]
+    print(report(runs, arguments.module, arguments.top, as_json=arguments.json))  # noqa: T201
+    imported = {time.module for time in runs[-1]}
+    failures = [
+        f"{arguments.module} imports {forbidden}, which should load on first use."
+        for forbidden in arguments.forbid
+        if forbidden in imported
+    ]
+    median = median_seconds(runs, arguments.module)
+    if arguments.max_seconds is not None and median > arguments.max_seconds:
+        failures.append(f"Median import time {median:.2f}s exceeds {arguments.max_seconds:.2f}s.")
+    if failures:
+        sys.exit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
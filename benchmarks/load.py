@@ -0,0 +1,126 @@
+"""Provides a closed-loop load generator reporting throughput and latency percentiles."""
+import asyncio
+import math
+import time
+from collections import Counter
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+import httpx
+
+
+def percentile(sorted_values: Sequence[float], quantile: float) -> float:
+    """
+    Return a percentile of sorted values by the nearest-rank method.
+
+    Args:
+        sorted_values (Sequence[float]): Values in ascending order.
+        quantile (float): Quantile between 0 and 1, e.g. 0.99 for p99.
+
+    Returns:
+        float: The percentile, or NaN if there are no values.
+    """
+    if not sorted_values:
+        return math.nan
+    rank = max(math.ceil(quantile * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class LoadResult:
+    """
+    Outcome of a load test.
+
+    Attributes
+        latencies (list[float]): Seconds taken by each request, in completion order.
+        statuses (Counter[str]): Number of responses with each HTTP status code, or
+            with the name of the error raised if no response arrived.
+        duration_seconds (float): Wall clock time taken by the whole test.
+    """
+
+    latencies: list[float] = field(default_factory=list)
+    statuses: Counter[str] = field(default_factory=Counter)
+    duration_seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+        Return the number of requests completed per second.
+
+        Returns
+            float: Requests per second.
+        """
+        if self.duration_seconds == 0:
+            return 0.0
+        return len(self.latencies) / self.duration_seconds
+
+    def summary(self) -> dict[str, float | dict[str, int]]:
+        """
+        Summarise the test's throughput, latency percentiles and response statuses.
+
+        Returns
+            dict[str, float | dict[str, int]]: Request count, throughput in requests per
+                second, p50, p95 and p99 latency in seconds, and status counts.
+        """
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "throughput": self.throughput,
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "statuses": dict(self.statuses),
+        }
+
+
+async def run_load(  # noqa: PLR0913
+    client: httpx.AsyncClient,
+    path: str,
+    searches: Sequence[str],
+    *,
+    concurrency: int,
+    requests: int,
+    bypass_cache: bool = True,
+) -> LoadResult:
+    """
+    Send requests from a fixed number of concurrent clients until a total is reached.
+
+    Each client sends its next request as soon as its previous one completes, so
+    the number of requests in flight stays at the target concurrency.
+
+    Args:
+        client (httpx.AsyncClient): Client sending requests to the API.
+        path (str): Route requests are posted to, e.g. "/call_model_openai".
+        searches (Sequence[str]): User searches, sent in turn.
+        concurrency (int): Number of requests kept in flight.
+        requests (int): Total number of requests to send.
+        bypass_cache (bool, optional): Send `X-Cache-Bypass: true`, so every request
+            reaches the model. Defaults to True.
+
+    Returns:
+        LoadResult: Latency and status of every request.
+    """
+    result = LoadResult()
+    headers = {"X-Cache-Bypass": "true"} if bypass_cache else {}
+    next_request = 0
+
+    async def send_requests() -> None:
+        nonlocal next_request
+        while next_request < requests:
+            user_search = searches[next_request % len(searches)]
+            next_request += 1
+            start_time = time.perf_counter()
+            try:
+                response = await client.post(
+                    path, json={"user_search": user_search}, headers=headers
+                )
+                status = str(response.status_code)
+            except httpx.HTTPError as http_error:
+                status = type(http_error).__name__
+            result.latencies.append(time.perf_counter() - start_time)
+            result.statuses[status] += 1
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(send_requests() for _ in range(concurrency)))
+    result.duration_seconds = time.perf_counter() - start_time
+    return result
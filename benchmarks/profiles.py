@@ -0,0 +1,156 @@
+"""
+Compare the memory and throughput of the API under each Gunicorn worker profile.
+
+Serves the API under Gunicorn once per profile, drives it against the local model
+provider stand-ins and reports throughput, latency, and the resident (RSS) and
+proportional (PSS) memory of its processes. PSS splits memory shared between
+processes, such as modules preloaded by the master, among them, so its total is
+the memory the server actually uses. Memory is read from `/proc`, so is only
+reported on Linux.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+from benchmarks.run import (
+    benchmark,
+    build_parser,
+    child_pids,
+    free_port,
+    resident_bytes,
+    running,
+    server_command,
+    server_environment,
+    upstream_command,
+)
+from llm_api.config import ServerProfile
+
+
+def proportional_bytes(pid: int) -> int | None:
+    """
+    Return the proportional set size of a process, as listed in `/proc`.
+
+    Args:
+        pid (int): Process id.
+
+    Returns:
+        int | None: Proportional set size in bytes, or None where `/proc` is unavailable.
+    """
+    try:
+        rollup = Path(f"/proc/{pid}/smaps_rollup").read_text()
+    except OSError:
+        return None
+    for line in rollup.splitlines():
+        if line.startswith("Pss:"):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+def server_memory(server_pid: int) -> dict[str, float]:
+    """
+    Measure the memory used by the Gunicorn master and its workers.
+
+    Args:
+        server_pid (int): Process id of the Gunicorn master.
+
+    Returns:
+        dict[str, float]: Mean worker RSS, and total RSS and PSS of every process, in MiB.
+    """
+    workers = child_pids(server_pid)
+    worker_rss = [resident_bytes(pid) or 0 for pid in workers]
+    every_pid = [server_pid, *workers]
+    return {
+        "worker_rss_mib": sum(worker_rss) / max(len(worker_rss), 1) / 2**20,
+        "total_rss_mib": sum(resident_bytes(pid) or 0 for pid in every_pid) / 2**20,
+        "total_pss_mib": sum(proportional_bytes(pid) or 0 for pid in every_pid) / 2**20,
+    }
+
+
+def measure_profile(arguments: argparse.Namespace, profile: ServerProfile) -> dict:
+    """
+    Serve the API under a profile, load it and measure its memory while still running.
+
+    Args:
+        arguments (argparse.Namespace): Parsed command line options.
+        profile (ServerProfile): Gunicorn worker profile.
+
+    Returns:
+        dict: Profile, worker count, throughput, latency percentiles and memory use.
+    """
+    upstream_port, server_port = free_port(), free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = {
+            **server_environment(upstream_url, Path(work_dir)),
+            "LLM_API_SERVER_PROFILE": str(profile),
+        }
+        with (
+            running(upstream_command(arguments, upstream_port)),
+            running(server_command(arguments, server_port), env) as server,
+        ):
+            results, _ = asyncio.run(
+                benchmark(arguments, upstream_url, f"http://127.0.0.1:{server_port}", server.pid)
+            )
+            workers = len(child_pids(server.pid))
+            memory = server_memory(server.pid)
+    summary = results[arguments.concurrency[0]].summary()
+    return {
+        "profile": str(profile),
+        "workers": workers,
+        "throughput": summary["throughput"],
+        "p50": summary["p50"],
+        "p99": summary["p99"],
+        "statuses": summary["statuses"],
+        **memory,
+    }
+
+
+def report(rows: list[dict], *, as_json: bool) -> str:
+    """
+    Format the measurements of each profile.
+
+    Args:
+        rows (list[dict]): Measurements of each profile.
+        as_json (bool): Format as JSON instead of text.
+
+    Returns:
+        str: Formatted report.
+    """
+    if as_json:
+        return json.dumps(rows, indent=2)
+    lines = [
+        (
+            f"{'profile':<8} {'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+            f"{'RSS/worker':>10} {'total RSS':>10} {'total PSS':>10}  statuses"
+        )
+    ]
+    lines.extend(
+        f"{row['profile']:<8} {row['workers']:>7} {row['throughput']:>8.1f} "
+        f"{row['p50'] * 1000:>8.1f} {row['p99'] * 1000:>8.1f} "
+        f"{row['worker_rss_mib']:>6.1f} MiB {row['total_rss_mib']:>6.1f} MiB "
+        f"{row['total_pss_mib']:>6.1f} MiB  {row['statuses']}"
+        for row in rows
+    )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Measure each requested profile and print the report."""
+    parser = build_parser(__doc__)
+    parser.add_argument(
+        "--profiles",
+        type=ServerProfile,
+        nargs="+",
+        default=list(ServerProfile),
+        help="Profiles to measure. Defaults to all.",
+    )
+    parser.set_defaults(server="gunicorn", concurrency=[64])
+    arguments = parser.parse_args()
+    rows = [measure_profile(arguments, profile) for profile in arguments.profiles]
+    print(report(rows, as_json=arguments.json))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
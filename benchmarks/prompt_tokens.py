@@ -0,0 +1,118 @@
+"""
+Report the size of each backend's system prompt, in characters and tokens.
+
+Tokens are counted as `llm_api.tokens` counts them for rate limits and usage
+metrics: exactly for OpenAI when tiktoken's encoding is available, and estimated
+from the length of the text otherwise. Save a report with `--json` and pass it to
+`--baseline` to compare a changed prompt against it. Exits with an error if any
+prompt exceeds `--max-tokens`.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import NamedTuple
+
+from llm_api.config import Backend
+from llm_api.prompts import prompt_registry
+from llm_api.tokens import count_message_tokens, load_openai_encoding
+
+PROMPT_BACKENDS = {"openai": Backend.OPENAI, "bedrock": Backend.BEDROCK}
+
+
+class PromptSize(NamedTuple):
+    """
+    Size of a prompt's system messages.
+
+    Attributes
+        messages (int): Number of system messages.
+        chars (int): Characters in the system messages.
+        tokens (int): Tokens in the system messages, with the markers around each.
+    """
+
+    messages: int
+    chars: int
+    tokens: int
+
+
+def measure() -> dict[str, PromptSize]:
+    """
+    Measure the system messages of each backend's prompt.
+
+    Returns
+        dict[str, PromptSize]: Prompt sizes keyed by prompt name.
+    """
+    sizes = {}
+    for name, backend in PROMPT_BACKENDS.items():
+        system_prefix = prompt_registry.get(name).system_prefix
+        sizes[name] = PromptSize(
+            messages=len(system_prefix),
+            chars=sum(len(str(message.content)) for message in system_prefix),
+            tokens=count_message_tokens(system_prefix, backend),
+        )
+    return sizes
+
+
+def report(
+    sizes: dict[str, PromptSize], baseline: dict[str, PromptSize] | None, *, as_json: bool
+) -> str:
+    """
+    Format prompt sizes, with the change from a baseline if given.
+
+    Args:
+        sizes (dict[str, PromptSize]): Prompt sizes keyed by prompt name.
+        baseline (dict[str, PromptSize] | None): Earlier prompt sizes to compare with.
+        as_json (bool): Format as JSON instead of text.
+
+    Returns:
+        str: Formatted report.
+    """
+    if as_json:
+        return json.dumps({name: size._asdict() for name, size in sizes.items()}, indent=2)
+    lines = [f"{'prompt':<10}{'messages':>10}{'chars':>8}{'tokens':>8}{'change':>9}"]
+    for name, size in sizes.items():
+        line = f"{name:<10}{size.messages:>10}{size.chars:>8}{size.tokens:>8}"
+        if baseline is not None and name in baseline:
+            before = baseline[name].tokens
+            line += f"{(size.tokens - before) / before:>+9.0%}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line options.
+
+    Returns
+        argparse.Namespace: Parsed options.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--baseline", type=Path, default=None, help="Report saved with --json.")
+    parser.add_argument("--max-tokens", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Measure the prompts, print the report and fail if any is too long."""
+    arguments = parse_arguments()
+    load_openai_encoding()
+    sizes = measure()
+    baseline = None
+    if arguments.baseline is not None:
+        saved = json.loads(arguments.baseline.read_text())
+        baseline = {name: PromptSize(**size) for name, size in saved.items()}
+    print(report(sizes, baseline, as_json=arguments.json))  # noqa: T201
+    failures = [
+        f"The {name} prompt is {size.tokens} tokens, more than {arguments.max_tokens}."
+        for name, size in sizes.items()
+        if arguments.max_tokens is not None and size.tokens > arguments.max_tokens
+    ]
+    if failures:
+        sys.exit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""
+Benchmark the API under Uvicorn or Gunicorn against local model provider stand-ins.
+
+Starts the stand-in providers and the API in their own processes, drives the API
+at one or more target concurrencies and reports throughput, latency percentiles and
+the peak memory of each API worker. Sweeping several concurrencies shows how far each
+worker scales before latency climbs. Memory is read from `/proc`, so is only reported
+on Linux.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_upstream import add_profile_arguments
+from benchmarks.load import LoadResult, run_load
+
+SEARCHES = (
+    "imagery in macbeth",
+    "causes of the french revolution",
+    "history of the printing press",
+    "impressionist painters in paris",
+    "origins of jazz in new orleans",
+)
+# Seconds to wait for the stand-in providers and the API to start answering.
+READY_TIMEOUT_SECONDS = 30.0
+
+
+def free_port() -> int:
+    """
+    Find a local TCP port that is not in use.
+
+    Returns
+        int: Port number.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def child_pids(pid: int) -> list[int]:
+    """
+    Return the processes started by a process, as listed in `/proc`.
+
+    Args:
+        pid (int): Parent process id.
+
+    Returns:
+        list[int]: Child process ids, or an empty list where `/proc` is unavailable.
+    """
+    children_file = Path(f"/proc/{pid}/task/{pid}/children")
+    try:
+        return [int(child) for child in children_file.read_text().split()]
+    except OSError:
+        return []
+
+
+def resident_bytes(pid: int) -> int | None:
+    """
+    Return the resident memory of a process, as listed in `/proc`.
+
+    Args:
+        pid (int): Process id.
+
+    Returns:
+        int | None: Resident set size in bytes, or None where `/proc` is unavailable.
+    """
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+async def sample_worker_memory(
+    server_pid: int, peaks: dict[int, int], interval: float = 0.5
+) -> None:
+    """
+    Record the peak resident memory of each API worker until cancelled.
+
+    Workers are the server's child processes, or the server itself if it has none.
+
+    Args:
+        server_pid (int): Process id of the API server.
+        peaks (dict[int, int]): Peak resident bytes keyed by worker process id, updated
+            in place.
+        interval (float, optional): Seconds between samples. Defaults to 0.5.
+    """
+    while True:
+        for pid in child_pids(server_pid) or [server_pid]:
+            rss = resident_bytes(pid)
+            if rss is not None:
+                peaks[pid] = max(peaks.get(pid, 0), rss)
+        await asyncio.sleep(interval)
+
+
+def server_command(arguments: argparse.Namespace, port: int) -> list[str]:
+    """
+    Build the command starting the API.
+
+    Args:
+        arguments (argparse.Namespace): Parsed command line options.
+        port (int): Port to serve on.
+
+    Returns:
+        list[str]: Command line.
+    """
+    if arguments.server == "gunicorn":
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config=python:llm_api.gunicorn_conf",
+            f"--bind=127.0.0.1:{port}",
+            "llm_api.main:app",
+        ]
+        if arguments.workers is not None:
+            command.insert(-1, f"--workers={arguments.workers}")
+        return command
+    return [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "llm_api.main:app",
+        "--host=127.0.0.1",
+        f"--port={port}",
+        f"--workers={arguments.workers or 1}",
+        "--log-level=warning",
+    ]
+
+
+def upstream_command(arguments: argparse.Namespace, port: int) -> list[str]:
+    """
+    Build the command starting the stand-in providers.
+
+    Args:
+        arguments (argparse.Namespace): Parsed command line options.
+        port (int): Port to serve on.
+
+    Returns:
+        list[str]: Command line.
+    """
+    command = [sys.executable, "-m", "benchmarks.fake_upstream", f"--port={port}"]
+    for option, value in vars(arguments).items():
+        if option.startswith(("openai_", "bedrock_")):
+            command.append(f"--{option.replace('_', '-')}={value}")
+    if arguments.seed is not None:
+        command.append(f"--seed={arguments.seed}")
+    return command
+
+
+def server_environment(upstream_url: str, work_dir: Path) -> dict[str, str]:
+    """
+    Build the environment pointing the API at the stand-in providers.
+
+    Fake credentials are used, and every file the API shares between workers is
+    kept in a scratch directory, so runs do not affect each other.
+
+    Args:
+        upstream_url (str): Base URL of the stand-in providers.
+        work_dir (Path): Scratch directory for the run.
+
+    Returns:
+        dict[str, str]: Environment variables for the API process.
+    """
+    metrics_dir = work_dir / "metrics"
+    metrics_dir.mkdir()
+    return {
+        **os.environ,
+        "LLM_API_OPENAI_API_KEY": "benchmark-key",
+        "LLM_API_OPENAI_LLM_NAME": "gpt-4-1106-preview",
+        "LLM_API_OPENAI_BASE_URL": f"{upstream_url}/v1",
+        "LLM_API_AWS_ACCESS_KEY_ID": "benchmark-access-key-id",
+        "LLM_API_AWS_SECRET_ACCESS_KEY": "benchmark-secret-access-key",
+        "LLM_API_AWS_BEDROCK_MODEL_ID": "anthropic.claude-v2",
+        "LLM_API_AWS_BEDROCK_ENDPOINT_URL": upstream_url,
+        "LLM_API_SHARED_CACHE_PATH": str(work_dir / "cache.sqlite3"),
+        "LLM_API_RATE_LIMIT_PATH": str(work_dir / "ratelimit.sqlite3"),
+        "PROMETHEUS_MULTIPROC_DIR": str(metrics_dir),
+    }
+
+
+@contextlib.contextmanager
+def running(command: list[str], env: dict[str, str] | None = None) -> Iterator[subprocess.Popen]:
+    """
+    Run a command in the background for the duration of a block.
+
+    Args:
+        command (list[str]): Command line.
+        env (dict[str, str] | None, optional): Environment variables. Defaults to None,
+            for the current environment.
+
+    Yields:
+        subprocess.Popen: The running process, terminated when the block exits.
+    """
+    process = subprocess.Popen(command, env=env)  # noqa: S603
+    try:
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def wait_until_ready(client: httpx.AsyncClient, path: str) -> None:
+    """
+    Wait for a server to answer requests.
+
+    Polls until the server answers, so bound the wait with `asyncio.timeout`.
+
+    Args:
+        client (httpx.AsyncClient): Client for the server.
+        path (str): Route to poll.
+    """
+    while True:
+        with contextlib.suppress(httpx.HTTPError):
+            await client.get(path)
+            return
+        await asyncio.sleep(0.2)
+
+
+async def benchmark(
+    arguments: argparse.Namespace, upstream_url: str, server_url: str, server_pid: int
+) -> tuple[dict[int, LoadResult], dict[int, int]]:
+    """
+    Warm up the API, then drive it at each target concurrency while sampling memory.
+
+    Args:
+        arguments (argparse.Namespace): Parsed command line options.
+        upstream_url (str): Base URL of the stand-in providers.
+        server_url (str): Base URL of the API.
+        server_pid (int): Process id of the API server.
+
+    Returns:
+        tuple[dict[int, LoadResult], dict[int, int]]: Load test outcome keyed by
+            concurrency, and the peak resident bytes of each worker.
+    """
+    searches = [f"{search} {index}" for index in range(100) for search in SEARCHES]
+    async with (
+        httpx.AsyncClient(base_url=upstream_url) as upstream_client,
+        asyncio.timeout(READY_TIMEOUT_SECONDS),
+    ):
+        await wait_until_ready(upstream_client, "/docs")
+    limits = httpx.Limits(max_connections=max(arguments.concurrency))
+    results: dict[int, LoadResult] = {}
+    async with httpx.AsyncClient(
+        base_url=server_url, limits=limits, timeout=arguments.timeout
+    ) as client:
+        async with asyncio.timeout(READY_TIMEOUT_SECONDS):
+            await wait_until_ready(client, "/ping")
+        await run_load(
+            client,
+            arguments.path,
+            searches,
+            concurrency=arguments.concurrency[0],
+            requests=arguments.warmup,
+            bypass_cache=not arguments.cache,
+        )
+        peaks: dict[int, int] = {}
+        sampler = asyncio.create_task(sample_worker_memory(server_pid, peaks))
+        try:
+            for concurrency in arguments.concurrency:
+                results[concurrency] = await run_load(
+                    client,
+                    arguments.path,
+                    searches,
+                    concurrency=concurrency,
+                    requests=arguments.requests,
+                    bypass_cache=not arguments.cache,
+                )
+        finally:
+            sampler.cancel()
+    return results, peaks
+
+
+def report(
+    results: dict[int, LoadResult], peaks: dict[int, int], workers: int, *, as_json: bool
+) -> str:
+    """
+    Format the outcome of a benchmark.
+
+    Args:
+        results (dict[int, LoadResult]): Load test outcome keyed by concurrency.
+        peaks (dict[int, int]): Peak resident bytes of each worker.
+        workers (int): Number of API workers.
+        as_json (bool): Format as JSON instead of text.
+
+    Returns:
+        str: Formatted report.
+    """
+    levels = [
+        {
+            "concurrency": concurrency,
+            **result.summary(),
+            "throughput_per_worker": result.throughput / workers,
+        }
+        for concurrency, result in results.items()
+    ]
+    worker_peak_rss_mib = {str(pid): rss / 2**20 for pid, rss in sorted(peaks.items())}
+    if as_json:
+        return json.dumps({"levels": levels, "worker_peak_rss_mib": worker_peak_rss_mib}, indent=2)
+    lines = [
+        (
+            f"{'concurrency':>11} {'req/s':>8} {'req/s/worker':>12} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses"
+        )
+    ]
+    lines.extend(
+        f"{level['concurrency']:>11} {level['throughput']:>8.1f} "
+        f"{level['throughput_per_worker']:>12.1f} {level['p50'] * 1000:>8.1f} "
+        f"{level['p95'] * 1000:>8.1f} {level['p99'] * 1000:>8.1f}  {level['statuses']}"
+        for level in levels
+    )
+    lines.extend(
+        f"worker {pid:>7} {rss:.1f} MiB peak RSS" for pid, rss in worker_peak_rss_mib.items()
+    )
+    return "\n".join(lines)
+
+
+def build_parser(description: str | None = __doc__) -> argparse.ArgumentParser:
+    """
+    Build the parser of the command line options common to every benchmark.
+
+    Args:
+        description (str | None, optional): Help text. Defaults to this module's docstring.
+
+    Returns:
+        argparse.ArgumentParser: Option parser.
+    """
+    parser = argparse.ArgumentParser(
+        description=description, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--server", choices=("uvicorn", "gunicorn"), default="gunicorn")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Defaults to the Gunicorn profile's, or 1."
+    )
+    parser.add_argument("--path", default="/call_model_openai", help="Route to load.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[16],
+        help="Requests kept in flight. Give several to sweep them in turn.",
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per request, in seconds.")
+    parser.add_argument(
+        "--cache", action="store_true", help="Let the response cache answer repeated searches."
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    for provider in ("openai", "bedrock"):
+        add_profile_arguments(parser, provider)
+    parser.set_defaults(openai_latency_median=0.2, bedrock_latency_median=0.2)
+    return parser
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line options.
+
+    Returns
+        argparse.Namespace: Parsed options.
+    """
+    return build_parser().parse_args()
+
+
+def main() -> None:
+    """Run a benchmark and print its report."""
+    arguments = parse_arguments()
+    upstream_port, server_port = free_port(), free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    with (
+        tempfile.TemporaryDirectory() as work_dir,
+        running(upstream_command(arguments, upstream_port)),
+        running(
+            server_command(arguments, server_port),
+            server_environment(upstream_url, Path(work_dir)),
+        ) as server,
+    ):
+        results, peaks = asyncio.run(
+            benchmark(arguments, upstream_url, f"http://127.0.0.1:{server_port}", server.pid)
+        )
+    workers = arguments.workers or max(len(peaks), 1)
+    print(report(results, peaks, workers, as_json=arguments.json))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,50 @@
 """Provides user search processing and AWS Bedrock language model calling functionality."""
-import json
-from json.decoder import JSONDecodeError
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
 from typing import Any
 
-import boto3
-from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
+import httpx
+from botocore.exceptions import BotoCoreError, ClientError
+from langchain.prompts import ChatPromptTemplate
 from langchain.schema.exceptions import LangChainException
-from langchain.schema.messages import SystemMessage
-from langchain_aws import BedrockLLM as Bedrock
+from langchain_core.runnables import Runnable
+from pydantic import ValidationError
 
-from llm_api.config import BedrockModel, Settings
+from llm_api.backends.bedrock_runtime import AsyncBedrockLLM, BedrockRuntimeClient
+from llm_api.backends.errors import BedrockModelCallError, BedrockResponseParseError
+from llm_api.config import Backend, BedrockModel, Settings
+from llm_api.metrics import observe_stage, record_extraction, record_usage, timed
+from llm_api.parsing.extract import Extraction, JsonExtractionError, extract_json
+from llm_api.prompts import BEDROCK_PROMPT, build_reask_template
+from llm_api.schemas import validate_model_output
+from llm_api.tokens import TokenUsage, count_message_tokens, count_tokens
+from llm_api.tracing import tracer
 
 
-class BedrockModelCallError(Exception):
-    """Generate a custom exception for Bedrock API errors."""
+@contextmanager
+def _translate_errors() -> Iterator[None]:
+    """
+    Raise errors from LangChain and the Bedrock client as BedrockModelCallError.
+
+    Raises
+        BedrockModelCallError: Error raised by the Bedrock service
+        BedrockModelCallError: General LangChain exception
+    """
+    try:
+        yield
+    except (ValueError, ClientError, BotoCoreError) as bedrock_model_call_error:
+        message = f"Error calling model. {bedrock_model_call_error}"
+        raise BedrockModelCallError(message) from bedrock_model_call_error
+    except LangChainException as langchain_error:
+        message = f"Error sending prompt to LLM. {langchain_error}"
+        raise BedrockModelCallError(message) from langchain_error
 
 
 class BedrockCaller:
     """Process prompts and call Bedrock LLMs."""
 
+    temperature = 0.5
+
     def __init__(self, settings: Settings) -> None:
         """
         Class constructor.
@@ -27,155 +53,264 @@ class BedrockCaller:
             settings (Settings): Pydantic settings object.
         """
         self.settings = settings
-        self.boto3_client = self.get_boto3_client()
+        self.runtime_client = self.get_runtime_client()
         self.client = self.get_client(self.settings.aws_bedrock_model_id)
+        self.clients = {self.settings.aws_bedrock_model_id: self.client}
 
-    def get_boto3_client(self) -> Any:  # noqa: ANN401
+    def get_runtime_client(self) -> BedrockRuntimeClient:
         """
-        Retrieve LangChain client to call Bedrock models.
+        Retrieve the asynchronous client used to call the Bedrock runtime API.
+
+        Calls are made on the event loop over a pooled connection, sized by
+        `LLM_API_BEDROCK_MAX_CONNECTIONS` and `LLM_API_BEDROCK_MAX_KEEPALIVE_CONNECTIONS`.
+        Each attempt is bounded by `LLM_API_UPSTREAM_TIMEOUT_SECONDS`, and failed calls
+        are retried by the model service within each request's deadline.
 
         Returns
-            Bedrock: Langchain Bedrock client object
+            BedrockRuntimeClient: Signed HTTP client for the Bedrock runtime API
         """
-        return boto3.client(
-            aws_access_key_id=self.settings.aws_access_key_id,
-            aws_secret_access_key=self.settings.aws_secret_access_key.get_secret_value(),
-            region_name="us-east-1",
-            service_name="bedrock-runtime",
+        return BedrockRuntimeClient(
+            self.settings.aws_access_key_id,
+            self.settings.aws_secret_access_key.get_secret_value(),
+            "us-east-1",
+            endpoint_url=self.settings.aws_bedrock_endpoint_url,
+            timeout=self.settings.upstream_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=self.settings.bedrock_max_connections,
+                max_keepalive_connections=self.settings.bedrock_max_keepalive_connections,
+            ),
         )
 
-    def get_client(self, bedrock_model_id: BedrockModel) -> Bedrock:
+    def get_client(self, bedrock_model_id: BedrockModel) -> AsyncBedrockLLM:
         """
         Retrieve LangChain client to call Bedrock models.
 
+        Each call may generate up to `LLM_API_MAX_OUTPUT_TOKENS`.
+
         Returns
-            Bedrock: Langchain Bedrock client object
+            AsyncBedrockLLM: LangChain Bedrock client object
         """
-        return Bedrock(
-            client=self.boto3_client,
+        return AsyncBedrockLLM(
+            client=self.runtime_client,
             model_id=bedrock_model_id,
+            max_tokens=self.settings.max_output_tokens,
             model_kwargs={
-                "max_tokens_to_sample": 4096,
-                "temperature": 0.5,
+                "temperature": self.temperature,
                 "top_k": 250,
                 "top_p": 1,
                 "stop_sequences": ["\n\nHuman:"],
             },
         )
 
+    def get_model_client(self, bedrock_model_id: BedrockModel) -> AsyncBedrockLLM:
+        """
+        Retrieve the LangChain client for a model, creating it on first use.
+
+        Clients for every model share the same runtime client, so a caller can
+        serve requests for alternative models without building new connections.
+
+        Args:
+            bedrock_model_id (BedrockModel): Bedrock model to call.
+
+        Returns:
+            AsyncBedrockLLM: LangChain Bedrock client object
+        """
+        if bedrock_model_id not in self.clients:
+            self.clients[bedrock_model_id] = self.get_client(bedrock_model_id)
+        return self.clients[bedrock_model_id]
+
+    async def aclose(self) -> None:
+        """Close the connection pool used by the runtime client."""
+        await self.runtime_client.aclose()
+
+    @staticmethod
+    def backend(bedrock_model_id: BedrockModel) -> Backend:
+        """
+        Return the backend requests for a model are sent through.
+
+        Args:
+            bedrock_model_id (BedrockModel): Bedrock model called.
+
+        Returns:
+            Backend: Backend named in metrics for calls to the model.
+        """
+        if bedrock_model_id is BedrockModel.CLAUDE_INSTANT:
+            return Backend.BEDROCK_INSTANT
+        return Backend.BEDROCK
+
+    def _timed_chain(
+        self, prompt_template: ChatPromptTemplate, bedrock_model_id: BedrockModel
+    ) -> Runnable:
+        backend = self.backend(bedrock_model_id)
+        client = self.get_model_client(bedrock_model_id)
+        return timed(prompt_template, backend, bedrock_model_id, "prompt") | timed(
+            client, backend, bedrock_model_id, "upstream"
+        )
+
     @staticmethod
     def generate_prompt() -> ChatPromptTemplate:
         """
-        Generate a prompt from user input to send to models.
+        Return the prompt template used to send user searches to models.
 
         The prompt includes `system` and `user` roles to define expected
-        input and output formats.
+        input and output formats. It is built once at import time, with its
+        system messages pre-rendered, so formatting it only renders the user search.
+
+        Returns
+            ChatPromptTemplate: Template containing system messages and a user slot.
+        """
+        return BEDROCK_PROMPT.template
+
+    @staticmethod
+    def parse_response(model_output: str) -> Extraction:
+        """
+        Parse the JSON returned by a Bedrock model, repairing common faults.
+
+        The first JSON object in the response is used, with or without code fences
+        or other text around it.
 
         Args:
-            user_input (str): User search input.
+            model_output (str): Text of the model response.
+
+        Raises:
+            BedrockResponseParseError: No JSON object can be recovered from the response
+            BedrockResponseParseError: Model JSON response does not match the response schema
 
         Returns:
-            ChatPromptTemplate: A list of dictionaries containing roles and content.
-        """
-        user_template = "{text}"
-        return ChatPromptTemplate.from_messages(
-            [
-                SystemMessage(
-                    content=" ".join(
-                        "You are a helpful search assistant that extracts \
-                    useful entities and relationships from user search queries \
-                    and returns the answer as JSON. The user can only understand \
-                    JSON responses, and cannot understand any free text outside \
-                    of a JSON-formatted response. Users are inquisitive learners \
-                    who would like to find out about a particular subject. \
-                    Your job is to aid them in this task by providing them \
-                    with information.".split()
-                    ),
-                ),
-                SystemMessage(
-                    content=" ".join(
-                        "Users will provide you with a search, as a string. \
-                    You should examine this string and determine any entities directly \
-                    found in the string in addition to as many other relevant connected entities \
-                    not directly found in the user search. \
-                    You should provide the user with as many relevant entities as possible \
-                    while keeping entities specific to the search. Provide a minimum of 5 entities.\
-                    Please also provide a paragraph of 3-5 sentences describing the connections \
-                    between the entities, keeping this information specific and \
-                    relevant to the user search.".split()
-                    ),
-                ),
-                SystemMessage(
-                    content=" ".join(
-                        "Respond to the user by providing valid JSON in the format \
-                        specified in the example shown here. Do not include any text outside \
-                        of the JSON response. Format your JSON response by \
-                        matching the following example, which is shown \
-                        between the two sets of three backtick characters (`). Dictionary keys \
-                        should be taken literally, \
-                        but dictionary values are indicative".split()
-                    ),
-                ),
-                SystemMessage(
-                    content="```\
-                    {{'entities': [ \
-                        {{'uri': 'entity name', 'description': 'entity description', \
-                        'wikipedia_url': 'entity wikipedia url'}} \
-                    ]}},\
-                    'connections': [\
-                    {{'from': 'uri'\
-                    'to': 'uri'\
-                    'description': 'paragraph describing entity-entity relationship'\
-                    }}]\
-                    }} \
-            ```",
-                ),
-                HumanMessagePromptTemplate.from_template(user_template),
-            ]
-        )
+            Extraction: Validated model JSON response as a dictionary, and any faults
+                repaired.
+        """
+        try:
+            extraction = extract_json(model_output)
+            return extraction._replace(value=validate_model_output(extraction.value))
+        except JsonExtractionError as extraction_error:
+            message = f"Error decoding model output. {extraction_error}"
+            raise BedrockResponseParseError(message) from extraction_error
+        except ValidationError as validation_error:
+            message = f"Model output does not match the response schema. {validation_error}"
+            raise BedrockResponseParseError(message) from validation_error
+
+    async def _invoke(
+        self,
+        prompt_template: ChatPromptTemplate,
+        inputs: dict[str, str],
+        model: BedrockModel,
+        usage: TokenUsage | None,
+    ) -> str:
+        backend = self.backend(model)
+        prompt_tokens = count_message_tokens(prompt_template.format_messages(**inputs), backend)
+        with _translate_errors(), tracer.start_as_current_span("chain.ainvoke"):
+            chain = self._timed_chain(prompt_template, model)
+            model_output = await chain.ainvoke(inputs)
+            call_usage = TokenUsage(prompt_tokens, count_tokens(model_output, backend))
+            record_usage(backend, model, call_usage)
+        if usage is not None:
+            usage.add(call_usage.prompt_tokens, call_usage.completion_tokens)
+        return model_output
 
     async def call_model(
         self,
         prompt_template: ChatPromptTemplate,
         user_search: str,
         alternative_model: BedrockModel | None = None,
-    ) -> dict[str, str]:
+        usage: TokenUsage | None = None,
+    ) -> dict[str, Any]:
         """
         Call the external Bedrock model specified with a defined prompt via LangChain.
 
+        Time spent rendering the prompt, waiting on the model and parsing its output
+        is recorded in the stage duration metrics and traced, as are the tokens sent
+        and generated. The model may generate up to `LLM_API_MAX_OUTPUT_TOKENS`.
+        Common faults in the output's JSON are repaired. If none can be recovered,
+        the model is asked once more for valid JSON, unless `LLM_API_PARSE_REASK` is
+        false.
+
         Args:
             prompt_template (ChatPromptTemplate): LangChain ChatPromptTemplate
                 containing system instructions and any example formatting required.
             user_search (str): User's search as a string.
             alternative_model: Alternative model to use if not using the default model.
+            usage (TokenUsage | None, optional): Accumulates the tokens of each model
+                call made. Defaults to None.
 
         Raises:
-            BedrockModelCallError: Index error due to unexpected response format
-            BedrockModelCallError: JSONDecode error due to unexpected response format
+            BedrockResponseParseError: No JSON object can be recovered from the response
+            BedrockModelCallError: Error raised by the Bedrock service
             BedrockModelCallError: General LangChain exception
 
 
         Returns:
-            dict[str, str]: Model JSON response as a dictionary.
+            dict[str, Any]: Model JSON response as a dictionary.
         """
-        try:
-            if alternative_model:
-                self.client = self.get_client(alternative_model)
+        model = alternative_model or self.settings.aws_bedrock_model_id
+        with tracer.start_as_current_span(
+            "bedrock.call_model",
+            attributes={"llm.model": model, "llm.user_search.chars": len(user_search)},
+        ):
+            backend = self.backend(model)
+            model_output = await self._invoke(prompt_template, {"text": user_search}, model, usage)
+            try:
+                with observe_stage(backend, model, "parse"):
+                    extraction = self.parse_response(model_output)
+            except BedrockResponseParseError:
+                if not self.settings.parse_reask:
+                    raise
+                model_output = await self._invoke(
+                    build_reask_template(prompt_template),
+                    {"text": user_search, "model_output": model_output},
+                    model,
+                    usage,
+                )
+                with observe_stage(backend, model, "parse"):
+                    extraction = self.parse_response(model_output)
+                record_extraction(backend, model, extraction, reasked=True)
+            else:
+                record_extraction(backend, model, extraction)
+            return extraction.value
+
+    async def stream_model(
+        self,
+        prompt_template: ChatPromptTemplate,
+        user_search: str,
+        alternative_model: BedrockModel | None = None,
+        usage: TokenUsage | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response of the external Bedrock model as it is generated.
 
-            self.chain = prompt_template | self.client
-            model_response = await self.chain.ainvoke({"text": user_search})
+        The tokens sent and generated are counted once the stream ends, including
+        any generated before it was abandoned.
 
-            try:
-                return json.loads(model_response.split("```")[1].strip("json"))
-            except IndexError as unexpected_response_error:
-                message = f"Unable to parse model output as expected. {unexpected_response_error}"
-                raise BedrockModelCallError(message) from unexpected_response_error
-            except JSONDecodeError as json_error:
-                message = f"Error decoding model output. {json_error}"
-                raise BedrockModelCallError(message) from json_error
-        except ValueError as bedrock_model_call_error:
-            message = f"Error calling model. {bedrock_model_call_error}"
-            raise BedrockModelCallError(message) from bedrock_model_call_error
-        except LangChainException as langchain_error:
-            message = f"Error sending prompt to LLM. {langchain_error}"
-            raise BedrockModelCallError(message) from langchain_error
+        Args:
+            prompt_template (ChatPromptTemplate): LangChain ChatPromptTemplate
+                containing system instructions and any example formatting required.
+            user_search (str): User's search as a string.
+            alternative_model: Alternative model to use if not using the default model.
+            usage (TokenUsage | None, optional): Accumulates the tokens of the model
+                call. Defaults to None.
+
+        Raises:
+            BedrockModelCallError: Error raised by the Bedrock service
+            BedrockModelCallError: General LangChain exception
+
+        Yields:
+            str: Chunks of model output text. Parse the joined chunks with `parse_response`.
+        """
+        model = alternative_model or self.settings.aws_bedrock_model_id
+        backend = self.backend(model)
+        inputs = {"text": user_search}
+        call_usage = TokenUsage(
+            count_message_tokens(prompt_template.format_messages(**inputs), backend)
+        )
+        chunks = []
+        try:
+            with _translate_errors():
+                chain = self._timed_chain(prompt_template, model)
+                async for chunk in chain.astream(inputs):
+                    chunks.append(chunk)
+                    yield chunk
+        finally:
+            call_usage.add(0, count_tokens("".join(chunks), backend))
+            record_usage(backend, model, call_usage)
+            if usage is not None:
+                usage.add(call_usage.prompt_tokens, call_usage.completion_tokens)
@@ -0,0 +1,311 @@
+"""Provides an asynchronous Bedrock runtime client and a LangChain LLM using it."""
+import base64
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+from urllib.parse import quote
+
+import httpx
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+from botocore.eventstream import EventStreamBuffer
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+from langchain_aws.llms.bedrock import LLMInputOutputAdapter
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from pydantic import ConfigDict, Field
+
+SIGNING_NAME = "bedrock"
+
+
+class BedrockRuntimeClient:
+    """
+    Call the Bedrock runtime API over a pooled, SigV4-signed httpx connection.
+
+    Requests are sent on the event loop, so the number of concurrent calls is
+    bounded only by the connection pool, not by a thread pool. Failures are
+    raised as the botocore exceptions boto3 would raise, so they are handled
+    and retried in the same way.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        access_key_id: str,
+        secret_access_key: str,
+        region_name: str,
+        *,
+        endpoint_url: str | None = None,
+        timeout: float = 30.0,
+        limits: httpx.Limits | None = None,
+    ) -> None:
+        """
+        Class constructor.
+
+        Args:
+            access_key_id (str): AWS access key id.
+            secret_access_key (str): AWS secret access key.
+            region_name (str): AWS region the runtime API is called in.
+            endpoint_url (str | None, optional): Runtime API endpoint. Defaults to None,
+                for the public endpoint of the region.
+            timeout (float, optional): Seconds to wait to connect and for each read.
+                Defaults to 30.
+            limits (httpx.Limits | None, optional): Connection pool limits. Defaults to
+                None, for httpx's defaults.
+        """
+        self.endpoint_url = (
+            endpoint_url or f"https://bedrock-runtime.{region_name}.amazonaws.com"
+        ).rstrip("/")
+        self.signer = SigV4Auth(
+            Credentials(access_key_id, secret_access_key), SIGNING_NAME, region_name
+        )
+        self.http_client = httpx.AsyncClient(
+            timeout=timeout, limits=limits or httpx.Limits(), headers={"Accept": "*/*"}
+        )
+        self.sync_http_client = httpx.Client(
+            timeout=timeout, limits=limits or httpx.Limits(), headers={"Accept": "*/*"}
+        )
+
+    def _signed_request(
+        self, model_id: str, body: dict[str, Any], *, stream: bool
+    ) -> httpx.Request:
+        path = "invoke-with-response-stream" if stream else "invoke"
+        url = f"{self.endpoint_url}/model/{quote(model_id, safe='')}/{path}"
+        accept = "application/vnd.amazon.eventstream" if stream else "application/json"
+        content = json.dumps(body).encode()
+        aws_request = AWSRequest(
+            method="POST",
+            url=url,
+            data=content,
+            headers={"Content-Type": "application/json", "Accept": accept},
+        )
+        self.signer.add_auth(aws_request)
+        return self.http_client.build_request(
+            "POST", url, content=content, headers=dict(aws_request.headers.items())
+        )
+
+    async def _send(
+        self, operation: str, model_id: str, body: dict[str, Any], *, stream: bool
+    ) -> httpx.Response:
+        request = self._signed_request(model_id, body, stream=stream)
+        try:
+            response = await self.http_client.send(request, stream=stream)
+        except httpx.TransportError as transport_error:
+            raise _transport_error(request, transport_error) from transport_error
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+            raise _response_error(operation, response)
+        return response
+
+    async def invoke(self, model_id: str, body: dict[str, Any]) -> dict[str, Any]:
+        """
+        Call a model and wait for its whole response.
+
+        Args:
+            model_id (str): Bedrock model to call.
+            body (dict[str, Any]): Request body in the model provider's format.
+
+        Raises:
+            ClientError: If the runtime API returns an error.
+            EndpointConnectionError: If the runtime API cannot be reached.
+            ReadTimeoutError: If the runtime API does not answer in time.
+
+        Returns:
+            dict[str, Any]: Response body in the model provider's format.
+        """
+        response = await self._send("InvokeModel", model_id, body, stream=False)
+        return response.json()
+
+    def invoke_sync(self, model_id: str, body: dict[str, Any]) -> dict[str, Any]:
+        """
+        Call a model and wait for its whole response, blocking the calling thread.
+
+        The request is signed as by `invoke`, and sent on a separate blocking
+        connection pool with the same limits.
+
+        Args:
+            model_id (str): Bedrock model to call.
+            body (dict[str, Any]): Request body in the model provider's format.
+
+        Raises:
+            ClientError: If the runtime API returns an error.
+            EndpointConnectionError: If the runtime API cannot be reached.
+            ReadTimeoutError: If the runtime API does not answer in time.
+
+        Returns:
+            dict[str, Any]: Response body in the model provider's format.
+        """
+        operation = "InvokeModel"
+        request = self._signed_request(model_id, body, stream=False)
+        try:
+            response = self.sync_http_client.send(request)
+        except httpx.TransportError as transport_error:
+            raise _transport_error(request, transport_error) from transport_error
+        if response.is_error:
+            raise _response_error(operation, response)
+        return response.json()
+
+    async def invoke_stream(
+        self, model_id: str, body: dict[str, Any]
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Call a model and stream its response as it is generated.
+
+        Args:
+            model_id (str): Bedrock model to call.
+            body (dict[str, Any]): Request body in the model provider's format.
+
+        Raises:
+            ClientError: If the runtime API returns an error, before or during the stream.
+            EndpointConnectionError: If the runtime API cannot be reached, or the
+                connection drops during the stream.
+            ReadTimeoutError: If the runtime API does not answer in time.
+
+        Yields:
+            dict[str, Any]: Each chunk of the response, in the model provider's format.
+        """
+        operation = "InvokeModelWithResponseStream"
+        response = await self._send(operation, model_id, body, stream=True)
+        events = EventStreamBuffer()
+        try:
+            async for data in response.aiter_bytes():
+                events.add_data(data)
+                for event in events:
+                    payload = json.loads(event.payload or b"{}")
+                    if event.headers.get(":message-type") == "exception":
+                        error_type = event.headers.get(":exception-type", "UnknownError")
+                        raise _client_error(operation, error_type, payload.get("message", ""))
+                    if "bytes" in payload:
+                        yield json.loads(base64.b64decode(payload["bytes"]))
+        except httpx.TransportError as transport_error:
+            raise _transport_error(response.request, transport_error) from transport_error
+        finally:
+            await response.aclose()
+
+    async def aclose(self) -> None:
+        """Close the connection pools."""
+        await self.http_client.aclose()
+        self.sync_http_client.close()
+
+
+def _client_error(operation: str, error_type: str, message: str) -> ClientError:
+    return ClientError({"Error": {"Code": error_type, "Message": message}}, operation)
+
+
+def _response_error(operation: str, response: httpx.Response) -> ClientError:
+    error_type = response.headers.get("x-amzn-ErrorType", "").split(":")[0]
+    try:
+        message = response.json().get("message", response.text)
+    except ValueError:
+        message = response.text
+    return _client_error(operation, error_type or str(response.status_code), message)
+
+
+def _transport_error(
+    request: httpx.Request, transport_error: httpx.TransportError
+) -> ReadTimeoutError | EndpointConnectionError:
+    url = str(request.url)
+    if isinstance(transport_error, httpx.TimeoutException):
+        return ReadTimeoutError(endpoint_url=url, error=transport_error)
+    return EndpointConnectionError(endpoint_url=url)
+
+
+def _response_text(response: dict[str, Any]) -> str:
+    # Text completions return a completion, and messages return content blocks.
+    if "completion" in response:
+        return response["completion"]
+    return "".join(block.get("text", "") for block in response.get("content", []))
+
+
+def _chunk_text(chunk: dict[str, Any]) -> str:
+    # Text completions stream a completion, and messages stream content block deltas.
+    if "completion" in chunk:
+        return chunk["completion"] or ""
+    return chunk.get("delta", {}).get("text", "")
+
+
+class AsyncBedrockLLM(LLM):
+    """
+    LangChain LLM calling a Bedrock text completion model with `BedrockRuntimeClient`.
+
+    Request bodies are built as LangChain's `BedrockLLM` builds them, so prompts
+    reach the model unchanged, with `max_tokens` sent as the provider's own output
+    limit. Synchronous calls block on the client's own connection pool, and only
+    asynchronous calls can stream.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    client: BedrockRuntimeClient
+    model_id: str
+    max_tokens: int | None = None
+    model_kwargs: dict[str, Any] = Field(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "amazon_bedrock_async"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {
+            "model_id": self.model_id,
+            "max_tokens": self.max_tokens,
+            "model_kwargs": self.model_kwargs,
+        }
+
+    @property
+    def provider(self) -> str:
+        """
+        Return the provider of the model, taken from its id.
+
+        Returns
+            str: Model provider, such as "anthropic".
+        """
+        return self.model_id.split(".")[0]
+
+    def _body(self, prompt: str) -> dict[str, Any]:
+        # The output limit is named differently by each provider's request body.
+        return LLMInputOutputAdapter.prepare_input(
+            provider=self.provider,
+            model_kwargs=self.model_kwargs,
+            prompt=prompt,
+            max_tokens=self.max_tokens,
+        )
+
+    def _call(
+        self,
+        prompt: str,
+        stop: list[str] | None = None,  # noqa: ARG002
+        run_manager: CallbackManagerForLLMRun | None = None,  # noqa: ARG002
+        **kwargs: Any,  # noqa: ANN401, ARG002
+    ) -> str:
+        response = self.client.invoke_sync(self.model_id, self._body(prompt))
+        return _response_text(response)
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: list[str] | None = None,  # noqa: ARG002
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,  # noqa: ARG002
+        **kwargs: Any,  # noqa: ANN401, ARG002
+    ) -> str:
+        response = await self.client.invoke(self.model_id, self._body(prompt))
+        return _response_text(response)
+
+    async def _astream(
+        self,
+        prompt: str,
+        stop: list[str] | None = None,  # noqa: ARG002
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,  # noqa: ANN401, ARG002
+    ) -> AsyncIterator[GenerationChunk]:
+        body = self._body(prompt)
+        async for chunk in self.client.invoke_stream(self.model_id, body):
+            text = _chunk_text(chunk)
+            if not text:
+                continue
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(text)
+            yield GenerationChunk(text=text)
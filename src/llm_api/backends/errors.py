@@ -0,0 +1,17 @@
+"""Define the errors raised by model callers, without importing provider SDKs."""
+
+
+class OpenaiModelCallError(Exception):
+    """Generate a custom exception for Openai API errors."""
+
+
+class OpenaiResponseParseError(OpenaiModelCallError):
+    """Generate a custom exception for Openai model output that cannot be parsed."""
+
+
+class BedrockModelCallError(Exception):
+    """Generate a custom exception for Bedrock API errors."""
+
+
+class BedrockResponseParseError(BedrockModelCallError):
+    """Generate a custom exception for Bedrock model output that cannot be parsed."""
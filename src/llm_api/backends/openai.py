@@ -1,21 +1,58 @@
 """Provides user search processing and OpenAI language model calling functionality."""
-import json
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from typing import Any
 
+import httpx
 import openai
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.exceptions import LangChainException
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
+from pydantic import ValidationError
 
-from llm_api.config import Settings
+from llm_api.backends.errors import OpenaiModelCallError, OpenaiResponseParseError
+from llm_api.config import Backend, Settings
+from llm_api.metrics import observe_stage, record_extraction, record_usage, timed
+from llm_api.parsing.extract import Extraction, JsonExtractionError, extract_json
+from llm_api.prompts import OPENAI_PROMPT, build_reask_template
+from llm_api.schemas import validate_model_output
+from llm_api.tokens import TokenUsage, count_message_tokens, count_tokens
+from llm_api.tracing import tracer
 
 
-class OpenaiModelCallError(Exception):
-    """Generate a custom exception for Openai API errors."""
+@contextmanager
+def _translate_errors() -> Iterator[None]:
+    """
+    Raise errors from LangChain and the OpenAI SDK as OpenaiModelCallError.
+
+    Raises
+        OpenaiModelCallError: General LangChain exception
+        OpenaiModelCallError: API connection exception
+        OpenaiModelCallError: Rate limit exception
+        OpenaiModelCallError: General API error exception
+    """
+    try:
+        yield
+    except LangChainException as langchain_error:
+        message = f"Error sending prompt to LLM. {langchain_error}"
+        raise OpenaiModelCallError(message) from langchain_error
+    except openai.APIConnectionError as connection_error:
+        message = f"Unable to connect to OpenAI. {connection_error}"
+        raise OpenaiModelCallError(message) from connection_error
+    except openai.RateLimitError as rate_limit_error:
+        message = f"Rate limit exceeded. {rate_limit_error}"
+        raise OpenaiModelCallError(message) from rate_limit_error
+    except openai.APIError as api_error:
+        message = f"OpenAI API error: {api_error}"
+        raise OpenaiModelCallError(message) from api_error
 
 
 class OpenaiCaller:
     """Process prompts and call Openai LLMs."""
 
+    temperature = 0.2
+
     def __init__(self, settings: Settings) -> None:
         """
         Class constructor.
@@ -24,124 +61,206 @@ class OpenaiCaller:
             settings (Settings): Pydantic settings object.
         """
         self.settings = settings
+        self.http_client = httpx.AsyncClient()
         self.client = self.get_client()
 
     def get_client(self) -> ChatOpenAI:
         """
         Retrieve an asynchronous OpenAI client object.
 
+        The client is given an HTTP connection pool owned by this caller, so that
+        connections are reused across requests and released by `aclose`. Each
+        attempt is bounded by `LLM_API_UPSTREAM_TIMEOUT_SECONDS`, and may generate
+        up to `LLM_API_MAX_OUTPUT_TOKENS`. The SDK's own retries are disabled, since
+        failed calls are retried by the model service within each request's deadline.
+
         Returns
             ChatOpenAI: Langchain ChatOpenAI client object
         """
         return ChatOpenAI(
             api_key=self.settings.openai_api_key.get_secret_value(),
             model_name=self.settings.openai_llm_name,
-            temperature=0.2,
+            temperature=self.temperature,
             model_kwargs={"response_format": {"type": "json_object"}},
+            base_url=self.settings.openai_base_url,
+            http_async_client=self.http_client,
+            timeout=self.settings.upstream_timeout_seconds,
+            max_completion_tokens=self.settings.max_output_tokens,
+            max_retries=0,
         )
 
+    async def aclose(self) -> None:
+        """Close the HTTP connection pool used by the OpenAI client."""
+        await self.http_client.aclose()
+
     @staticmethod
     def generate_openai_prompt() -> ChatPromptTemplate:
         """
-        Generate a prompt from user input to send to Openai models.
+        Return the prompt template used to send user searches to models.
 
         The prompt includes `system` and `user` roles to define expected
-        input and output formats.
+        input and output formats. It is built once at import time, with its
+        system messages pre-rendered, so formatting it only renders the user search.
+
+        Returns
+            ChatPromptTemplate: Template containing system messages and a user slot.
+        """
+        return OPENAI_PROMPT.template
+
+    def _timed_chain(self, prompt_template: ChatPromptTemplate) -> Runnable:
+        model = self.settings.openai_llm_name
+        return timed(prompt_template, Backend.OPENAI, model, "prompt") | timed(
+            self.client, Backend.OPENAI, model, "upstream"
+        )
+
+    @staticmethod
+    def parse_response(model_output: str) -> Extraction:
+        """
+        Parse the JSON text returned by an Openai model, repairing common faults.
 
         Args:
-            user_input (str): User search input.
+            model_output (str): Text content of the model response.
+
+        Raises:
+            OpenaiResponseParseError: No JSON object can be recovered from the response
+            OpenaiResponseParseError: Model JSON response does not match the response schema
 
         Returns:
-            ChatPromptTemplate: A list of dictionaries containing roles and content.
+            Extraction: Validated model JSON response as a dictionary, and any faults
+                repaired.
         """
-        user_template = "{text}"
-        return ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    " ".join(
-                        "You are a helpful search assistant that extracts \
-                    useful entities and relationships from user search queries.".split()
-                    ),
-                ),
-                (
-                    "system",
-                    " ".join(
-                        "Users will provide you with a search, as a string. \
-                    You should examine this string and determine entities directly \
-                    from the string in addition to any other entities not found in \
-                    the string that may be relevant to the search. \
-                    Try to find at least 5 relevant entities in each case, but no \
-                    more than 10. Try to keep entities specific to the search. \
-                    If you are unsure whether an entity is connected to the search, \
-                    do not include it. Also provide the wikipedia URL for each entity \
-                    you identify. If you are unsure if the URL is valid, do not include \
-                    a URL in your response.".split()
-                    ),
-                ),
-                (
-                    "system",
-                    " ".join(
-                        "You should provide your response as valid JSON, in a \
-                format matching the following example, which is shown \
-                between the two sets of three backtick characters (`). Dictionary keys \
-                should be taken literally, \
-                but dictionary values are indicative".split()
-                    ),
-                ),
-                (
-                    "system",
-                    "```\
-                    {{'entities': [ \
-                        {{'uri': 'entity name', 'description': 'entity description', \
-                        'wikipedia_url': 'entity wikipedia url'}} \
-                    ]}},\
-                    'connections': [\
-                    {{'from': 'uri'\
-                    'to': 'uri'\
-                    'description': 'short paragraph describing entity-entity relationship\
-                    }}]\
-                    }} \
-            ```",
-                ),
-                ("user", user_template),
-            ]
+        try:
+            extraction = extract_json(model_output)
+            return extraction._replace(value=validate_model_output(extraction.value))
+        except JsonExtractionError as extraction_error:
+            message = f"Error decoding model output. {extraction_error}"
+            raise OpenaiResponseParseError(message) from extraction_error
+        except ValidationError as validation_error:
+            message = f"Model output does not match the response schema. {validation_error}"
+            raise OpenaiResponseParseError(message) from validation_error
+
+    async def _invoke(
+        self,
+        prompt_template: ChatPromptTemplate,
+        inputs: dict[str, str],
+        usage: TokenUsage | None,
+    ) -> str:
+        prompt_tokens = count_message_tokens(
+            prompt_template.format_messages(**inputs), Backend.OPENAI
         )
+        with _translate_errors(), tracer.start_as_current_span("chain.ainvoke"):
+            chain = self._timed_chain(prompt_template)
+            model_response = await chain.ainvoke(inputs)
+            # OpenAI reports the tokens it counted, which are used when present.
+            reported = model_response.usage_metadata
+            call_usage = (
+                TokenUsage(reported["input_tokens"], reported["output_tokens"])
+                if reported
+                else TokenUsage(prompt_tokens, count_tokens(model_response.content, Backend.OPENAI))
+            )
+            record_usage(Backend.OPENAI, self.settings.openai_llm_name, call_usage)
+        if usage is not None:
+            usage.add(call_usage.prompt_tokens, call_usage.completion_tokens)
+        return model_response.content
 
     async def call_model(
-        self, prompt_template: ChatPromptTemplate, user_search: str
-    ) -> dict[str, str]:
+        self,
+        prompt_template: ChatPromptTemplate,
+        user_search: str,
+        usage: TokenUsage | None = None,
+    ) -> dict[str, Any]:
         """
         Call the external Openai model specified with a defined prompt via LangChain.
 
+        Time spent rendering the prompt, waiting on the model and parsing its output
+        is recorded in the stage duration metrics and traced, as are the tokens sent
+        and generated. The model may generate up to `LLM_API_MAX_OUTPUT_TOKENS`.
+        Common faults in the output's JSON are repaired. If none can be recovered,
+        the model is asked once more for valid JSON, unless `LLM_API_PARSE_REASK` is
+        false.
+
         Args:
             prompt_template (ChatPromptTemplate): LangChain ChatPromptTemplate
                 containing system instructions and any example formatting required.
             user_search (str): User's search as a string.
+            usage (TokenUsage | None, optional): Accumulates the tokens of each model
+                call made. Defaults to None.
 
         Raises:
             OpenaiModelCallError: General LangChain exception
             OpenaiModelCallError: API connection exception
             OpenaiModelCallError: Rate limit exception
             OpenaiModelCallError: General API error exception
+            OpenaiResponseParseError: No JSON object can be recovered from the response
 
         Returns:
-            dict[str, str]: Model JSON response as a dictionary.
+            dict[str, Any]: Model JSON response as a dictionary.
         """
+        model = self.settings.openai_llm_name
+        with tracer.start_as_current_span(
+            "openai.call_model",
+            attributes={"llm.model": model, "llm.user_search.chars": len(user_search)},
+        ):
+            model_output = await self._invoke(prompt_template, {"text": user_search}, usage)
+            try:
+                with observe_stage(Backend.OPENAI, model, "parse"):
+                    extraction = self.parse_response(model_output)
+            except OpenaiResponseParseError:
+                if not self.settings.parse_reask:
+                    raise
+                model_output = await self._invoke(
+                    build_reask_template(prompt_template),
+                    {"text": user_search, "model_output": model_output},
+                    usage,
+                )
+                with observe_stage(Backend.OPENAI, model, "parse"):
+                    extraction = self.parse_response(model_output)
+                record_extraction(Backend.OPENAI, model, extraction, reasked=True)
+            else:
+                record_extraction(Backend.OPENAI, model, extraction)
+            return extraction.value
+
+    async def stream_model(
+        self,
+        prompt_template: ChatPromptTemplate,
+        user_search: str,
+        usage: TokenUsage | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response of the external Openai model as it is generated.
+
+        The tokens sent and generated are counted once the stream ends, including
+        any generated before it was abandoned.
+
+        Args:
+            prompt_template (ChatPromptTemplate): LangChain ChatPromptTemplate
+                containing system instructions and any example formatting required.
+            user_search (str): User's search as a string.
+            usage (TokenUsage | None, optional): Accumulates the tokens of the model
+                call. Defaults to None.
+
+        Raises:
+            OpenaiModelCallError: General LangChain exception
+            OpenaiModelCallError: API connection exception
+            OpenaiModelCallError: Rate limit exception
+            OpenaiModelCallError: General API error exception
+
+        Yields:
+            str: Chunks of model output text. Parse the joined chunks with `parse_response`.
+        """
+        inputs = {"text": user_search}
+        call_usage = TokenUsage(
+            count_message_tokens(prompt_template.format_messages(**inputs), Backend.OPENAI)
+        )
+        chunks = []
         try:
-            self.chain = prompt_template | self.client
-            model_response = await self.chain.ainvoke({"text": user_search})
-            return json.loads(model_response.content)
-
-        except LangChainException as langchain_error:
-            message = f"Error sending prompt to LLM. {langchain_error}"
-            raise OpenaiModelCallError(message) from langchain_error
-        except openai.APIConnectionError as connection_error:
-            message = f"Unable to connect to OpenAI. {connection_error}"
-            raise OpenaiModelCallError(message) from connection_error
-        except openai.RateLimitError as rate_limit_error:
-            message = f"Rate limit exceeded. {rate_limit_error}"
-            raise OpenaiModelCallError(message) from rate_limit_error
-        except openai.APIError as api_error:
-            message = f"OpenAI API error: {api_error}"
-            raise OpenaiModelCallError(message) from api_error
+            with _translate_errors():
+                chain = self._timed_chain(prompt_template)
+                async for chunk in chain.astream(inputs):
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        finally:
+            call_usage.add(0, count_tokens("".join(chunks), Backend.OPENAI))
+            record_usage(Backend.OPENAI, self.settings.openai_llm_name, call_usage)
+            if usage is not None:
+                usage.add(call_usage.prompt_tokens, call_usage.completion_tokens)
@@ -0,0 +1,183 @@
+"""Provides a per-process registry of model callers shared across requests."""
+import asyncio
+from typing import TYPE_CHECKING
+
+from fastapi import Request
+from loguru import logger
+
+from llm_api.config import ProviderWarmup, Settings, reload_settings
+from llm_api.tokens import load_openai_encoding
+
+if TYPE_CHECKING:
+    from llm_api.backends.bedrock import BedrockCaller
+    from llm_api.backends.openai import OpenaiCaller
+
+    Caller = OpenaiCaller | BedrockCaller
+
+
+def import_backends() -> None:
+    """
+    Import every backend module, and with them LangChain's provider integrations and SDKs.
+
+    Importing them takes most of the time taken to import the API, so they are
+    imported when a caller is first built rather than when the API is. tiktoken's
+    encoding, which may be downloaded, is loaded with them.
+    """
+    import llm_api.backends.bedrock
+    import llm_api.backends.openai  # noqa: F401
+
+    load_openai_encoding()
+
+
+class CallerRegistry:
+    """
+    Hold a single instance of each model caller for the lifetime of a worker.
+
+    Callers and their underlying clients are expensive to build, as each owns a
+    connection pool. Building them once and sharing them across requests lets
+    concurrent requests reuse warm connections. Callers hold no per-request
+    state, so a single instance can safely serve concurrent requests.
+
+    Each caller is built, and its provider SDK imported, on first use, so workers
+    start without waiting for SDKs they may not need yet. Call `warm` or
+    `warm_up` to build them ahead of requests instead.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        """
+        Class constructor.
+
+        Args:
+            settings (Settings): Pydantic settings object.
+        """
+        self.settings = settings
+        self._openai: OpenaiCaller | None = None
+        self._bedrock: BedrockCaller | None = None
+        self._retiring: set[asyncio.Task] = set()
+
+    @property
+    def openai(self) -> "OpenaiCaller":
+        """
+        Return the OpenAI caller, building it on first use.
+
+        Returns
+            OpenaiCaller: Shared OpenAI caller.
+        """
+        if self._openai is None:
+            from llm_api.backends.openai import OpenaiCaller
+
+            self._openai = OpenaiCaller(self.settings)
+        return self._openai
+
+    @property
+    def bedrock(self) -> "BedrockCaller":
+        """
+        Return the Bedrock caller, building it on first use.
+
+        Returns
+            BedrockCaller: Shared Bedrock caller.
+        """
+        if self._bedrock is None:
+            from llm_api.backends.bedrock import BedrockCaller
+
+            self._bedrock = BedrockCaller(self.settings)
+        return self._bedrock
+
+    def warm(self) -> None:
+        """Build every caller now, importing their provider SDKs."""
+        _ = self.openai, self.bedrock
+
+    async def warm_up(self, warmup: ProviderWarmup) -> None:
+        """
+        Build callers ahead of requests, as set by `LLM_API_PROVIDER_WARMUP`.
+
+        Backend modules are imported in a thread, so in `background` mode requests
+        can be served meanwhile, and callers are built once they are loaded.
+
+        Args:
+            warmup (ProviderWarmup): When to import provider SDKs and build callers.
+        """
+        if warmup is not ProviderWarmup.LAZY:
+            await asyncio.to_thread(import_backends)
+            self.warm()
+
+    async def reload(self, settings: Settings) -> None:
+        """
+        Swap in callers built from new settings.
+
+        New callers are built before any state changes, then swapped in without
+        yielding to the event loop, so each request sees either the old or the
+        new callers. Callers not yet built are left to be built from the new
+        settings on first use. Old callers are closed after a grace period,
+        allowing requests that already hold them to finish.
+
+        Args:
+            settings (Settings): Pydantic settings object to build callers from.
+        """
+        openai_caller = bedrock_caller = None
+        if self._openai is not None:
+            openai_caller = type(self._openai)(settings)
+        if self._bedrock is not None:
+            bedrock_caller = type(self._bedrock)(settings)
+        retired = tuple(caller for caller in (self._openai, self._bedrock) if caller is not None)
+        self.settings, self._openai, self._bedrock = settings, openai_caller, bedrock_caller
+
+        task = asyncio.create_task(self._close_after(retired, settings.reload_grace_seconds))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    @staticmethod
+    async def _close_after(callers: tuple["Caller", ...], delay: float) -> None:
+        """
+        Close retired callers once in-flight requests have had time to finish.
+
+        Args:
+            callers (tuple[Caller, ...]): Callers to close.
+            delay (float): Seconds to wait before closing.
+        """
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            for caller in callers:
+                await caller.aclose()
+
+    async def aclose(self) -> None:
+        """Close the clients held by every registered and retired caller."""
+        for task in list(self._retiring):
+            task.cancel()
+        await asyncio.gather(*self._retiring, return_exceptions=True)
+        for caller in (self._openai, self._bedrock):
+            if caller is not None:
+                await caller.aclose()
+
+
+async def reload_callers(registry: CallerRegistry) -> Settings:
+    """
+    Reload settings and rebuild the callers that depend on them.
+
+    Args:
+        registry (CallerRegistry): Registry to rebuild.
+
+    Raises:
+        ValidationError: If the new settings are invalid. Current callers are kept.
+
+    Returns:
+        Settings: Newly loaded Pydantic settings object
+    """
+    settings = reload_settings()
+    await registry.reload(settings)
+    logger.info("Settings reloaded and model callers rebuilt.")
+    return settings
+
+
+def get_caller_registry(request: Request) -> CallerRegistry:
+    """
+    Return the caller registry created during application startup.
+
+    Args:
+        request (Request): Incoming request, used to access application state.
+
+    Returns:
+        CallerRegistry: Registry of shared model callers.
+    """
+    return request.app.state.callers
@@ -0,0 +1 @@
+"""Caches for model responses."""
@@ -0,0 +1,35 @@
+"""Provides normalisation of user searches and cache key construction."""
+import hashlib
+import unicodedata
+
+
+def normalise_search(user_search: str) -> str:
+    """
+    Normalise a user search so trivially different searches share a cache entry.
+
+    Applies Unicode NFC normalisation, case folding and whitespace collapsing.
+
+    Args:
+        user_search (str): User's search as a string.
+
+    Returns:
+        str: Normalised search.
+    """
+    return " ".join(unicodedata.normalize("NFC", user_search).casefold().split())
+
+
+def make_cache_key(user_search: str, model: str, temperature: float, prompt_version: str) -> str:
+    """
+    Build a cache key for a model response.
+
+    Args:
+        user_search (str): User's search as a string. Normalised before hashing.
+        model (str): Model identifier.
+        temperature (float): Sampling temperature the model is called with.
+        prompt_version (str): Version of the prompt template sent to the model.
+
+    Returns:
+        str: Hex digest identifying the response.
+    """
+    parts = (normalise_search(user_search), model, repr(temperature), prompt_version)
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
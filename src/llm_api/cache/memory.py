@@ -0,0 +1,117 @@
+"""Provides a bounded in-process cache for model responses."""
+import json
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, NamedTuple
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters describing cache effectiveness.
+
+    Attributes
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups not found in the cache, or found expired.
+        evictions (int): Entries removed to stay within the size limit.
+        expirations (int): Entries removed because their TTL elapsed.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class _Entry(NamedTuple):
+    value: bytes
+    size: int
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    Least-recently-used cache of model responses, bounded by TTL and memory size.
+
+    Responses are stored serialised, which gives an accurate size for each entry
+    and hands every reader its own copy. All operations are synchronous, so they
+    cannot interleave when called from a single event loop.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int) -> None:
+        """
+        Class constructor.
+
+        Args:
+            ttl_seconds (float): Seconds an entry stays valid after being stored.
+            max_bytes (int): Approximate upper bound on memory used by entries.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries, including any not yet found expired.
+
+        Returns
+            int: Number of cached entries.
+        """
+        return len(self._entries)
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """
+        Return a cached response, if present and not expired.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            dict[str, Any] | None: Copy of the cached response, or None on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.expirations += 1
+            entry = None
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return json.loads(entry.value)
+
+    def set(self, key: str, response: dict[str, Any]) -> None:  # noqa: A003
+        """
+        Store a response, evicting least-recently-used entries to stay within size.
+
+        Responses larger than the whole cache are not stored.
+
+        Args:
+            key (str): Cache key.
+            response (dict[str, Any]): Model response to store.
+        """
+        value = json.dumps(response).encode()
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        while self._entries and self.size_bytes + size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.stats.evictions += 1
+        self._entries[key] = _Entry(value, size, time.monotonic() + self.ttl_seconds)
+        self.size_bytes += size
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.size_bytes -= entry.size
@@ -0,0 +1,324 @@
+"""Provides a cache tier answering searches with responses to earlier, similar searches."""
+import re
+import time
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+
+from llm_api.cache.keys import normalise_search
+from llm_api.cache.memory import CacheStats
+from llm_api.config import Settings
+from llm_api.metrics import SEMANTIC_EVICTIONS, SEMANTIC_SIMILARITY
+
+# Words that change how a search is phrased more than what it is about.
+STOP_WORDS = frozenset(
+    "a about an and are as at by did do does for from how in is it of on or the to was were "
+    "what when where which who why with".split()
+)
+# Words reversing the meaning of a search, besides contractions ending in "n't".
+NEGATIONS = frozenset(("neither", "never", "no", "non", "none", "nor", "not", "without"))
+# Words this short, such as "d" in "vitamin d", are names rather than inflected words.
+MAX_SHORT_WORD_LENGTH = 2
+# Apostrophes are kept within words, so "shakespeare's" leaves no stray "s".
+WORD_PATTERN = re.compile(r"\w+(?:['\u2019]\w+)*")
+
+
+class HashingEmbedder:
+    """
+    Embed text as a bag of its words and their character n-grams, hashed into a fixed size.
+
+    Word order and stop words are ignored, so rephrasings such as "french revolution
+    causes" and "causes of the French Revolution" embed identically, and n-grams
+    let inflections such as "cause" and "causes" share most features. Features are
+    hashed with CRC-32, which is stable across processes, and half are subtracted
+    so collisions tend to cancel out. Embedding needs no model, network or GPU.
+
+    Numbers, very short words and negations change what a search is about however
+    little they change its embedding, as in "world war 1" and "world war 2", so
+    they are also returned by `anchors`, for searches to be matched only when
+    theirs are the same.
+    """
+
+    def __init__(self, dimensions: int, ngram_sizes: tuple[int, ...] = (3, 4, 5)) -> None:
+        """
+        Class constructor.
+
+        Args:
+            dimensions (int): Length of each embedding.
+            ngram_sizes (tuple[int, ...], optional): Lengths of the character n-grams
+                taken from each word. Defaults to (3, 4, 5).
+        """
+        self.dimensions = dimensions
+        self.ngram_sizes = ngram_sizes
+
+    @staticmethod
+    def words(text: str) -> list[str]:
+        """
+        Return the words of a text once normalised, leaving out stop words.
+
+        Args:
+            text (str): Text to split.
+
+        Returns:
+            list[str]: Words, in order.
+        """
+        return [
+            word for word in WORD_PATTERN.findall(normalise_search(text)) if word not in STOP_WORDS
+        ]
+
+    def anchors(self, text: str) -> frozenset[str]:
+        """
+        Return the words of a text that a search must share exactly to match it.
+
+        These are words containing a digit, words of at most two characters, and
+        negations, including contractions such as "isn't".
+
+        Args:
+            text (str): Text to describe.
+
+        Returns:
+            frozenset[str]: Anchor words, empty if the text has none.
+        """
+        return frozenset(
+            word
+            for word in self.words(text)
+            if len(word) <= MAX_SHORT_WORD_LENGTH
+            or word in NEGATIONS
+            or word.endswith(("n't", "n\u2019t"))
+            or any(char.isdigit() for char in word)
+        )
+
+    def features(self, text: str) -> list[str]:
+        """
+        Return the features of a text: its words, and the character n-grams of each.
+
+        Args:
+            text (str): Text to describe.
+
+        Returns:
+            list[str]: Features, repeated as often as they occur.
+        """
+        words = self.words(text)
+        features = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f" {word} "
+            features.extend(
+                padded[start : start + size]
+                for size in self.ngram_sizes
+                for start in range(len(padded) - size + 1)
+            )
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a text as a unit vector.
+
+        Args:
+            text (str): Text to embed.
+
+        Returns:
+            np.ndarray: Embedding of shape `(dimensions,)`, or zeros if the text has
+                no features.
+        """
+        digests = np.fromiter(
+            (zlib.crc32(feature.encode()) for feature in self.features(text)), dtype=np.uint32
+        )
+        signs = np.where(digests & 0x80000000, -1.0, 1.0).astype(np.float32)
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        np.add.at(vector, digests % self.dimensions, signs)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticMatch(NamedTuple):
+    """
+    An earlier search close enough in meaning to serve its response.
+
+    Attributes
+        key (str): Cache key of the earlier search's response.
+        similarity (float): Cosine similarity of the two searches' embeddings.
+    """
+
+    key: str
+    similarity: float
+
+
+class SemanticCache:
+    """
+    Index of cached searches, matching new searches to earlier ones of similar meaning.
+
+    The index holds the embedding of each search whose response was cached, with
+    the key the response is cached under, so responses themselves stay in the
+    memory and shared caches with their TTLs and size limits. Embeddings are kept
+    in a matrix allocated up front, and a lookup scores every search in it with a
+    single matrix-vector product. Searches are only matched to earlier searches
+    sent to the same model with the same prompt, and with the same anchor words,
+    such as numbers and negations. When the index is full, the least recently used
+    search is evicted.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, dimensions: int, top_k: int = 4) -> None:
+        """
+        Class constructor.
+
+        Args:
+            threshold (float): Least cosine similarity at which a search is matched.
+            max_entries (int): Number of searches the index holds.
+            dimensions (int): Length of each embedding.
+            top_k (int, optional): Most matches returned by a lookup, so a match
+                whose response has left the cache can fall back to the next.
+                Defaults to 4.
+        """
+        self.threshold = threshold
+        self.top_k = top_k
+        self.embedder = HashingEmbedder(dimensions)
+        self.stats = CacheStats()
+        self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self._scopes = np.full(max_entries, -1, dtype=np.int32)
+        self._anchor_ids = np.zeros(max_entries, dtype=np.uint32)
+        self._last_used = np.full(max_entries, -np.inf)
+        self._keys: list[str | None] = [None] * max_entries
+        self._rows: dict[str, int] = {}
+        self._scope_ids: dict[str, int] = {}
+        self._size = 0
+
+    @classmethod
+    def from_settings(cls: type["SemanticCache"], settings: Settings) -> "SemanticCache":
+        """
+        Create a semantic cache sized by settings.
+
+        Args:
+            settings (Settings): Pydantic settings object.
+
+        Returns:
+            SemanticCache: Empty semantic cache.
+        """
+        return cls(
+            settings.semantic_cache_threshold,
+            settings.semantic_cache_max_entries,
+            settings.semantic_cache_dimensions,
+        )
+
+    def __len__(self) -> int:
+        """
+        Return the number of searches in the index.
+
+        Returns
+            int: Number of indexed searches.
+        """
+        return len(self._rows)
+
+    def add(self, user_search: str, scope: str, key: str) -> None:
+        """
+        Index a search whose response has been cached.
+
+        Args:
+            user_search (str): User's search as a string.
+            scope (str): Model and prompt the response came from. Searches only
+                match searches in the same scope.
+            key (str): Key the response is cached under.
+        """
+        row = self._rows.get(key)
+        if row is None:
+            row = self._free_row()
+            self._rows[key] = row
+            self._keys[row] = key
+            self._vectors[row] = self.embedder.embed(user_search)
+            self._scopes[row] = self._scope_ids.setdefault(scope, len(self._scope_ids))
+            self._anchor_ids[row] = self._anchor_id(user_search)
+        self._last_used[row] = time.monotonic()
+
+    def match(self, user_search: str, scope: str) -> list[SemanticMatch]:
+        """
+        Find indexed searches similar enough to a search to share its response.
+
+        The similarity of the closest search is recorded, whether or not it is close
+        enough, so the threshold can be tuned against real traffic.
+
+        Args:
+            user_search (str): User's search as a string.
+            scope (str): Model and prompt the response should come from.
+
+        Returns:
+            list[SemanticMatch]: Up to `top_k` matches at or above the threshold,
+                most similar first.
+        """
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None or not self._rows:
+            self.stats.misses += 1
+            return []
+        query = self.embedder.embed(user_search)
+        comparable = (self._scopes[: self._size] == scope_id) & (
+            self._anchor_ids[: self._size] == self._anchor_id(user_search)
+        )
+        scores = np.where(comparable, self._vectors[: self._size] @ query, -1.0)
+        top_k = min(self.top_k, self._size)
+        rows = np.argpartition(scores, -top_k)[-top_k:]
+        rows = rows[np.argsort(scores[rows])[::-1]]
+        best_score = float(scores[rows[0]])
+        matches = [
+            SemanticMatch(self._keys[row], float(scores[row]))
+            for row in rows
+            if scores[row] >= self.threshold
+        ]
+        outcome = "hit" if matches else "miss"
+        if best_score >= 0:
+            SEMANTIC_SIMILARITY.labels(outcome).observe(best_score)
+        if not matches:
+            self.stats.misses += 1
+            return []
+        self.stats.hits += 1
+        self._last_used[rows[0]] = time.monotonic()
+        return matches
+
+    def discard(self, key: str) -> None:
+        """
+        Remove a search from the index, as its response is no longer cached.
+
+        Args:
+            key (str): Key the response was cached under.
+        """
+        row = self._rows.get(key)
+        if row is None:
+            return
+        self._clear_row(row)
+        self.stats.expirations += 1
+        SEMANTIC_EVICTIONS.labels("stale").inc()
+
+    def clear(self) -> None:
+        """Remove all searches."""
+        self._vectors[:] = 0
+        self._scopes[:] = -1
+        self._anchor_ids[:] = 0
+        self._last_used[:] = -np.inf
+        self._keys = [None] * len(self._keys)
+        self._rows.clear()
+        self._size = 0
+
+    def _anchor_id(self, user_search: str) -> int:
+        # Anchor words are compared by a hash of the sorted set, which fits the index.
+        return zlib.crc32("\x1f".join(sorted(self.embedder.anchors(user_search))).encode())
+
+    def _free_row(self) -> int:
+        # Rows are filled in order until the matrix is full, after which the least
+        # recently used row, or one cleared by `discard`, is reused.
+        if self._size < len(self._keys):
+            self._size += 1
+            return self._size - 1
+        row = int(np.argmin(self._last_used))
+        if self._keys[row] is not None:
+            self._clear_row(row)
+            self.stats.evictions += 1
+            SEMANTIC_EVICTIONS.labels("capacity").inc()
+        return row
+
+    def _clear_row(self, row: int) -> None:
+        key = self._keys[row]
+        if key is not None:
+            del self._rows[key]
+        self._keys[row] = None
+        self._vectors[row] = 0
+        self._scopes[row] = -1
+        self._anchor_ids[row] = 0
+        self._last_used[row] = -np.inf
@@ -0,0 +1,247 @@
+"""Provides a response cache shared by every worker process on a host."""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Protocol
+
+from loguru import logger
+
+from llm_api.cache.memory import CacheStats
+from llm_api.config import Settings, SharedCacheBackend
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+class SharedCache(Protocol):
+    """Interface for caches shared between worker processes."""
+
+    stats: CacheStats
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Return a cached response, or None on a miss."""
+
+    async def set(self, key: str, response: dict[str, Any]) -> None:  # noqa: A003
+        """Store a response."""
+
+    async def aclose(self) -> None:
+        """Release any connections held by the cache."""
+
+
+class SQLiteSharedCache:
+    """
+    Response cache stored in a SQLite database in write-ahead-log mode.
+
+    WAL mode lets every worker on a host read concurrently while one writes, and
+    the database file outlives worker restarts. Queries run in a thread so disk
+    access and lock waits do not block the event loop. Errors are logged and
+    treated as misses, so a broken cache never fails a request.
+    """
+
+    prune_interval = 256
+
+    def __init__(self, path: Path, ttl_seconds: float, max_entries: int) -> None:
+        """
+        Class constructor.
+
+        Args:
+            path (Path): Location of the database file, created if missing.
+            ttl_seconds (float): Seconds an entry stays valid after being stored.
+            max_entries (int): Number of entries kept when the cache is pruned.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)"
+            )
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """
+        Return a cached response, if present and not expired.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            dict[str, Any] | None: Cached response, or None on a miss.
+        """
+        try:
+            value = await asyncio.to_thread(self._get, key)
+        except sqlite3.Error as sqlite_error:
+            logger.warning(f"Shared cache lookup failed. {sqlite_error}")
+            value = None
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json.loads(value)
+
+    async def set(self, key: str, response: dict[str, Any]) -> None:  # noqa: A003
+        """
+        Store a response, periodically pruning expired and excess entries.
+
+        Args:
+            key (str): Cache key.
+            response (dict[str, Any]): Model response to store.
+        """
+        self._writes += 1
+        prune = self._writes % self.prune_interval == 0
+        try:
+            await asyncio.to_thread(self._set, key, json.dumps(response), prune=prune)
+        except sqlite3.Error as sqlite_error:
+            logger.warning(f"Shared cache write failed. {sqlite_error}")
+
+    async def aclose(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def _get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM responses WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, *, prune: bool) -> None:
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + self.ttl_seconds),
+            )
+            if prune:
+                expired = self._connection.execute(
+                    "DELETE FROM responses WHERE expires_at <= ?", (now,)
+                ).rowcount
+                excess = self._connection.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                    "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+                self.stats.expirations += expired
+                self.stats.evictions += excess
+
+
+class RedisSharedCache:
+    """
+    Response cache stored in Redis, or any server speaking the Redis protocol.
+
+    Entries expire through Redis key TTLs. Errors are logged and treated as
+    misses, so an unavailable server never fails a request.
+    """
+
+    key_prefix = "llm_api:response:"
+
+    def __init__(self, client: "Redis", ttl_seconds: float) -> None:
+        """
+        Class constructor.
+
+        Args:
+            client (Redis): Asynchronous Redis client.
+            ttl_seconds (float): Seconds an entry stays valid after being stored.
+        """
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+
+    @classmethod
+    def from_url(cls: type["RedisSharedCache"], url: str, ttl_seconds: float) -> "RedisSharedCache":
+        """
+        Create a cache connected to the Redis server at a URL.
+
+        Requires the optional `redis` dependency, installed with `pip install llm-api[redis]`.
+
+        Args:
+            url (str): Redis connection URL.
+            ttl_seconds (float): Seconds an entry stays valid after being stored.
+
+        Returns:
+            RedisSharedCache: Cache using the server.
+        """
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url), ttl_seconds)
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """
+        Return a cached response, if present.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            dict[str, Any] | None: Cached response, or None on a miss.
+        """
+        from redis.exceptions import RedisError
+
+        try:
+            value = await self.client.get(self.key_prefix + key)
+        except RedisError as redis_error:
+            logger.warning(f"Shared cache lookup failed. {redis_error}")
+            value = None
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json.loads(value)
+
+    async def set(self, key: str, response: dict[str, Any]) -> None:  # noqa: A003
+        """
+        Store a response.
+
+        Args:
+            key (str): Cache key.
+            response (dict[str, Any]): Model response to store.
+        """
+        from redis.exceptions import RedisError
+
+        try:
+            await self.client.set(
+                self.key_prefix + key, json.dumps(response), px=int(self.ttl_seconds * 1000)
+            )
+        except RedisError as redis_error:
+            logger.warning(f"Shared cache write failed. {redis_error}")
+
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        await self.client.aclose()
+
+
+def build_shared_cache(settings: Settings) -> SharedCache | None:
+    """
+    Create the shared cache selected in settings.
+
+    Args:
+        settings (Settings): Pydantic settings object.
+
+    Returns:
+        SharedCache | None: Shared cache, or None if disabled.
+    """
+    match settings.shared_cache_backend:
+        case SharedCacheBackend.SQLITE:
+            return SQLiteSharedCache(
+                settings.shared_cache_path,
+                settings.shared_cache_ttl_seconds,
+                settings.shared_cache_max_entries,
+            )
+        case SharedCacheBackend.REDIS:
+            return RedisSharedCache.from_url(
+                settings.shared_cache_redis_url, settings.shared_cache_ttl_seconds
+            )
+    return None
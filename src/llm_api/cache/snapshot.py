@@ -0,0 +1,78 @@
+"""Provides snapshot files of model responses, loaded into a worker's cache at startup."""
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import orjson
+from loguru import logger
+
+
+class SnapshotEntry(NamedTuple):
+    """
+    A cached model response, as saved in a snapshot.
+
+    Attributes
+        key (str): Key the response is cached under.
+        scope (str): Model and prompt the response came from.
+        user_search (str): Search the response answers.
+        response (dict[str, Any]): Model JSON response as a dictionary.
+    """
+
+    key: str
+    scope: str
+    user_search: str
+    response: dict[str, Any]
+
+
+def write_snapshot(path: Path, entries: Iterable[SnapshotEntry]) -> int:
+    """
+    Save responses to a snapshot file, one JSON object per line.
+
+    The snapshot is written beside its destination and moved into place, so a
+    worker starting meanwhile reads either the old snapshot or the new one.
+
+    Args:
+        path (Path): Location of the snapshot file.
+        entries (Iterable[SnapshotEntry]): Responses to save.
+
+    Returns:
+        int: Number of responses saved.
+    """
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    count = 0
+    with temporary_path.open("wb") as snapshot_file:
+        for entry in entries:
+            snapshot_file.write(orjson.dumps(entry._asdict()) + b"\n")
+            count += 1
+    temporary_path.replace(path)
+    return count
+
+
+def read_snapshot(path: Path) -> list[SnapshotEntry]:
+    """
+    Read the responses saved in a snapshot file.
+
+    A missing or unreadable snapshot is logged and treated as empty, and unreadable
+    lines are skipped, so a bad snapshot never stops a worker starting.
+
+    Args:
+        path (Path): Location of the snapshot file.
+
+    Returns:
+        list[SnapshotEntry]: Saved responses.
+    """
+    try:
+        lines = path.read_bytes().splitlines()
+    except OSError as os_error:
+        logger.warning(f"Cache snapshot {path} not loaded. {os_error}")
+        return []
+    entries = []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            entries.append(SnapshotEntry(**orjson.loads(line)))
+        except (orjson.JSONDecodeError, TypeError) as snapshot_error:
+            logger.warning(f"Skipped line {line_number} of snapshot {path}. {snapshot_error}")
+    return entries
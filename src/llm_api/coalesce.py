@@ -0,0 +1,80 @@
+"""Provides coalescing of identical concurrent calls into a single call."""
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight(Generic[T]):
+    task: asyncio.Task[T]
+    waiters: int = field(default=0)
+
+
+class SingleFlight(Generic[T]):
+    """
+    Share one in-flight call between every caller asking for the same key.
+
+    The first caller for a key starts the call in its own task; callers arriving
+    while it runs wait on that task instead of starting another. A waiter that
+    is cancelled, e.g. because its client disconnected, stops waiting without
+    cancelling the call for the others. The call is only cancelled once nobody
+    is waiting for it, with the message the last waiter was cancelled with.
+    """
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.coalesced = 0
+        self._flights: dict[str, _Flight[T]] = {}
+
+    def __len__(self) -> int:
+        """
+        Return the number of calls in flight.
+
+        Returns
+            int: Number of calls in flight.
+        """
+        return len(self._flights)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """
+        Return the result of a call, joining an identical call already in flight.
+
+        Args:
+            key (str): Key identifying identical calls.
+            call (Callable[[], Awaitable[T]]): Makes the call if none is in flight.
+
+        Raises:
+            Exception: Any exception raised by the call, shared by every waiter.
+
+        Returns:
+            tuple[T, bool]: The call's result, shared by every waiter, and whether
+                this caller joined a call already in flight.
+        """
+        flight = self._flights.get(key)
+        joined = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        cancel_message = None
+        try:
+            return await asyncio.shield(flight.task), joined
+        except asyncio.CancelledError as cancelled_error:
+            # Passed on if the call is cancelled, so it knows why it was.
+            cancel_message = cancelled_error.args[0] if cancelled_error.args else None
+            raise
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel(cancel_message)
+
+    def _forget(self, key: str, flight: _Flight[T]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
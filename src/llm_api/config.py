@@ -1,7 +1,10 @@
 """Define API settings."""
+import tempfile
+import threading
 from enum import StrEnum
+from pathlib import Path
 
-from pydantic import SecretStr
+from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,6 +22,62 @@ class BedrockModel(StrEnum):
     CLAUDE_INSTANT = "anthropic.claude-instant-v1"
 
 
+class Backend(StrEnum):
+    """Define the model backends requests can be sent to."""
+
+    OPENAI = "openai"
+    BEDROCK = "bedrock"
+    BEDROCK_INSTANT = "bedrock_instant"
+
+
+class SharedCacheBackend(StrEnum):
+    """Define possible stores for the response cache shared between workers."""
+
+    NONE = "none"
+    SQLITE = "sqlite"
+    REDIS = "redis"
+
+
+class TracingExporter(StrEnum):
+    """Define where trace spans can be exported to."""
+
+    NONE = "none"
+    CONSOLE = "console"
+    FILE = "file"
+
+
+class ProviderWarmup(StrEnum):
+    """Define when workers import provider SDKs and build model callers."""
+
+    LAZY = "lazy"
+    BACKGROUND = "background"
+    EAGER = "eager"
+
+
+class ServerProfile(StrEnum):
+    """Define the Gunicorn worker profiles the API can be served with."""
+
+    ASYNC = "async"
+    LEAN = "lean"
+    LEGACY = "legacy"
+
+
+class EventLoop(StrEnum):
+    """Define the event loops Uvicorn workers can run."""
+
+    AUTO = "auto"
+    ASYNCIO = "asyncio"
+    UVLOOP = "uvloop"
+
+
+class HttpProtocol(StrEnum):
+    """Define the HTTP parsers Uvicorn workers can use."""
+
+    AUTO = "auto"
+    H11 = "h11"
+    HTTPTOOLS = "httptools"
+
+
 class Settings(BaseSettings):
     """Store typed settings for Pydantic."""
 
@@ -27,16 +86,149 @@ class Settings(BaseSettings):
     aws_access_key_id: str
     aws_secret_access_key: SecretStr
     aws_bedrock_model_id: BedrockModel
+    openai_base_url: str | None = None
+    aws_bedrock_endpoint_url: str | None = None
+    bedrock_max_connections: int = 100
+    bedrock_max_keepalive_connections: int = 20
+    admin_token: SecretStr | None = None
+    reload_grace_seconds: float = 30.0
+    response_cache_ttl_seconds: float = 3600.0
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    shared_cache_backend: SharedCacheBackend = SharedCacheBackend.SQLITE
+    shared_cache_path: Path = Path(tempfile.gettempdir()) / "llm_api_cache.sqlite3"
+    shared_cache_redis_url: str = "redis://localhost:6379/0"
+    shared_cache_ttl_seconds: float = 86400.0
+    shared_cache_max_entries: int = 100_000
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.88
+    semantic_cache_max_entries: int = 10_000
+    semantic_cache_dimensions: int = 256
+    cache_snapshot_path: Path | None = None
+    batch_concurrency: int = 8
+    batch_max_items: int = 1000
+    hedge_delay_seconds: float | None = None
+    hedge_initial_delay_seconds: float = 5.0
+    hedge_quantile: float = 0.9
+    hedge_window_size: int = 200
+    routing_backends: list[Backend] = Field(default_factory=lambda: list(Backend))
+    routing_target_latency_seconds: float = 10.0
+    routing_smoothing: float = 0.2
+    routing_probe_rate: float = 0.05
+    routing_probe_interval_seconds: float = 300.0
+    breaker_window_seconds: float = 60.0
+    breaker_min_calls: int = 10
+    breaker_failure_rate_threshold: float = 0.5
+    breaker_slow_call_seconds: float = 30.0
+    breaker_slow_call_rate_threshold: float = 0.5
+    breaker_open_seconds: float = 30.0
+    breaker_half_open_calls: int = 3
+    request_timeout_seconds: float = 60.0
+    upstream_timeout_seconds: float = 30.0
+    max_input_tokens: int = 512
+    max_output_tokens: int = 2048
+    retry_max_retries: int = 3
+    retry_base_delay_seconds: float = 0.5
+    retry_max_delay_seconds: float = 8.0
+    rate_limit_rpm: dict[Backend, int] = Field(default_factory=dict)
+    rate_limit_tpm: dict[Backend, int] = Field(default_factory=dict)
+    rate_limit_max_wait_seconds: float = 10.0
+    rate_limit_path: Path = Path(tempfile.gettempdir()) / "llm_api_ratelimit.sqlite3"
+    parse_reask: bool = True
+    provider_warmup: ProviderWarmup = ProviderWarmup.BACKGROUND
+    tracing_exporter: TracingExporter = TracingExporter.NONE
+    tracing_file_path: Path = Path(tempfile.gettempdir()) / "llm_api_traces.jsonl"
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", env_prefix="LLM_API_"
     )
 
 
+class ServerSettings(BaseSettings):
+    """
+    Store typed settings for the Gunicorn server.
+
+    These are read by the Gunicorn master before the API is loaded, so are kept
+    apart from `Settings` and need no credentials. They are read from the
+    environment only, since `Settings` rejects unknown entries in `.env`. Unset
+    worker options take their values from the selected profile.
+    """
+
+    profile: ServerProfile = ServerProfile.ASYNC
+    workers: int | None = None
+    worker_connections: int | None = None
+    preload: bool | None = None
+    max_requests: int = 10_000
+    max_requests_jitter: int = 1000
+    timeout_seconds: int = 120
+    graceful_timeout_seconds: int = 30
+    keepalive_seconds: int = 5
+    loop: EventLoop = EventLoop.AUTO
+    http: HttpProtocol = HttpProtocol.AUTO
+    model_config = SettingsConfigDict(env_prefix="LLM_API_SERVER_")
+
+
+class SettingsStore:
+    """
+    Cache a Settings object for the lifetime of a worker.
+
+    Building Settings re-parses the environment and re-reads `.env` from disk,
+    so it is done once and the result shared until an explicit reload.
+    """
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self._settings: Settings | None = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Settings:
+        """
+        Return the cached Settings object, building it on first use.
+
+        Returns
+            Settings: Pydantic settings object
+        """
+        if self._settings is None:
+            with self._lock:
+                if self._settings is None:
+                    self._settings = Settings()
+        return self._settings
+
+    def reload(self) -> Settings:
+        """
+        Rebuild Settings from the environment and `.env` and swap it in.
+
+        The new object is fully validated before it replaces the cached one,
+        so a bad configuration leaves the current settings in place.
+
+        Returns
+            Settings: Newly loaded Pydantic settings object
+        """
+        settings = Settings()
+        with self._lock:
+            self._settings = settings
+        return settings
+
+
+settings_store = SettingsStore()
+
+
 def get_settings() -> Settings:
     """
-    Return a Settings object.
+    Return the cached Settings object.
 
     Returns
         Settings: Pydantic settings object
     """
-    return Settings()
+    return settings_store.get()
+
+
+def reload_settings() -> Settings:
+    """
+    Reload settings from the environment and `.env`.
+
+    Raises
+        ValidationError: If the new settings are invalid. Cached settings are kept.
+
+    Returns
+        Settings: Newly loaded Pydantic settings object
+    """
+    return settings_store.reload()
@@ -1,23 +1,60 @@
 # ruff: noqa
 """Define Gunicorn config."""
 
+import os
+import tempfile
+
+# Workers write metrics to files here, so /metrics can aggregate every worker.
+# prometheus_client chooses where metric values are kept when it is first
+# imported, so this must be set before anything imports it, including the
+# llm_api modules below. The master preloads the app before `on_starting`
+# runs, so the directory must exist by then too.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "llm_api_metrics")
+)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
 import logging
-import multiprocessing
+import shutil
 import sys
 
 from loguru import logger
+from prometheus_client import multiprocess
+
+from llm_api.backends.registry import import_backends
+from llm_api.config import ServerSettings
+from llm_api.workers import resolve_profile
+
+server_settings = ServerSettings()
+profile = resolve_profile(server_settings)
 
 bind = "0.0.0.0:8000"
 
-# Worker class
-worker_class = "uvicorn.workers.UvicornWorker"
+# Async workers, using the event loop and HTTP parser in LLM_API_SERVER_LOOP and _HTTP
+worker_class = "llm_api.workers.AsyncUvicornWorker"
 
-# Number of workers recommended by Gunicorn docs
-workers = multiprocessing.cpu_count() * 2 + 1
+# Workers spend their time waiting on model calls, so each runs many requests at
+# once on its event loop rather than Gunicorn running a worker per request.
+workers = profile.workers
+worker_connections = profile.worker_connections
 
 # threads per worker
 threads = 1
 
+# Import the app once in the master, so workers share its modules copy-on-write.
+# Workers then pick up code changes only when the master is restarted.
+preload_app = profile.preload
+
+# Recycle workers after a jittered number of requests, so they do not all restart at once.
+max_requests = server_settings.max_requests
+max_requests_jitter = server_settings.max_requests_jitter
+
+# Seconds a silent worker is allowed before being killed, and in-flight requests
+# are given to finish on restart or shutdown.
+timeout = server_settings.timeout_seconds
+graceful_timeout = server_settings.graceful_timeout_seconds
+keepalive = server_settings.keepalive_seconds
+
 logging_level = "INFO"
 
 
@@ -58,6 +95,18 @@ def when_ready(server):
 
 def on_starting(server):
     logger.info("Starting Gunicorn.")
+    # Discard metrics left by workers of a previous server. Files the master
+    # wrote while preloading go too, as workers open their own when forked.
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+    # The app loads provider SDKs lazily, so import them here for workers to share too.
+    if server.cfg.preload_app:
+        import_backends()
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
 
 
 def on_exit(server):
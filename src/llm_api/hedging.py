@@ -0,0 +1,271 @@
+"""Provides hedged model calls, racing a second backend against a slow first one."""
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from fastapi import Request
+
+from llm_api.config import Backend, Settings
+from llm_api.resilience.retry import Deadline
+from llm_api.service import HEDGE_LOST, ModelCallResult, ModelService
+
+MIN_LATENCY_SAMPLES = 20
+
+
+class LatencyWindow:
+    """Hold the most recent model call latencies for a backend."""
+
+    def __init__(self, size: int) -> None:
+        """
+        Class constructor.
+
+        Args:
+            size (int): Number of latencies to keep.
+        """
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        """
+        Return the number of latencies held.
+
+        Returns
+            int: Number of latencies held.
+        """
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        """
+        Record a latency, dropping the oldest one if the window is full.
+
+        Args:
+            seconds (float): Latency of a model call in seconds.
+        """
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Return a latency quantile, using the nearest-rank method.
+
+        Args:
+            q (float): Quantile between 0 and 1.
+
+        Returns:
+            float | None: The quantile, or None if no latencies are held.
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(math.ceil(q * len(ordered)), 1)
+        return ordered[rank - 1]
+
+
+@dataclass
+class HedgeStats:
+    """
+    Counters describing how often hedged calls send a second request and which one wins.
+
+    Attributes
+        calls (int): Hedged calls made.
+        hedged (int): Calls for which the secondary backend was also called.
+        secondary_wins (int): Hedged calls answered by the secondary backend.
+    """
+
+    calls: int = field(default=0)
+    hedged: int = field(default=0)
+    secondary_wins: int = field(default=0)
+
+    @property
+    def hedge_rate(self) -> float:
+        """
+        Return the fraction of calls for which the secondary backend was also called.
+
+        Returns
+            float: Hedge rate, or 0 if no calls have been made.
+        """
+        return self.hedged / self.calls if self.calls else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        """
+        Return the fraction of hedged calls answered by the secondary backend.
+
+        Returns
+            float: Secondary win rate, or 0 if no calls have been hedged.
+        """
+        return self.secondary_wins / self.hedged if self.hedged else 0.0
+
+
+@dataclass
+class HedgedResult:
+    """
+    A model response from a hedged call.
+
+    Attributes
+        result (ModelCallResult): Response of the backend that answered first.
+        hedged (bool): Whether the secondary backend was also called.
+    """
+
+    result: ModelCallResult
+    hedged: bool
+
+
+class Hedger:
+    """
+    Call a primary backend, also calling a secondary one if the primary is slow.
+
+    The secondary backend is called once the primary has not answered within a
+    delay: either the fixed `LLM_API_HEDGE_DELAY_SECONDS`, or the primary's
+    recent latency at `LLM_API_HEDGE_QUANTILE`. The first response that parses
+    is returned and the other call is cancelled. If the primary fails before the
+    delay, the secondary is called straight away.
+    """
+
+    def __init__(self, service: ModelService) -> None:
+        """
+        Class constructor.
+
+        Args:
+            service (ModelService): Service used to call models.
+        """
+        self.service = service
+        self.stats = HedgeStats()
+        self.latencies: dict[Backend, LatencyWindow] = {}
+
+    @property
+    def settings(self) -> Settings:
+        """
+        Return the settings the service's callers were built with.
+
+        Returns
+            Settings: Pydantic settings object
+        """
+        return self.service.callers.settings
+
+    def delay(self, backend: Backend) -> float:
+        """
+        Return how long to wait for a backend before hedging.
+
+        Until enough latencies have been recorded for the backend, the initial
+        delay is used.
+
+        Args:
+            backend (Backend): Primary backend.
+
+        Returns:
+            float: Delay in seconds.
+        """
+        settings = self.settings
+        if settings.hedge_delay_seconds is not None:
+            return settings.hedge_delay_seconds
+        window = self.latencies.get(backend)
+        quantile = None
+        if window is not None and len(window) >= MIN_LATENCY_SAMPLES:
+            quantile = window.quantile(settings.hedge_quantile)
+        return settings.hedge_initial_delay_seconds if quantile is None else quantile
+
+    async def call(  # noqa: PLR0913
+        self,
+        primary: Backend,
+        secondary: Backend,
+        user_search: str,
+        *,
+        bypass_cache: bool = False,
+        deadline: Deadline | None = None,
+    ) -> HedgedResult:
+        """
+        Return the first response to a search from the primary or secondary backend.
+
+        Args:
+            primary (Backend): Backend to send the search to first.
+            secondary (Backend): Backend to also send the search to if the primary is slow.
+            user_search (str): User's search as a string.
+            bypass_cache (bool, optional): Skip the cache lookup. Defaults to False.
+            deadline (Deadline | None, optional): Deadline shared by both calls.
+                Defaults to None, for `LLM_API_REQUEST_TIMEOUT_SECONDS` from now.
+
+        Raises:
+            OpenaiModelCallError: If both calls fail and the primary is an OpenAI model.
+            BedrockModelCallError: If both calls fail and the primary is a Bedrock model.
+            CircuitOpenError: If both calls fail and the primary's circuit breaker is open.
+
+        Returns:
+            HedgedResult: Response of whichever backend answered first.
+        """
+        if deadline is None:
+            deadline = Deadline(self.settings.request_timeout_seconds)
+        self.stats.calls += 1
+        primary_task = asyncio.create_task(
+            self._timed_call(primary, user_search, bypass_cache, deadline)
+        )
+        tasks = [primary_task]
+        pending = {primary_task}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.delay(primary))
+            if done and primary_task.exception() is None:
+                return HedgedResult(primary_task.result(), hedged=False)
+
+            self.stats.hedged += 1
+            secondary_task = asyncio.create_task(
+                self._timed_call(secondary, user_search, bypass_cache, deadline)
+            )
+            tasks.append(secondary_task)
+            pending.add(secondary_task)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if primary_task in done and primary_task.exception() is None:
+                    return HedgedResult(primary_task.result(), hedged=True)
+                if secondary_task in done and secondary_task.exception() is None:
+                    self.stats.secondary_wins += 1
+                    return HedgedResult(secondary_task.result(), hedged=True)
+        finally:
+            # Calls still running lost the race only if another answered, rather
+            # than this hedged call itself being cancelled.
+            answered = any(
+                task.done() and not task.cancelled() and task.exception() is None for task in tasks
+            )
+            for task in pending:
+                task.cancel(HEDGE_LOST if answered else None)
+            # Wait for the loser to finish cancelling, so its elapsed time is recorded.
+            await asyncio.gather(*pending, return_exceptions=True)
+        primary_error = primary_task.exception()
+        raise primary_error  # type: ignore[misc]
+
+    async def _timed_call(
+        self,
+        backend: Backend,
+        user_search: str,
+        bypass_cache: bool,  # noqa: FBT001
+        deadline: Deadline,
+    ) -> ModelCallResult:
+        start_time = time.monotonic()
+        try:
+            result = await self.service.call(
+                backend, user_search, bypass_cache=bypass_cache, deadline=deadline
+            )
+        except asyncio.CancelledError:
+            self._record(backend, time.monotonic() - start_time)
+            raise
+        if not result.cache_hit:
+            self._record(backend, time.monotonic() - start_time)
+        return result
+
+    def _record(self, backend: Backend, seconds: float) -> None:
+        window = self.latencies.get(backend)
+        if window is None:
+            window = self.latencies[backend] = LatencyWindow(self.settings.hedge_window_size)
+        window.record(seconds)
+
+
+def get_hedger(request: Request) -> Hedger:
+    """
+    Return the hedger created during application startup.
+
+    Args:
+        request (Request): Incoming request, used to access application state.
+
+    Returns:
+        Hedger: Hedger used for hedged model calls.
+    """
+    return request.app.state.hedger
@@ -1,12 +1,33 @@
 """Entry point and main file for FastAPI app."""
 
+import asyncio
+import contextlib
+import math
+import signal
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from importlib import metadata
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response, status
+from fastapi.responses import JSONResponse, ORJSONResponse
 from loguru import logger
+from pydantic import ValidationError
 
-from llm_api.routers import model_calling
+from llm_api.backends.registry import CallerRegistry, reload_callers
+from llm_api.cache.memory import ResponseCache
+from llm_api.cache.shared import build_shared_cache
+from llm_api.cache.snapshot import read_snapshot
+from llm_api.config import ProviderWarmup, get_settings
+from llm_api.hedging import Hedger
+from llm_api.metrics import InFlightMiddleware, render_metrics
+from llm_api.resilience.breaker import CircuitOpenError
+from llm_api.resilience.ratelimit import RateLimitExceededError, SQLiteRateLimiter
+from llm_api.resilience.retry import DeadlineExceededError
+from llm_api.routers import admin, batch, model_calling, streaming
+from llm_api.routing import AdaptiveRouter
+from llm_api.service import ModelService
+from llm_api.tracing import TracingMiddleware, configure_tracing, flush_tracing
 
 logger.info("API starting")
 
@@ -16,13 +37,165 @@ augmented by user search input. The LLM response is returned as JSON
 with the most relevant entities from the search input extracted.
 """
 
+
+async def reload_on_signal(callers: CallerRegistry) -> None:
+    """
+    Reload settings and callers after SIGHUP, keeping the current ones if invalid.
+
+    Args:
+        callers (CallerRegistry): Registry of model callers to rebuild.
+    """
+    try:
+        await reload_callers(callers)
+    except ValidationError:
+        logger.exception("Invalid settings, reload aborted.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Build shared model callers and the response caches on startup.
+
+    Provider SDKs are imported and model callers built as set by
+    `LLM_API_PROVIDER_WARMUP`: on first use, in the background while requests
+    are served, or before the first request. The semantic cache, and NumPy with
+    it, is only loaded if `LLM_API_SEMANTIC_CACHE_ENABLED` is set. Responses saved
+    by `llm_api.warm` to `LLM_API_CACHE_SNAPSHOT_PATH` are loaded before the first
+    request. Model clients and shared cache connections are closed on shutdown.
+
+    A SIGHUP sent to a worker process reloads its settings and callers in place.
+    Signal handlers can only be installed from the main thread, so this is
+    skipped when the application is run elsewhere, e.g. by a test client.
+
+    Args:
+        app (FastAPI): Application whose state holds the caller registry.
+    """
+    settings = get_settings()
+    configure_tracing(settings)
+    app.state.callers = CallerRegistry(settings)
+    semantic_cache = None
+    if settings.semantic_cache_enabled:
+        from llm_api.cache.semantic import SemanticCache
+
+        semantic_cache = SemanticCache.from_settings(settings)
+    app.state.model_service = ModelService(
+        app.state.callers,
+        ResponseCache(settings.response_cache_ttl_seconds, settings.response_cache_max_bytes),
+        build_shared_cache(settings),
+        SQLiteRateLimiter(settings.rate_limit_path),
+        semantic_cache,
+    )
+    if settings.cache_snapshot_path is not None:
+        entries = await asyncio.to_thread(read_snapshot, settings.cache_snapshot_path)
+        loaded = app.state.model_service.load_snapshot(entries)
+        logger.info(f"Loaded {loaded} responses from {settings.cache_snapshot_path}")
+    app.state.hedger = Hedger(app.state.model_service)
+    app.state.adaptive_router = AdaptiveRouter(app.state.model_service)
+    app.state.batch_semaphore = asyncio.Semaphore(settings.batch_concurrency)
+    warmup = asyncio.create_task(app.state.callers.warm_up(settings.provider_warmup))
+    if settings.provider_warmup is ProviderWarmup.EAGER:
+        await warmup
+    reload_tasks: set[asyncio.Task] = set()
+
+    def handle_sighup() -> None:
+        task = asyncio.create_task(reload_on_signal(app.state.callers))
+        reload_tasks.add(task)
+        task.add_done_callback(reload_tasks.discard)
+
+    loop = asyncio.get_running_loop()
+    with contextlib.suppress(NotImplementedError, RuntimeError, ValueError):
+        loop.add_signal_handler(signal.SIGHUP, handle_sighup)
+    yield
+    with contextlib.suppress(NotImplementedError, RuntimeError, ValueError):
+        loop.remove_signal_handler(signal.SIGHUP)
+    warmup.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await warmup
+    await app.state.model_service.aclose()
+    await app.state.callers.aclose()
+    flush_tracing()
+
+
 app = FastAPI(
     title="LLM Search Entity Extraction API",
     description=description,
     version=metadata.version("llm-api"),
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
+app.add_middleware(InFlightMiddleware)
+app.add_middleware(TracingMiddleware)
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(
+    request: Request,  # noqa: ARG001
+    circuit_open_error: CircuitOpenError,
+) -> JSONResponse:
+    """
+    Fail requests to a backend whose circuit breaker is open with 503 Service Unavailable.
+
+    Args:
+        request (Request): Request that was refused.
+        circuit_open_error (CircuitOpenError): Error raised by the open breaker.
+
+    Returns:
+        JSONResponse: Error response telling clients when to retry.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(circuit_open_error)},
+        headers={"Retry-After": str(math.ceil(circuit_open_error.retry_after))},
+    )
+
+
+@app.exception_handler(RateLimitExceededError)
+async def rate_limit_exceeded_handler(
+    request: Request,  # noqa: ARG001
+    rate_limit_error: RateLimitExceededError,
+) -> JSONResponse:
+    """
+    Shed requests that would exceed a backend's quota with 429 Too Many Requests.
+
+    Args:
+        request (Request): Request that was shed.
+        rate_limit_error (RateLimitExceededError): Error raised by the rate limiter.
+
+    Returns:
+        JSONResponse: Error response telling clients when to retry.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(rate_limit_error)},
+        headers={"Retry-After": str(math.ceil(rate_limit_error.retry_after))},
+    )
+
+
+@app.exception_handler(DeadlineExceededError)
+async def deadline_exceeded_handler(
+    request: Request,  # noqa: ARG001
+    deadline_exceeded_error: DeadlineExceededError,
+) -> JSONResponse:
+    """
+    Fail requests whose deadline passes before the model answers with 504 Gateway Timeout.
+
+    Args:
+        request (Request): Request that timed out.
+        deadline_exceeded_error (DeadlineExceededError): Error raised when the deadline passed.
+
+    Returns:
+        JSONResponse: Error response.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": str(deadline_exceeded_error)},
+    )
+
 
 app.include_router(model_calling.router)
+app.include_router(streaming.router)
+app.include_router(batch.router)
+app.include_router(admin.router)
 
 
 @app.get("/ping")
@@ -36,6 +209,18 @@ async def ping() -> dict[str, str]:
     return {"ping": "pong"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Expose metrics for scraping by Prometheus.
+
+    Returns
+        Response: Metrics of every worker in the Prometheus text format.
+    """
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "llm_api.main:app",
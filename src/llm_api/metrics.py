@@ -0,0 +1,280 @@
+"""Provides Prometheus metrics describing where request time is spent."""
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable
+from langchain_core.tracers.schemas import Run
+from opentelemetry import trace
+from opentelemetry.trace import Status, StatusCode
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from llm_api.parsing.extract import Extraction
+from llm_api.tokens import TokenUsage
+from llm_api.tracing import to_nanoseconds, tracer
+
+SIZE_ATTRIBUTES = {"prompt": "llm.prompt.chars", "upstream": "llm.response.chars"}
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+STAGE_DURATION = Histogram(
+    "llm_api_stage_duration_seconds",
+    "Time spent in each stage of a model call: prompt build, upstream call and response parse.",
+    ["backend", "model", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+PARSE_FAILURES = Counter(
+    "llm_api_parse_failures",
+    "Model responses that could not be parsed.",
+    ["backend", "model"],
+)
+PARSE_OUTCOMES = Counter(
+    "llm_api_parse_outcomes",
+    "Parsed model responses, by whether their JSON was 'clean', 'repaired' or only "
+    "readable after re-asking the model, 'reasked'.",
+    ["backend", "model", "outcome"],
+)
+PARSE_REPAIRS = Counter(
+    "llm_api_parse_repairs",
+    "Faults repaired in the JSON of model responses, by kind.",
+    ["backend", "repair"],
+)
+CACHE_LOOKUPS = Counter(
+    "llm_api_cache_lookups",
+    "Response cache lookups, by the tier that answered, or 'none' on a miss.",
+    ["backend", "tier"],
+)
+SEMANTIC_SIMILARITY = Histogram(
+    "llm_api_semantic_cache_similarity",
+    "Similarity of the closest earlier search found by the semantic cache, by whether "
+    "it was close enough to serve, 'hit', or not, 'miss'.",
+    ["outcome"],
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.925, 0.95, 0.975, 0.99, 1.0),
+)
+SEMANTIC_EVICTIONS = Counter(
+    "llm_api_semantic_cache_evictions",
+    "Searches removed from the semantic cache, to make room, 'capacity', or because "
+    "their response had left the cache, 'stale'.",
+    ["reason"],
+)
+TOKENS = Counter(
+    "llm_api_tokens",
+    "Tokens sent to models in prompts, 'prompt', and generated by them, 'completion'.",
+    ["backend", "model", "kind"],
+)
+ERRORS = Counter(
+    "llm_api_errors",
+    "Failed or refused model calls, by exception type.",
+    ["backend", "error"],
+)
+BREAKER_STATE = Gauge(
+    "llm_api_breaker_state",
+    "State of each backend's circuit breaker: 0 closed, 1 half open or 2 open. The "
+    "highest state of any worker is reported.",
+    ["backend"],
+    multiprocess_mode="livemax",
+)
+BREAKER_TRIPS = Counter(
+    "llm_api_breaker_trips",
+    "Times a backend's circuit breaker opened.",
+    ["backend"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "llm_api_requests_in_flight",
+    "HTTP requests being handled.",
+    multiprocess_mode="livesum",
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "llm_api_upstream_in_flight",
+    "Model calls waiting on a backend.",
+    ["backend"],
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def observe_stage(backend: str, model: str, stage: str) -> Iterator[None]:
+    """
+    Record the time spent in a stage of a model call, whether or not it succeeds.
+
+    The stage is also traced in a span of the same name.
+
+    Args:
+        backend (str): Backend the call is sent to.
+        model (str): Model called.
+        stage (str): One of "prompt", "upstream" or "parse".
+    """
+    start_time = time.perf_counter()
+    try:
+        with tracer.start_as_current_span(
+            stage, attributes={"llm.backend": backend, "llm.model": model}
+        ):
+            yield
+    finally:
+        STAGE_DURATION.labels(backend, model, stage).observe(time.perf_counter() - start_time)
+
+
+def _output_size(outputs: dict[str, Any]) -> int | None:
+    # Model runs record their generations, and other steps their output.
+    if "generations" in outputs:
+        return sum(
+            len(generation["text"])
+            for generations in outputs["generations"]
+            for generation in generations
+        )
+    output = outputs.get("output")
+    if isinstance(output, PromptValue):
+        return len(output.to_string())
+    if isinstance(output, BaseMessage):
+        return len(str(output.content))
+    return None if output is None else len(str(output))
+
+
+def timed(runnable: Runnable, backend: str, model: str, stage: str) -> Runnable:
+    """
+    Record the time spent running a step of a LangChain chain invoked asynchronously.
+
+    The step is also traced in a span of the same name as the stage. Listeners
+    are awaited in the chain's own task, so the span joins the current trace.
+
+    Args:
+        runnable (Runnable): Chain step to time.
+        backend (str): Backend the call is sent to.
+        model (str): Model called.
+        stage (str): One of "prompt", "upstream" or "parse".
+
+    Returns:
+        Runnable: The step, recording its duration each time it finishes or fails.
+    """
+    histogram = STAGE_DURATION.labels(backend, model, stage)
+
+    async def observe(run: Run) -> None:
+        if run.end_time is None:
+            return
+        histogram.observe((run.end_time - run.start_time).total_seconds())
+        span = tracer.start_span(
+            stage,
+            attributes={"llm.backend": backend, "llm.model": model},
+            start_time=to_nanoseconds(run.start_time),
+        )
+        if span.is_recording():
+            size = _output_size(run.outputs or {})
+            if size is not None and stage in SIZE_ATTRIBUTES:
+                span.set_attribute(SIZE_ATTRIBUTES[stage], size)
+            if run.error is not None:
+                span.set_status(Status(StatusCode.ERROR, run.error))
+        span.end(end_time=to_nanoseconds(run.end_time))
+
+    return runnable.with_alisteners(on_end=observe, on_error=observe)
+
+
+class InFlightMiddleware:
+    """Count the HTTP requests being handled, including responses still streaming."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        Class constructor.
+
+        Args:
+            app (ASGIApp): Application to wrap.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Handle a request, counting it as in flight until the response is complete.
+
+        Args:
+            scope (Scope): Connection scope.
+            receive (Receive): Receives request messages.
+            send (Send): Sends response messages.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with REQUESTS_IN_FLIGHT.track_inprogress():
+            await self.app(scope, receive, send)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Render every metric in the Prometheus text format.
+
+    When `PROMETHEUS_MULTIPROC_DIR` is set, as it is under Gunicorn, each worker
+    writes its metrics to files in that directory, and the metrics of every
+    worker are aggregated here, so any worker can answer a scrape.
+
+    Returns
+        tuple[bytes, str]: Rendered metrics and their content type.
+    """
+    registry: CollectorRegistry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def record_error(backend: str, error: BaseException) -> None:
+    """
+    Count a failed or refused model call.
+
+    Args:
+        backend (str): Backend the call was sent to.
+        error (BaseException): Exception the call raised.
+    """
+    ERRORS.labels(backend, type(error).__name__).inc()
+
+
+def record_usage(backend: str, model: str, usage: TokenUsage) -> None:
+    """
+    Count the tokens of a model call, and record them on the current trace span.
+
+    Args:
+        backend (str): Backend the call was sent to.
+        model (str): Model called.
+        usage (TokenUsage): Tokens in the prompt and the model output.
+    """
+    TOKENS.labels(backend, model, "prompt").inc(usage.prompt_tokens)
+    TOKENS.labels(backend, model, "completion").inc(usage.completion_tokens)
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.set_attributes(
+            {
+                "llm.usage.prompt_tokens": usage.prompt_tokens,
+                "llm.usage.completion_tokens": usage.completion_tokens,
+            }
+        )
+
+
+def record_extraction(
+    backend: str, model: str, extraction: Extraction, *, reasked: bool = False
+) -> None:
+    """
+    Count a parsed model response and any faults repaired to parse it.
+
+    Args:
+        backend (str): Backend the response came from.
+        model (str): Model that answered.
+        extraction (Extraction): JSON object extracted from the response.
+        reasked (bool, optional): Whether the model had to be asked again for
+            readable output. Defaults to False.
+    """
+    outcome = "repaired" if extraction.repaired else "clean"
+    if reasked:
+        outcome = "reasked"
+    PARSE_OUTCOMES.labels(backend, model, outcome).inc()
+    for repair in extraction.repairs:
+        PARSE_REPAIRS.labels(backend, repair).inc()
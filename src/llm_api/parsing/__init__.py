@@ -0,0 +1 @@
+"""Parsing of model output."""
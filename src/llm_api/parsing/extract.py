@@ -0,0 +1,234 @@
+"""Provides a single-pass extractor of the JSON object in model output, repairing common faults."""
+import json
+import re
+from json.decoder import JSONDecodeError
+from typing import Any, NamedTuple
+
+_NON_WHITESPACE = re.compile(r"\S")
+_DOUBLE_QUOTED = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+# A single quote only closes a string when followed by JSON punctuation, so apostrophes
+# inside single-quoted strings, as in 'Macbeth's wife', are kept.
+_SINGLE_QUOTED = re.compile(r"((?:[^'\\]|\\.|'(?!\s*(?:[,:}\]'\"]|$)))*)'", re.DOTALL)
+_SCALAR = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null|True|False|None")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+# Scanner states within a container.
+_KEY, _COLON, _VALUE, _AFTER_VALUE = range(4)
+
+
+class JsonExtractionError(ValueError):
+    """Generate a custom exception for model output holding no recoverable JSON object."""
+
+
+class Extraction(NamedTuple):
+    """
+    A JSON object extracted from model output.
+
+    Attributes
+        value (dict[str, Any]): The extracted object.
+        repairs (tuple[str, ...]): Faults repaired to load the object, any of
+            "single_quotes", "trailing_comma", "missing_comma", "python_literal" or
+            "truncated". Empty if the object was valid JSON.
+    """
+
+    value: dict[str, Any]
+    repairs: tuple[str, ...]
+
+    @property
+    def repaired(self) -> bool:
+        """
+        Return whether any fault was repaired to load the object.
+
+        Returns
+            bool: True if the object was not valid JSON as written.
+        """
+        return bool(self.repairs)
+
+
+class _Truncated(Exception):  # noqa: N818
+    """Raised by the scanner when the text ends inside the object."""
+
+
+class _Scanner:
+    """
+    Scan one JSON object from a start position, writing out a repaired copy.
+
+    The scanner reads each token once. Single-quoted strings are rewritten with
+    double quotes, Python literals with their JSON equivalents, trailing commas
+    are dropped and missing commas between values are inserted. The position
+    after the last complete value outside any array item is remembered, so an
+    object cut off part way through, or at a closing code fence, can be closed
+    there, dropping only the unfinished value or array item.
+    """
+
+    def __init__(self, text: str, start: int) -> None:
+        self.text = text
+        self.pos = start
+        self.out: list[str] = []
+        self.stack: list[str] = []
+        self.states: list[int] = []
+        self.repairs: dict[str, None] = {}
+        self.comma_pending = False
+        self.checkpoint: tuple[int, tuple[str, ...]] = (0, ())
+
+    def scan(self) -> str:
+        try:
+            self._open("{")
+            while self.stack:
+                self._step()
+        except _Truncated:
+            self.repairs["truncated"] = None
+            length, stack = self.checkpoint
+            return "".join(self.out[:length]) + "".join(
+                _CLOSERS[opener] for opener in reversed(stack)
+            )
+        return "".join(self.out)
+
+    def _mark(self) -> None:
+        # Positions inside an object in an array would keep a partly written item.
+        if "[{" not in "".join(self.stack):
+            self.checkpoint = (len(self.out), tuple(self.stack))
+
+    def _open(self, opener: str) -> None:
+        self.out.append(opener)
+        self.stack.append(opener)
+        self.states.append(_KEY if opener == "{" else _VALUE)
+        self.pos += 1
+        self._mark()
+
+    def _close(self) -> None:
+        self.out.append(_CLOSERS[self.stack.pop()])
+        self.states.pop()
+        self.pos += 1
+        self._end_value()
+
+    def _end_value(self) -> None:
+        if self.states:
+            self.states[-1] = _AFTER_VALUE
+            self._mark()
+
+    def _step(self) -> None:
+        match = _NON_WHITESPACE.search(self.text, self.pos)
+        # Only whitespace left, or a closing code fence, means the object was cut off.
+        if match is None or match.group() == "`":
+            raise _Truncated
+        self.pos = match.start()
+        char = self.text[self.pos]
+        state = self.states[-1]
+        closer = _CLOSERS[self.stack[-1]]
+        if state == _AFTER_VALUE:
+            if char == ",":
+                self.pos += 1
+                self.states[-1] = _KEY if closer == "}" else _VALUE
+                self.comma_pending = True
+                return
+            if char == closer:
+                self._close()
+                return
+            # Another value follows without a comma, as in the prompt's own example.
+            self.repairs["missing_comma"] = None
+            self.states[-1] = _KEY if closer == "}" else _VALUE
+            self.comma_pending = True
+            return
+        if char == closer and state in (_KEY, _VALUE):
+            if self.comma_pending:
+                self.repairs["trailing_comma"] = None
+                self.comma_pending = False
+            self._close()
+            return
+        if self.comma_pending:
+            self.out.append(",")
+            self.comma_pending = False
+        if state == _KEY:
+            if char not in "\"'":
+                message = f"Expected an object key at position {self.pos}."
+                raise JsonExtractionError(message)
+            self._string(char)
+            self.states[-1] = _COLON
+        elif state == _COLON:
+            if char != ":":
+                message = f"Expected ':' at position {self.pos}."
+                raise JsonExtractionError(message)
+            self.out.append(":")
+            self.pos += 1
+            self.states[-1] = _VALUE
+        else:
+            self._value(char)
+
+    def _value(self, char: str) -> None:
+        if char in _CLOSERS:
+            self._open(char)
+            return
+        if char in "\"'":
+            self._string(char)
+        else:
+            match = _SCALAR.match(self.text, self.pos)
+            if match is None:
+                message = f"Expected a value at position {self.pos}."
+                raise JsonExtractionError(message)
+            scalar = match.group()
+            if scalar in _PYTHON_LITERALS:
+                self.repairs["python_literal"] = None
+                scalar = _PYTHON_LITERALS[scalar]
+            elif match.end() == len(self.text):
+                # A number at the very end may have been cut short.
+                raise _Truncated
+            self.out.append(scalar)
+            self.pos = match.end()
+        self._end_value()
+
+    def _string(self, quote: str) -> None:
+        if quote == '"':
+            match = _DOUBLE_QUOTED.match(self.text, self.pos + 1)
+            if match is None:
+                raise _Truncated
+            self.out.append(self.text[self.pos : match.end()])
+        else:
+            match = _SINGLE_QUOTED.match(self.text, self.pos + 1)
+            if match is None:
+                raise _Truncated
+            self.repairs["single_quotes"] = None
+            content = match.group(1).replace("\\'", "'")
+            self.out.append(f'"{_escape_quotes(content)}"')
+        self.pos = match.end()
+
+
+def _escape_quotes(content: str) -> str:
+    return re.sub(r'(?<!\\)((?:\\\\)*)"', r'\1\\"', content)
+
+
+def extract_json(text: str) -> Extraction:
+    """
+    Extract the first JSON object from model output, repairing common faults.
+
+    The text is scanned once from the first opening brace, ignoring any prose or
+    code fences around the object. Single quotes, trailing or missing commas and
+    Python literals are repaired as they are read, and an object cut off part way
+    through is closed after its last complete value. If the text from one brace
+    cannot be read as an object, scanning resumes from the next brace.
+
+    Args:
+        text (str): Text of the model response.
+
+    Raises:
+        JsonExtractionError: If no JSON object can be recovered from the text.
+
+    Returns:
+        Extraction: The object and the faults repaired to load it.
+    """
+    start = text.find("{")
+    if start == -1:
+        message = "No JSON object found."
+        raise JsonExtractionError(message)
+    while True:
+        scanner = _Scanner(text, start)
+        try:
+            repaired_text = scanner.scan()
+            value = json.loads(repaired_text, strict=False)
+        except (JsonExtractionError, JSONDecodeError) as scan_error:
+            start = text.find("{", start + 1)
+            if start == -1:
+                raise JsonExtractionError(str(scan_error)) from scan_error
+            continue
+        return Extraction(value, tuple(scanner.repairs))
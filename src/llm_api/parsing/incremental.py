@@ -0,0 +1,137 @@
+"""Provides an incremental parser for streamed model responses."""
+from typing import Any, ClassVar, NamedTuple
+
+from pydantic import BaseModel, ValidationError
+
+from llm_api.parsing.extract import JsonExtractionError, extract_json
+from llm_api.schemas import Connection, Entity
+
+
+class ParsedItem(NamedTuple):
+    """
+    An entity or connection parsed from a streamed model response.
+
+    Attributes
+        kind (str): Either "entity" or "connection".
+        value (dict[str, Any]): The parsed object, validated as the final response is.
+    """
+
+    kind: str
+    value: dict[str, Any]
+
+
+def load_object(text: str) -> dict[str, Any] | None:
+    """
+    Load a JSON object, repairing faults such as the single quotes used in our prompt examples.
+
+    Args:
+        text (str): Text of a single object.
+
+    Returns:
+        dict[str, Any] | None: The object, or None if it cannot be loaded.
+    """
+    try:
+        return extract_json(text).value
+    except JsonExtractionError:
+        return None
+
+
+class IncrementalResponseParser:
+    """
+    Push-based parser emitting entities and connections as soon as each object closes.
+
+    Model output is fed in chunks as it streams. The parser scans each character
+    once, tracking nesting and strings, and captures the text of each object in
+    the top-level "entities" and "connections" arrays. Anything before the
+    top-level object, such as prose or an opening code fence, and anything after
+    it is ignored. Objects are validated against `Entity` or `Connection` as the
+    final response is, and objects that fail validation are not emitted.
+    """
+
+    collections: ClassVar[dict[str, str]] = {"entities": "entity", "connections": "connection"}
+    schemas: ClassVar[dict[str, type[BaseModel]]] = {"entity": Entity, "connection": Connection}
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.done = False
+        self._stack: list[str] = []
+        self._keys: list[str | None] = []
+        self._in_string = False
+        self._quote = ""
+        self._escaped = False
+        self._string_chars: list[str] = []
+        self._last_string: str | None = None
+        self._capture: list[str] | None = None
+        self._capture_kind = ""
+
+    def feed(self, chunk: str) -> list[ParsedItem]:
+        """
+        Consume a chunk of model output.
+
+        Args:
+            chunk (str): Next piece of model output text.
+
+        Returns:
+            list[ParsedItem]: Entities and connections completed by this chunk.
+        """
+        items = []
+        for char in chunk:
+            if self.done:
+                break
+            if self._capture is not None:
+                self._capture.append(char)
+            if self._in_string:
+                self._consume_string(char)
+            elif not self._stack and char != "{":
+                continue
+            elif char in "\"'":
+                self._in_string, self._quote, self._string_chars = True, char, []
+            elif char == ":" and self._stack[-1] == "{":
+                self._keys[-1] = self._last_string
+            elif char == "," and self._stack[-1] == "{":
+                self._keys[-1] = None
+            elif char in "{[":
+                self._open(char)
+            elif char in "}]":
+                item = self._close()
+                if item is not None:
+                    items.append(item)
+        return items
+
+    def _consume_string(self, char: str) -> None:
+        if self._escaped:
+            self._escaped = False
+        elif char == "\\":
+            self._escaped = True
+        elif char == self._quote:
+            self._in_string = False
+            self._last_string = "".join(self._string_chars)
+            return
+        self._string_chars.append(char)
+
+    def _open(self, char: str) -> None:
+        collection = self._keys[0] if self._stack == ["{", "["] else None
+        if char == "{" and self._capture is None and collection in self.collections:
+            self._capture = [char]
+            self._capture_kind = self.collections[collection]
+        self._stack.append(char)
+        self._keys.append(None)
+
+    def _close(self) -> ParsedItem | None:
+        if not self._stack:
+            return None
+        self._stack.pop()
+        self._keys.pop()
+        if not self._stack:
+            self.done = True
+        if self._capture is None or len(self._stack) != 2:  # noqa: PLR2004
+            return None
+        text, self._capture = "".join(self._capture), None
+        value = load_object(text)
+        if value is None:
+            return None
+        try:
+            item = self.schemas[self._capture_kind].model_validate(value)
+        except ValidationError:
+            return None
+        return ParsedItem(self._capture_kind, item.model_dump(by_alias=True))
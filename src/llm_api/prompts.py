@@ -0,0 +1,186 @@
+"""Provides prompt templates for each model backend, built once and shared across requests."""
+import hashlib
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import orjson
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
+from langchain_core.prompts.chat import MessageLikeRepresentation
+
+REASK_INSTRUCTION = (
+    "Your reply could not be read as JSON. Reply again with only the JSON object, "
+    "using double quotes for keys and strings, and no other text."
+)
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """
+    A prompt template with a pre-rendered system message prefix.
+
+    Attributes
+        name (str): Name the prompt is registered under.
+        system_prefix (tuple[BaseMessage, ...]): Rendered system messages, shared by every
+            request using this prompt.
+        template (ChatPromptTemplate): Template containing the system prefix followed by
+            the user slot. Formatting it only renders the user slot.
+        version (str): Hash of the prompt content, changing whenever the prompt changes.
+    """
+
+    name: str
+    system_prefix: tuple[BaseMessage, ...]
+    template: ChatPromptTemplate
+    version: str
+
+
+def response_example(connection_description: str) -> str:
+    """
+    Return an example of the JSON models should reply with, serialised compactly.
+
+    Args:
+        connection_description (str): Placeholder for the description of a connection.
+
+    Returns:
+        str: Example response as JSON, without whitespace between tokens.
+    """
+    example = {
+        "entities": [
+            {
+                "uri": "entity name",
+                "description": "entity description",
+                "wikipedia_url": "entity wikipedia url",
+            }
+        ],
+        "connections": [{"from": "uri", "to": "uri", "description": connection_description}],
+    }
+    return orjson.dumps(example).decode()
+
+
+def build_prompt(
+    name: str, system_messages: Sequence[MessageLikeRepresentation], user_template: str = "{text}"
+) -> Prompt:
+    """
+    Render system messages once and build a prompt template around them.
+
+    Args:
+        name (str): Name to register the prompt under.
+        system_messages (Sequence[MessageLikeRepresentation]): System messages, as
+            LangChain messages or `(role, template)` pairs without input variables.
+        user_template (str, optional): Template for the user message. Defaults to "{text}".
+
+    Returns:
+        Prompt: Prompt with its rendered system prefix and version.
+    """
+    system_prefix = tuple(ChatPromptTemplate.from_messages(system_messages).format_messages())
+    template = ChatPromptTemplate.from_messages(
+        [*system_prefix, HumanMessagePromptTemplate.from_template(user_template)]
+    )
+    digest = hashlib.sha256(name.encode())
+    for message in system_prefix:
+        digest.update(f"\x1e{message.type}\x1f{message.content}".encode())
+    digest.update(f"\x1e{user_template}".encode())
+    return Prompt(
+        name=name, system_prefix=system_prefix, template=template, version=digest.hexdigest()[:12]
+    )
+
+
+def build_reask_template(prompt_template: ChatPromptTemplate) -> ChatPromptTemplate:
+    """
+    Extend a prompt template with a model's unreadable reply and a request to answer again.
+
+    The reply is filled in from the `model_output` input variable.
+
+    Args:
+        prompt_template (ChatPromptTemplate): Template the unreadable reply answered.
+
+    Returns:
+        ChatPromptTemplate: Template asking the model to repeat its answer as valid JSON.
+    """
+    return prompt_template + ChatPromptTemplate.from_messages(
+        [("ai", "{model_output}"), ("human", REASK_INSTRUCTION)]
+    )
+
+
+class PromptRegistry:
+    """Hold the prompts used by each backend, keyed by name."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self._prompts: dict[str, Prompt] = {}
+
+    def register(self, prompt: Prompt) -> Prompt:
+        """
+        Register a prompt, replacing any prompt with the same name.
+
+        Args:
+            prompt (Prompt): Prompt to register.
+
+        Returns:
+            Prompt: The registered prompt.
+        """
+        self._prompts[prompt.name] = prompt
+        return prompt
+
+    def get(self, name: str) -> Prompt:
+        """
+        Return a registered prompt.
+
+        Args:
+            name (str): Name the prompt was registered under.
+
+        Returns:
+            Prompt: The registered prompt.
+        """
+        return self._prompts[name]
+
+    @property
+    def versions(self) -> dict[str, str]:
+        """
+        Return the version of each registered prompt.
+
+        Returns
+            dict[str, str]: Prompt versions keyed by prompt name.
+        """
+        return {name: prompt.version for name, prompt in self._prompts.items()}
+
+
+prompt_registry = PromptRegistry()
+
+OPENAI_PROMPT = prompt_registry.register(
+    build_prompt(
+        "openai",
+        [
+            SystemMessage(
+                content=(
+                    "You extract entities and relationships from user searches. "
+                    "For each search, list 5 to 10 entities specific to it, found in it "
+                    "or relevant to it, leaving out any you are unsure are connected. "
+                    "Give each entity's Wikipedia URL, unless you are unsure it is valid. "
+                    "Reply with JSON matching this example, whose keys are literal "
+                    "and values indicative:\n"
+                )
+                + response_example("short paragraph describing entity-entity relationship")
+            ),
+        ],
+    )
+)
+
+BEDROCK_PROMPT = prompt_registry.register(
+    build_prompt(
+        "bedrock",
+        [
+            SystemMessage(
+                content=(
+                    "You extract entities and relationships from user searches, "
+                    "and reply only with JSON, as the user cannot read any other text. "
+                    "For each search, list at least 5 entities specific to it, found in it "
+                    "or relevant to it. Describe the connections between them in 3-5 "
+                    "sentences specific to the search. Reply with JSON matching this "
+                    "example, whose keys are literal and values indicative:\n"
+                )
+                + response_example("paragraph describing entity-entity relationship")
+            ),
+        ],
+    )
+)
@@ -0,0 +1 @@
+"""Protection of the API against failing or overloaded model backends."""
@@ -0,0 +1,239 @@
+"""Provides a circuit breaker failing calls fast while a backend is unhealthy."""
+import math
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import NamedTuple
+
+from llm_api.config import Settings
+from llm_api.metrics import BREAKER_STATE, BREAKER_TRIPS
+
+
+class CircuitOpenError(Exception):
+    """Generate a custom exception for calls refused by an open circuit breaker."""
+
+    def __init__(self, name: str, retry_after: float) -> None:
+        """
+        Class constructor.
+
+        Args:
+            name (str): Name of the circuit breaker refusing the call.
+            retry_after (float): Seconds until the breaker will let calls through again.
+        """
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} is unavailable. Retry after {math.ceil(retry_after)}s.")
+
+
+class BreakerState(StrEnum):
+    """Define the states of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+# Values reported by the state gauge, ordered so the worst state is the largest.
+STATE_VALUES = {BreakerState.CLOSED: 0, BreakerState.HALF_OPEN: 1, BreakerState.OPEN: 2}
+
+
+@dataclass(frozen=True)
+class BreakerConfig:
+    """
+    Thresholds controlling when a circuit breaker trips and recovers.
+
+    Attributes
+        window_seconds (float): Period over which recent calls are counted.
+        min_calls (int): Calls needed in the window before the breaker can trip.
+        failure_rate_threshold (float): Fraction of failed calls that trips the breaker.
+        slow_call_seconds (float): Latency above which a call counts as slow.
+        slow_call_rate_threshold (float): Fraction of slow calls that trips the breaker.
+        open_seconds (float): How long the breaker stays open before probing.
+        half_open_calls (int): Probe calls let through while half open, all of which
+            must succeed for the breaker to close.
+    """
+
+    window_seconds: float = 60.0
+    min_calls: int = 10
+    failure_rate_threshold: float = 0.5
+    slow_call_seconds: float = 30.0
+    slow_call_rate_threshold: float = 0.5
+    open_seconds: float = 30.0
+    half_open_calls: int = 3
+
+    @classmethod
+    def from_settings(cls: type["BreakerConfig"], settings: Settings) -> "BreakerConfig":
+        """
+        Build a breaker configuration from settings.
+
+        Args:
+            settings (Settings): Pydantic settings object.
+
+        Returns:
+            BreakerConfig: Breaker thresholds.
+        """
+        return cls(
+            window_seconds=settings.breaker_window_seconds,
+            min_calls=settings.breaker_min_calls,
+            failure_rate_threshold=settings.breaker_failure_rate_threshold,
+            slow_call_seconds=settings.breaker_slow_call_seconds,
+            slow_call_rate_threshold=settings.breaker_slow_call_rate_threshold,
+            open_seconds=settings.breaker_open_seconds,
+            half_open_calls=settings.breaker_half_open_calls,
+        )
+
+
+class _Call(NamedTuple):
+    finished_at: float
+    failed: bool
+    slow: bool
+
+
+class CircuitBreaker:
+    """
+    Refuse calls to a backend while recent calls to it are failing or slow.
+
+    While closed, calls go through and their outcomes are counted over a sliding
+    window. Once enough calls have been made and the fraction that failed, or
+    that were slow, reaches its threshold, the breaker opens and refuses calls
+    with `CircuitOpenError`. After `open_seconds` it becomes half open, letting
+    a few probe calls through: if they all succeed it closes again, and if any
+    fails it reopens.
+
+    If given a backend, the breaker reports its state and trips in the
+    `llm_api_breaker_state` and `llm_api_breaker_trips` metrics. An open breaker
+    becomes half open when next consulted, so the state metric moves then.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        config: BreakerConfig,
+        clock: Callable[[], float] = time.monotonic,
+        *,
+        backend: str | None = None,
+    ) -> None:
+        """
+        Class constructor.
+
+        Args:
+            name (str): Name of the protected backend, used in error messages.
+            config (BreakerConfig): Thresholds controlling the breaker.
+            clock (Callable[[], float], optional): Monotonic clock in seconds.
+                Defaults to time.monotonic.
+            backend (str | None, optional): Backend label for the breaker's metrics.
+                Defaults to None, for no metrics.
+        """
+        self.name = name
+        self.config = config
+        self.backend = backend
+        self.trips = 0
+        self._clock = clock
+        self._state = BreakerState.CLOSED
+        self._report_state()
+        self._opened_at = 0.0
+        self._calls: deque[_Call] = deque()
+        self._probes_started = 0
+        self._probes_succeeded = 0
+
+    @property
+    def state(self) -> BreakerState:
+        """
+        Return the breaker's state, moving from open to half open once due.
+
+        Returns
+            BreakerState: Current state.
+        """
+        if (
+            self._state is BreakerState.OPEN
+            and self._clock() - self._opened_at >= self.config.open_seconds
+        ):
+            self._state = BreakerState.HALF_OPEN
+            self._probes_started = self._probes_succeeded = 0
+            self._report_state()
+        return self._state
+
+    def check(self) -> None:
+        """
+        Check a call would currently be let through, without reserving a probe slot.
+
+        Raises
+            CircuitOpenError: If the breaker is open, or half open with every
+                probe slot taken.
+        """
+        state = self.state
+        if state is BreakerState.OPEN:
+            retry_after = self.config.open_seconds - (self._clock() - self._opened_at)
+            raise CircuitOpenError(self.name, retry_after)
+        if state is BreakerState.HALF_OPEN and self._probes_started >= self.config.half_open_calls:
+            raise CircuitOpenError(self.name, 1.0)
+
+    def acquire(self) -> None:
+        """
+        Check a call may go through, reserving a probe slot if half open.
+
+        Every call allowed through must be followed by `record` or `release`.
+
+        Raises
+            CircuitOpenError: If the breaker is open, or half open with every
+                probe slot taken.
+        """
+        self.check()
+        if self._state is BreakerState.HALF_OPEN:
+            self._probes_started += 1
+
+    def release(self) -> None:
+        """Give back a call's probe slot without recording an outcome, e.g. if it lost a hedge."""
+        if self._state is BreakerState.HALF_OPEN and self._probes_started:
+            self._probes_started -= 1
+
+    def record(self, seconds: float, *, failed: bool) -> None:
+        """
+        Record the outcome of a call allowed through by `acquire`.
+
+        Args:
+            seconds (float): Latency of the call in seconds.
+            failed (bool): Whether the call failed.
+        """
+        now = self._clock()
+        if self._state is BreakerState.HALF_OPEN:
+            if failed:
+                self._open(now)
+                return
+            self._probes_succeeded += 1
+            if self._probes_succeeded >= self.config.half_open_calls:
+                self._state = BreakerState.CLOSED
+                self._calls.clear()
+                self._report_state()
+            return
+        if self._state is BreakerState.OPEN:
+            return
+
+        self._calls.append(_Call(now, failed, seconds > self.config.slow_call_seconds))
+        while self._calls and now - self._calls[0].finished_at > self.config.window_seconds:
+            self._calls.popleft()
+        calls = len(self._calls)
+        if calls < self.config.min_calls:
+            return
+        failure_rate = sum(call.failed for call in self._calls) / calls
+        slow_call_rate = sum(call.slow for call in self._calls) / calls
+        if (
+            failure_rate >= self.config.failure_rate_threshold
+            or slow_call_rate >= self.config.slow_call_rate_threshold
+        ):
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        self._state = BreakerState.OPEN
+        self._opened_at = now
+        self._calls.clear()
+        self.trips += 1
+        self._report_state()
+        if self.backend is not None:
+            BREAKER_TRIPS.labels(self.backend).inc()
+
+    def _report_state(self) -> None:
+        if self.backend is not None:
+            BREAKER_STATE.labels(self.backend).set(STATE_VALUES[self._state])
@@ -0,0 +1,188 @@
+"""Provides rate limiting of model calls to stay within provider quotas."""
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+
+
+class RateLimitExceededError(Exception):
+    """Generate a custom exception for calls shed because a quota would be exceeded."""
+
+    def __init__(self, name: str, retry_after: float) -> None:
+        """
+        Class constructor.
+
+        Args:
+            name (str): Name of the rate limited backend.
+            retry_after (float): Seconds until the call would fit within the quota.
+        """
+        self.name = name
+        self.retry_after = retry_after
+        message = f"{name} rate limit reached. Retry after {math.ceil(retry_after)}s."
+        super().__init__(message)
+
+
+@dataclass(frozen=True)
+class Budget:
+    """
+    Quotas a backend's calls must stay within.
+
+    Attributes
+        requests_per_minute (int | None): Requests allowed per minute, or None if unlimited.
+        tokens_per_minute (int | None): Tokens allowed per minute, or None if unlimited.
+    """
+
+    requests_per_minute: int | None = None
+    tokens_per_minute: int | None = None
+
+    @property
+    def unlimited(self) -> bool:
+        """
+        Return whether the budget places no limit on calls.
+
+        Returns
+            bool: True if neither quota is set.
+        """
+        return self.requests_per_minute is None and self.tokens_per_minute is None
+
+
+class SQLiteRateLimiter:
+    """
+    Token buckets stored in a SQLite database, shared by every worker on a host.
+
+    Each quota is a bucket holding up to a minute's allowance, refilled
+    continuously. A call takes one request and its estimated tokens from its
+    backend's buckets, waiting for them to refill if needed. Buckets are read
+    and updated in a single immediate transaction, so concurrent workers never
+    spend the same allowance twice. Database errors are logged and the call is
+    let through, so a broken limiter never fails a request.
+
+    Within a worker, calls to a backend queue for its buckets in arrival order,
+    and only the call at the head of the queue waits for them to refill, so a
+    small call arriving later cannot overtake a larger one and starve it past
+    its deadline. Workers contend for the shared buckets without any ordering
+    between them.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """
+        Class constructor.
+
+        Args:
+            path (Path): Location of the database file, created if missing.
+        """
+        self.shed = 0
+        self._lock = threading.Lock()
+        self._queues: dict[str, asyncio.Lock] = {}
+        self._ready_at: dict[str, float] = {}
+        self._connection = sqlite3.connect(
+            path, timeout=5.0, check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    async def acquire(self, name: str, budget: Budget, tokens: int, max_wait: float) -> float:
+        """
+        Take a request and its tokens from a backend's budget, waiting if necessary.
+
+        Time spent queueing behind earlier calls to the backend counts towards
+        `max_wait`.
+
+        Args:
+            name (str): Name of the backend the call is made to.
+            budget (Budget): Quotas for the backend.
+            tokens (int): Estimated tokens used by the call, including its output.
+            max_wait (float): Longest time to wait for the budget to allow the call.
+
+        Raises:
+            RateLimitExceededError: If the call would not fit within the budget in time.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        start_time = time.monotonic()
+        queue = self._queues.setdefault(name, asyncio.Lock())
+        queued = queue.locked()
+        if queued:
+            # The call at the head of the queue is waiting for the buckets to refill.
+            ahead = self._ready_at.get(name, start_time) - start_time
+            if ahead > max_wait:
+                self.shed += 1
+                raise RateLimitExceededError(name, ahead)
+        try:
+            async with asyncio.timeout(max_wait):
+                await queue.acquire()
+        except TimeoutError:
+            self.shed += 1
+            retry_after = max(self._ready_at.get(name, 0.0) - time.monotonic(), 0.0)
+            raise RateLimitExceededError(name, retry_after) from None
+        waited = time.monotonic() - start_time if queued else 0.0
+        try:
+            while True:
+                try:
+                    wait = await asyncio.to_thread(self._take, name, budget, tokens)
+                except sqlite3.Error as sqlite_error:
+                    logger.warning(f"Rate limiter unavailable, allowing call. {sqlite_error}")
+                    return waited
+                if wait == 0:
+                    return waited
+                if waited + wait > max_wait:
+                    self.shed += 1
+                    raise RateLimitExceededError(name, wait)
+                self._ready_at[name] = time.monotonic() + wait
+                await asyncio.sleep(wait)
+                waited += wait
+        finally:
+            queue.release()
+
+    async def aclose(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def _take(self, name: str, budget: Budget, tokens: int) -> float:
+        # A call larger than a whole minute's allowance waits for a full bucket.
+        buckets = [
+            (bucket, per_minute, min(cost, per_minute))
+            for bucket, per_minute, cost in (
+                (f"{name}:requests", budget.requests_per_minute, 1),
+                (f"{name}:tokens", budget.tokens_per_minute, tokens),
+            )
+            if per_minute is not None
+        ]
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                levels = []
+                wait = 0.0
+                for bucket, per_minute, cost in buckets:
+                    row = self._connection.execute(
+                        "SELECT tokens, updated_at FROM buckets WHERE name = ?", (bucket,)
+                    ).fetchone()
+                    rate = per_minute / 60
+                    level = per_minute if row is None else row[0] + (now - row[1]) * rate
+                    level = min(level, per_minute)
+                    levels.append((bucket, level - cost))
+                    wait = max(wait, (cost - level) / rate)
+                if wait <= 0:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) "
+                        "VALUES (?, ?, ?)",
+                        [(bucket, remaining, now) for bucket, remaining in levels],
+                    )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return max(wait, 0.0)
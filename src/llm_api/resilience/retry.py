@@ -0,0 +1,207 @@
+"""Provides request deadlines and retries of transient model call failures."""
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from fastapi import Depends, Header
+from loguru import logger
+
+from llm_api.config import Settings, get_settings
+
+T = TypeVar("T")
+
+_random = random.Random()
+
+RETRYABLE_AWS_ERROR_CODES = frozenset(
+    {
+        "ThrottlingException",
+        "TooManyRequestsException",
+        "ServiceUnavailableException",
+        "ModelNotReadyException",
+        "InternalServerException",
+    }
+)
+
+
+class DeadlineExceededError(Exception):
+    """Generate a custom exception for requests whose deadline passes before the model answers."""
+
+
+class Deadline:
+    """The time by which a request must be answered."""
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Class constructor.
+
+        Args:
+            seconds (float): Time from now until the deadline, in seconds.
+            clock (Callable[[], float], optional): Monotonic clock in seconds.
+                Defaults to time.monotonic.
+        """
+        self.seconds = seconds
+        self._clock = clock
+        self._expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        """
+        Return the time left until the deadline.
+
+        Returns
+            float: Seconds left, or 0 once the deadline has passed.
+        """
+        return max(self._expires_at - self._clock(), 0.0)
+
+
+def request_deadline(
+    x_request_timeout: float | None = Header(default=None, gt=0),
+    settings: Settings = Depends(get_settings),  # noqa: B008
+) -> Deadline:
+    """
+    Start the deadline for a request, from its `X-Request-Timeout` header or the default.
+
+    Args:
+        x_request_timeout (float | None): Seconds the client will wait for a response,
+            from the `X-Request-Timeout` request header.
+        settings (Settings): Injected settings object providing the default timeout.
+
+    Returns:
+        Deadline: Deadline for the request.
+    """
+    return Deadline(x_request_timeout or settings.request_timeout_seconds)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Limits on retrying failed model calls.
+
+    Attributes
+        max_retries (int): Most retries made after the first attempt.
+        base_delay_seconds (float): Backoff before the first retry, doubled for each
+            retry after it.
+        max_delay_seconds (float): Cap on the backoff between attempts.
+    """
+
+    max_retries: int = 3
+    base_delay_seconds: float = 0.5
+    max_delay_seconds: float = 8.0
+
+    @classmethod
+    def from_settings(cls: type["RetryPolicy"], settings: Settings) -> "RetryPolicy":
+        """
+        Build a retry policy from settings.
+
+        Args:
+            settings (Settings): Pydantic settings object.
+
+        Returns:
+            RetryPolicy: Retry limits.
+        """
+        return cls(
+            max_retries=settings.retry_max_retries,
+            base_delay_seconds=settings.retry_base_delay_seconds,
+            max_delay_seconds=settings.retry_max_delay_seconds,
+        )
+
+    def backoff(self, retry: int, rng: random.Random) -> float:
+        """
+        Return the delay before a retry, using exponential backoff with full jitter.
+
+        Args:
+            retry (int): Number of retries already made.
+            rng (random.Random): Random number generator used for jitter.
+
+        Returns:
+            float: Delay in seconds, between 0 and the capped exponential backoff.
+        """
+        return rng.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2**retry))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Return whether an error, or any error that caused it, is worth retrying.
+
+    Rate limiting, throttling, connection failures and server errors are retried.
+    Caller errors, such as a bad request or unparseable model output, are not.
+    Provider SDKs are imported here rather than with this module, since any error
+    they raise means they are already loaded.
+
+    Args:
+        error (BaseException): Error raised by a model call.
+
+    Returns:
+        bool: True if the call may succeed if retried.
+    """
+    import botocore.exceptions
+    import openai
+
+    retryable_errors = (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+        botocore.exceptions.ConnectionError,
+        botocore.exceptions.ReadTimeoutError,
+    )
+    seen: set[int] = set()
+    current: BaseException | None = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if isinstance(current, retryable_errors):
+            return True
+        if isinstance(current, botocore.exceptions.ClientError):
+            return current.response.get("Error", {}).get("Code") in RETRYABLE_AWS_ERROR_CODES
+        current = current.__cause__ or current.__context__
+    return False
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[T]],
+    deadline: Deadline,
+    policy: RetryPolicy,
+    errors: tuple[type[Exception], ...],
+    rng: random.Random | None = None,
+) -> tuple[T, int]:
+    """
+    Make a call, retrying retryable failures while the deadline allows.
+
+    Each attempt is bounded by the time left until the deadline. A failure is
+    retried only if it is retryable, the retry limit has not been reached, and
+    the backoff before the next attempt ends before the deadline.
+
+    Args:
+        call (Callable[[], Awaitable[T]]): Makes one attempt at the call.
+        deadline (Deadline): Deadline for the request the call is made for.
+        policy (RetryPolicy): Limits on retrying.
+        errors (tuple[type[Exception], ...]): Errors that may be retried, if retryable.
+        rng (random.Random | None, optional): Random number generator used for jitter.
+            Defaults to None, for a shared generator.
+
+    Raises:
+        DeadlineExceededError: If the deadline passes during an attempt.
+        Exception: The last attempt's error, if it is not retried.
+
+    Returns:
+        tuple[T, int]: The call's result and the number of retries made.
+    """
+    rng = rng or _random
+    retries = 0
+    while True:
+        try:
+            async with asyncio.timeout(deadline.remaining()):
+                return await call(), retries
+        except TimeoutError as timeout_error:
+            message = f"Request deadline of {deadline.seconds}s exceeded."
+            raise DeadlineExceededError(message) from timeout_error
+        except errors as call_error:
+            if not is_retryable(call_error) or retries >= policy.max_retries:
+                raise
+            delay = policy.backoff(retries, rng)
+            if delay >= deadline.remaining():
+                raise
+            retries += 1
+            logger.warning(f"Retrying model call in {delay:.2f}s, retry {retries}: {call_error}")
+            await asyncio.sleep(delay)
@@ -0,0 +1,158 @@
+"""Define router containing administrative operations."""
+import secrets
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from pydantic import ValidationError
+
+from llm_api.backends.registry import CallerRegistry, get_caller_registry, reload_callers
+from llm_api.config import Backend, Settings, get_settings
+from llm_api.hedging import Hedger, get_hedger
+from llm_api.routing import AdaptiveRouter, get_router
+from llm_api.service import ModelService, get_model_service
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def verify_admin_token(
+    x_admin_token: str | None = Header(default=None),
+    settings: Settings = Depends(get_settings),  # noqa: B008
+) -> None:
+    """
+    Check the admin token supplied with a request.
+
+    Admin routes are disabled unless `LLM_API_ADMIN_TOKEN` is set.
+
+    Args:
+        x_admin_token (str | None): Token from the `X-Admin-Token` request header.
+        settings (Settings): Injected settings object holding the expected token.
+
+    Raises:
+        HTTPException: 404 if admin routes are disabled, 403 if the token is wrong.
+    """
+    if settings.admin_token is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    expected_token = settings.admin_token.get_secret_value()
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, expected_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token.")
+
+
+@router.post("/reload", dependencies=[Depends(verify_admin_token)])
+async def reload(
+    callers: CallerRegistry = Depends(get_caller_registry),  # noqa: B008
+) -> dict[str, str]:
+    """
+    Reload settings and rebuild model callers in the worker handling this request.
+
+    Args:
+        callers (CallerRegistry): Injected registry of model callers shared across requests.
+
+    Raises:
+        HTTPException: If the new settings fail validation. Current settings are kept.
+
+    Returns:
+        dict[str, str]: Dictionary containing response
+    """
+    try:
+        await reload_callers(callers)
+    except ValidationError as validation_error:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Invalid settings, reload aborted. {validation_error.error_count()} errors.",
+        ) from validation_error
+    return {"status": "reloaded"}
+
+
+@router.get("/cache", dependencies=[Depends(verify_admin_token)])
+async def cache_stats(
+    service: ModelService = Depends(get_model_service),  # noqa: B008
+) -> dict[str, dict[str, int]]:
+    """
+    Report response cache counters for the worker handling this request.
+
+    Args:
+        service (ModelService): Injected service holding the response caches.
+
+    Returns:
+        dict[str, dict[str, int]]: Hit, miss, eviction and expiration counts for
+            each cache tier, with current entry count and size for the worker's cache,
+            entry count for the semantic cache, and counts of in-flight and coalesced
+            model calls.
+    """
+    cache = service.cache
+    stats = {
+        "memory": {**asdict(cache.stats), "entries": len(cache), "size_bytes": cache.size_bytes}
+    }
+    if service.shared_cache is not None:
+        stats["shared"] = asdict(service.shared_cache.stats)
+    if service.semantic_cache is not None:
+        semantic_cache = service.semantic_cache
+        stats["semantic"] = {**asdict(semantic_cache.stats), "entries": len(semantic_cache)}
+    stats["in_flight"] = {"calls": len(service.in_flight), "coalesced": service.in_flight.coalesced}
+    return stats
+
+
+@router.get("/hedging", dependencies=[Depends(verify_admin_token)])
+async def hedging_stats(
+    hedger: Hedger = Depends(get_hedger),  # noqa: B008
+) -> dict[str, float | dict[str, float]]:
+    """
+    Report hedged call counters for the worker handling this request.
+
+    Args:
+        hedger (Hedger): Injected hedger used for hedged model calls.
+
+    Returns:
+        dict[str, float | dict[str, float]]: Hedged call, hedge and secondary win
+            counts and rates, with the current hedging delay for each primary backend.
+    """
+    stats = hedger.stats
+    return {
+        **asdict(stats),
+        "hedge_rate": stats.hedge_rate,
+        "win_rate": stats.win_rate,
+        "delay_seconds": {backend: hedger.delay(backend) for backend in Backend},
+    }
+
+
+@router.get("/routing", dependencies=[Depends(verify_admin_token)])
+async def routing_stats(
+    adaptive_router: AdaptiveRouter = Depends(get_router),  # noqa: B008
+) -> dict[str, int | list[dict[str, str | int | float | None]]]:
+    """
+    Report the adaptive router's view of each backend for the worker handling this request.
+
+    Args:
+        adaptive_router (AdaptiveRouter): Injected router used for `/call_model` requests.
+
+    Returns:
+        dict[str, int | list[dict[str, str | int | float | None]]]: Moving averages of
+            latency, error rate, parse failure rate and on-time rate for each model
+            called, and the number of probes sent.
+    """
+    models = [
+        {"backend": backend, "model": model, **asdict(stats)}
+        for (backend, model), stats in adaptive_router.stats.items()
+    ]
+    for model_stats in models:
+        del model_stats["checked_at"]
+    return {"probes": adaptive_router.probes, "models": models}
+
+
+@router.get("/breakers", dependencies=[Depends(verify_admin_token)])
+async def breaker_states(
+    service: ModelService = Depends(get_model_service),  # noqa: B008
+) -> dict[str, dict[str, str | int]]:
+    """
+    Report the circuit breaker state of each backend for the worker handling this request.
+
+    Args:
+        service (ModelService): Injected service holding the circuit breakers.
+
+    Returns:
+        dict[str, dict[str, str | int]]: State and number of trips for each backend.
+    """
+    return {
+        backend: {"state": service.breaker(backend).state, "trips": service.breaker(backend).trips}
+        for backend in Backend
+    }
@@ -0,0 +1,225 @@
+"""Define router calling models for many user searches in one request."""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from llm_api.config import Backend, Settings, get_settings
+from llm_api.resilience.retry import DeadlineExceededError
+from llm_api.routers.model_calling import InputDataSpec
+from llm_api.schemas import ModelResponse
+from llm_api.service import (
+    MODEL_CALL_ERRORS,
+    UNAVAILABLE_ERRORS,
+    ModelService,
+    get_model_service,
+)
+
+router = APIRouter(tags=["batch"])
+
+
+class BatchInputSpec(BaseModel):
+    """
+    Data required in each batch POST request.
+
+    Args:
+        BaseModel (_type_): Pydantic BaseModel
+
+    Attributes:
+        backend (Backend): Backend every search is sent to. Defaults to OpenAI.
+        items (list[InputDataSpec]): User searches, each as in a single model call.
+        stream (bool): Stream results as newline-delimited JSON as each one finishes,
+            instead of returning them all in order at the end.
+    """
+
+    backend: Backend = Backend.OPENAI
+    items: list[InputDataSpec] = Field(min_length=1)
+    stream: bool = False
+
+
+class BatchItemResult(BaseModel):
+    """
+    Outcome of the model call for one item in a batch.
+
+    Args:
+        BaseModel (_type_): Pydantic BaseModel
+
+    Attributes:
+        index (int): Position of the item in the request.
+        user_search (str): The item's user search.
+        response (ModelResponse | None): Model JSON response, if the call succeeded.
+        error (str | None): Error details, if the call failed.
+        cache_hit (bool): Whether the response was served from a cache.
+    """
+
+    index: int
+    user_search: str
+    response: ModelResponse | None = None
+    error: str | None = None
+    cache_hit: bool = False
+
+
+class BatchResponse(BaseModel):
+    """
+    Results of a batch request, in the order of the request's items.
+
+    Args:
+        BaseModel (_type_): Pydantic BaseModel
+
+    Attributes:
+        results (list[BatchItemResult]): Outcome of each item.
+    """
+
+    results: list[BatchItemResult]
+
+
+def get_batch_semaphore(request: Request) -> asyncio.Semaphore:
+    """
+    Return the semaphore bounding concurrent batch model calls in this worker.
+
+    Args:
+        request (Request): Incoming request, used to access application state.
+
+    Returns:
+        asyncio.Semaphore: Semaphore shared by all batch requests.
+    """
+    return request.app.state.batch_semaphore
+
+
+async def call_item(
+    service: ModelService,
+    semaphore: asyncio.Semaphore,
+    backend: Backend,
+    index: int,
+    user_search: str,
+) -> BatchItemResult:
+    """
+    Call a model for one batch item, recording any error instead of raising it.
+
+    Args:
+        service (ModelService): Service used to call models.
+        semaphore (asyncio.Semaphore): Semaphore bounding concurrent model calls.
+        backend (Backend): Backend to send the search to.
+        index (int): Position of the item in the request.
+        user_search (str): The item's user search.
+
+    Returns:
+        BatchItemResult: Outcome of the model call.
+    """
+    async with semaphore:
+        try:
+            result = await service.call(backend, user_search)
+        except MODEL_CALL_ERRORS as model_call_error:
+            error = f"Error calling model. {model_call_error}"
+            return BatchItemResult(index=index, user_search=user_search, error=error)
+        except (*UNAVAILABLE_ERRORS, DeadlineExceededError) as unavailable_error:
+            return BatchItemResult(
+                index=index, user_search=user_search, error=str(unavailable_error)
+            )
+    return BatchItemResult(
+        index=index,
+        user_search=user_search,
+        response=ModelResponse.model_validate(result.response),
+        cache_hit=result.cache_hit,
+    )
+
+
+def start_calls(
+    service: ModelService, semaphore: asyncio.Semaphore, request_body: BatchInputSpec
+) -> list[asyncio.Task[BatchItemResult]]:
+    """
+    Start a task calling a model for each batch item.
+
+    Args:
+        service (ModelService): Service used to call models.
+        semaphore (asyncio.Semaphore): Semaphore bounding concurrent model calls.
+        request_body (BatchInputSpec): Request body containing the backend and user searches.
+
+    Returns:
+        list[asyncio.Task[BatchItemResult]]: Tasks calling a model for each item, in
+            request order.
+    """
+    return [
+        asyncio.create_task(
+            call_item(service, semaphore, request_body.backend, index, item.user_search)
+        )
+        for index, item in enumerate(request_body.items)
+    ]
+
+
+async def generate_lines(
+    service: ModelService, semaphore: asyncio.Semaphore, request_body: BatchInputSpec
+) -> AsyncIterator[str]:
+    """
+    Generate a line of JSON for each batch item as its model call finishes.
+
+    Calls are only started once the response body is read, so none are left
+    running if the client disconnects first. Outstanding calls are cancelled if
+    the client stops reading.
+
+    Args:
+        service (ModelService): Service used to call models.
+        semaphore (asyncio.Semaphore): Semaphore bounding concurrent model calls.
+        request_body (BatchInputSpec): Request body containing the backend and user searches.
+
+    Yields:
+        str: A batch item result as newline-delimited JSON.
+    """
+    tasks = start_calls(service, semaphore, request_body)
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            yield result.model_dump_json(by_alias=True) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/call_model_batch", response_model=BatchResponse)
+async def call_model_batch(
+    request_body: BatchInputSpec,
+    service: ModelService = Depends(get_model_service),  # noqa: B008
+    semaphore: asyncio.Semaphore = Depends(get_batch_semaphore),  # noqa: B008
+    settings: Settings = Depends(get_settings),  # noqa: B008
+) -> ORJSONResponse | StreamingResponse:
+    """
+    Call a language model for each of many user searches.
+
+    Searches are sent concurrently, with the number of model calls in flight
+    across all batch requests in a worker bounded by `LLM_API_BATCH_CONCURRENCY`.
+    A failed call is reported in that item's result without failing the batch.
+
+    Args:
+        request_body (BatchInputSpec): Request body containing the backend and user searches.
+        service (ModelService): Injected service used to call models.
+        semaphore (asyncio.Semaphore): Injected semaphore bounding concurrent model calls.
+        settings (Settings): Injected settings object providing the batch size limit.
+
+    Raises:
+        HTTPException: If the batch has more items than allowed.
+
+    Returns:
+        ORJSONResponse | StreamingResponse: Results in request order, as a
+            `BatchResponse`, or a stream of newline-delimited JSON results in
+            completion order if requested.
+    """
+    if len(request_body.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch exceeds the maximum of {settings.batch_max_items} items.",
+        )
+    if request_body.stream:
+        return StreamingResponse(
+            generate_lines(service, semaphore, request_body), media_type="application/x-ndjson"
+        )
+
+    start_time = time.time()
+    results = await asyncio.gather(*start_calls(service, semaphore, request_body))
+    end_time = time.time()
+    logger.info(f"Batch of {len(results)} {request_body.backend}: {end_time - start_time}s")
+    return ORJSONResponse(BatchResponse(results=results).model_dump(by_alias=True))
@@ -2,13 +2,20 @@
 
 import time
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from loguru import logger
-from pydantic import BaseModel
-
-from llm_api.backends.bedrock import BedrockCaller, BedrockModelCallError
-from llm_api.backends.openai import OpenaiCaller, OpenaiModelCallError
-from llm_api.config import BedrockModel, Settings, get_settings
+from opentelemetry import trace
+from pydantic import BaseModel, field_validator, model_validator
+
+from llm_api.backends.errors import BedrockModelCallError, OpenaiModelCallError
+from llm_api.config import Backend, get_settings
+from llm_api.hedging import Hedger, get_hedger
+from llm_api.resilience.retry import Deadline, request_deadline
+from llm_api.routing import AdaptiveRouter, get_router
+from llm_api.schemas import SearchResponse
+from llm_api.service import MODEL_CALL_ERRORS, ModelCallResult, ModelService, get_model_service
+from llm_api.tokens import check_input_length
 
 router = APIRouter()
 
@@ -45,42 +52,182 @@ class InputDataSpec(BaseModel):
         BaseModel (_type_): Pydantic BaseModel
 
     Attributes:
-        user_search (str): A user's search as a string. Required variable.
+        user_search (str): A user's search as a string. Required variable. Searches
+            longer than `LLM_API_MAX_INPUT_TOKENS` are rejected before any model
+            is called.
     """
 
     user_search: str
 
+    @field_validator("user_search")
+    @classmethod
+    def check_input_length(cls: type["InputDataSpec"], user_search: str) -> str:
+        """
+        Check the search is short enough to send to a model.
+
+        Raises
+            InputTooLongError: If the search has more tokens than allowed.
+
+        Returns
+            str: The validated search.
+        """
+        check_input_length(user_search, get_settings().max_input_tokens)
+        return user_search
+
+
+class HedgedInputSpec(InputDataSpec):
+    """
+    Data required in each hedged POST request.
+
+    Args:
+        InputDataSpec (_type_): Data required in each POST request.
+
+    Attributes:
+        primary (Backend): Backend the search is sent to first. Defaults to OpenAI.
+        secondary (Backend): Backend the search is also sent to if the primary is
+            slow or fails. Defaults to Claude Instant via AWS Bedrock.
+    """
+
+    primary: Backend = Backend.OPENAI
+    secondary: Backend = Backend.BEDROCK_INSTANT
+
+    @model_validator(mode="after")
+    def check_backends_differ(self) -> "HedgedInputSpec":
+        """
+        Check the primary and secondary backends are different.
+
+        Raises
+            ValueError: If both backends are the same.
+
+        Returns
+            HedgedInputSpec: The validated request body.
+        """
+        if self.primary is self.secondary:
+            msg = "Primary and secondary backends must differ."
+            raise ValueError(msg)
+        return self
+
+
+def search_response(result: ModelCallResult, user_search: str) -> ORJSONResponse:
+    """
+    Build the response to a user search from a model call, serialised with orjson.
+
+    Model output is validated against the response schema when it is parsed, so
+    it is serialised directly instead of being validated again. The response
+    reports whether it was served from the cache in the `X-Cache` header, how
+    often the model call was retried in the `X-Upstream-Retries` header, and the
+    tokens sent and generated in the `X-Prompt-Tokens` and `X-Completion-Tokens`
+    headers. The same details, with the model called and the response size, are
+    recorded on the request's trace span.
+
+    Args:
+        result (ModelCallResult): Result of the model call.
+        user_search (str): User's search as a string.
+
+    Returns:
+        ORJSONResponse: Model JSON response with the user search added.
+    """
+    response = ORJSONResponse({**result.response, "user_search": user_search})
+    response.headers["X-Cache"] = "hit" if result.cache_hit else "miss"
+    response.headers["X-Upstream-Retries"] = str(result.retries)
+    response.headers["X-Prompt-Tokens"] = str(result.usage.prompt_tokens)
+    response.headers["X-Completion-Tokens"] = str(result.usage.completion_tokens)
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.set_attributes(
+            {
+                "llm.backend": result.target.backend,
+                "llm.model": result.target.model,
+                "llm.cache.tier": result.cache_tier or "none",
+                "llm.coalesced": result.coalesced,
+                "llm.retries": result.retries,
+                "llm.usage.prompt_tokens": result.usage.prompt_tokens,
+                "llm.usage.completion_tokens": result.usage.completion_tokens,
+                "llm.response.chars": len(response.body),
+            }
+        )
+    return response
 
-@router.post("/call_model_openai")
+
+@router.post("/call_model", response_model=SearchResponse)
+async def call_model(
+    request_body: InputDataSpec,
+    adaptive_router: AdaptiveRouter = Depends(get_router),  # noqa: B008
+    x_cache_bypass: bool = Header(default=False),  # noqa: FBT001
+    deadline: Deadline = Depends(request_deadline),  # noqa: B008
+) -> ORJSONResponse:
+    """
+    Call whichever language model backend is most likely to answer a user search quickly.
+
+    The backend that answered is reported in the `X-Backend` header.
+
+    Args:
+        request_body (InputDataSpec): Request body for post requests, containing user search.
+        adaptive_router (AdaptiveRouter): Injected router choosing the backend to call.
+        x_cache_bypass (bool): Skip the response cache, from the `X-Cache-Bypass` header.
+        deadline (Deadline): Injected deadline, from the `X-Request-Timeout` header or
+            `LLM_API_REQUEST_TIMEOUT_SECONDS`.
+
+    Raises:
+        ModelCallingError: HTTP status code raised if every backend fails, without
+            having the API fall over.
+
+    Returns:
+        ORJSONResponse: Model JSON response from the backend chosen.
+    """
+    start_time = time.time()
+    try:
+        result = await adaptive_router.call(
+            request_body.user_search, bypass_cache=x_cache_bypass, deadline=deadline
+        )
+    except MODEL_CALL_ERRORS as model_call_error:
+        raise ModelCallingError(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error calling model. {model_call_error}",
+        ) from model_call_error
+    response = search_response(result, request_body.user_search)
+    response.headers["X-Backend"] = result.target.backend
+    end_time = time.time()
+    logger.info(f"Routed {result.target.model}: {end_time - start_time}s")
+    return response
+
+
+@router.post("/call_model_openai", response_model=SearchResponse)
 async def call_model_openai(
     request_body: InputDataSpec,
-    settings: Settings = Depends(get_settings),  # noqa: B008
-) -> dict:
+    service: ModelService = Depends(get_model_service),  # noqa: B008
+    x_cache_bypass: bool = Header(default=False),  # noqa: FBT001
+    deadline: Deadline = Depends(request_deadline),  # noqa: B008
+) -> ORJSONResponse:
     """
     Call an OpenAI language model with the provided user search as prompt input.
 
     Args:
         request_body (InputDataSpec): Request body for post requests, containing user search.
-        settings (settings): Injected settings object to provide API keys and model names.
-            Is fetched from server-side.
+        service (ModelService): Injected service used to call models.
+        x_cache_bypass (bool): Skip the response cache, from the `X-Cache-Bypass` header.
+        deadline (Deadline): Injected deadline, from the `X-Request-Timeout` header or
+            `LLM_API_REQUEST_TIMEOUT_SECONDS`.
 
     Raises:
         ModelCallingError: HTTP status code raised in the case of a bad model call, without
             having the API fall over.
 
     Returns:
-        _type_: _description_
+        ORJSONResponse: Model JSON response with the user search added.
     """
     start_time = time.time()
-    caller = OpenaiCaller(settings)
-
-    prompt_template = OpenaiCaller.generate_openai_prompt()
     try:
-        model_response = await caller.call_model(prompt_template, request_body.user_search)
-        model_response.update({"user_search": request_body.user_search})
+        result = await service.call(
+            Backend.OPENAI,
+            request_body.user_search,
+            bypass_cache=x_cache_bypass,
+            deadline=deadline,
+        )
+        response = search_response(result, request_body.user_search)
         end_time = time.time()
         logger.info(f"GPT4: {end_time - start_time}s")
-        return model_response  # noqa: TRY300
+        return response  # noqa: TRY300
     except OpenaiModelCallError as model_call_error:
         raise ModelCallingError(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -88,36 +235,42 @@ async def call_model_openai(
         ) from model_call_error
 
 
-@router.post("/call_model_bedrock")
+@router.post("/call_model_bedrock", response_model=SearchResponse)
 async def call_model_bedrock(
     request_body: InputDataSpec,
-    settings: Settings = Depends(get_settings),  # noqa: B008
-) -> dict:
+    service: ModelService = Depends(get_model_service),  # noqa: B008
+    x_cache_bypass: bool = Header(default=False),  # noqa: FBT001
+    deadline: Deadline = Depends(request_deadline),  # noqa: B008
+) -> ORJSONResponse:
     """
     Call the Claude v2 Large Language Model via AWS Bedrock with a user search as prompt input.
 
     Args:
         request_body (InputDataSpec): Request body for post requests, containing user search.
-        settings (settings): Injected settings object to provide API keys and model names.
-            Is fetched from server-side.
+        service (ModelService): Injected service used to call models.
+        x_cache_bypass (bool): Skip the response cache, from the `X-Cache-Bypass` header.
+        deadline (Deadline): Injected deadline, from the `X-Request-Timeout` header or
+            `LLM_API_REQUEST_TIMEOUT_SECONDS`.
 
     Raises:
         ModelCallingError: HTTP status code raised in the case of a bad model call, without
             having the API fall over.
 
     Returns:
-        _type_: _description_
+        ORJSONResponse: Model JSON response with the user search added.
     """
     start_time = time.time()
-    caller = BedrockCaller(settings)
-
-    prompt_template = BedrockCaller.generate_prompt()
     try:
-        model_response = await caller.call_model(prompt_template, request_body.user_search)
-        model_response.update({"user_search": request_body.user_search})
+        result = await service.call(
+            Backend.BEDROCK,
+            request_body.user_search,
+            bypass_cache=x_cache_bypass,
+            deadline=deadline,
+        )
+        response = search_response(result, request_body.user_search)
         end_time = time.time()
         logger.info(f"Claude 2: {end_time - start_time}s")
-        return model_response  # noqa: TRY300
+        return response  # noqa: TRY300
     except BedrockModelCallError as model_call_error:
         raise ModelCallingError(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -125,40 +278,95 @@ async def call_model_bedrock(
         ) from model_call_error
 
 
-@router.post("/call_model_bedrock_instant")
+@router.post("/call_model_bedrock_instant", response_model=SearchResponse)
 async def call_model_bedrock_instant(
     request_body: InputDataSpec,
-    settings: Settings = Depends(get_settings),  # noqa: B008
-) -> dict:
+    service: ModelService = Depends(get_model_service),  # noqa: B008
+    x_cache_bypass: bool = Header(default=False),  # noqa: FBT001
+    deadline: Deadline = Depends(request_deadline),  # noqa: B008
+) -> ORJSONResponse:
     """
     Call the Claude Instant v1.2 Large Language Model via AWS Bedrock with a user search.
 
     Args:
         request_body (InputDataSpec): Request body for post requests, containing user search.
-        settings (settings): Injected settings object to provide API keys and model names.
-            Is fetched from server-side.
+        service (ModelService): Injected service used to call models.
+        x_cache_bypass (bool): Skip the response cache, from the `X-Cache-Bypass` header.
+        deadline (Deadline): Injected deadline, from the `X-Request-Timeout` header or
+            `LLM_API_REQUEST_TIMEOUT_SECONDS`.
 
     Raises:
         ModelCallingError: HTTP status code raised in the case of a bad model call, without
             having the API fall over.
 
     Returns:
-        _type_: _description_
+        ORJSONResponse: Model JSON response with the user search added.
     """
     start_time = time.time()
-    caller = BedrockCaller(settings)
-
-    prompt_template = BedrockCaller.generate_prompt()
     try:
-        model_response = await caller.call_model(
-            prompt_template, request_body.user_search, alternative_model=BedrockModel.CLAUDE_INSTANT
+        result = await service.call(
+            Backend.BEDROCK_INSTANT,
+            request_body.user_search,
+            bypass_cache=x_cache_bypass,
+            deadline=deadline,
         )
-        model_response.update({"user_search": request_body.user_search})
+        response = search_response(result, request_body.user_search)
         end_time = time.time()
         logger.info(f"Claude instant v1.2 {end_time - start_time}s")
-        return model_response  # noqa: TRY300
+        return response  # noqa: TRY300
     except BedrockModelCallError as model_call_error:
         raise ModelCallingError(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error calling model. {model_call_error}",
         ) from model_call_error
+
+
+@router.post("/call_model_hedged", response_model=SearchResponse)
+async def call_model_hedged(
+    request_body: HedgedInputSpec,
+    hedger: Hedger = Depends(get_hedger),  # noqa: B008
+    x_cache_bypass: bool = Header(default=False),  # noqa: FBT001
+    deadline: Deadline = Depends(request_deadline),  # noqa: B008
+) -> ORJSONResponse:
+    """
+    Call a primary model backend, racing a secondary backend against it if it is slow.
+
+    The backend that answered is reported in the `X-Backend` header, and whether
+    the secondary backend was called in the `X-Hedged` header.
+
+    Args:
+        request_body (HedgedInputSpec): Request body for post requests, containing user
+            search and the backends to call.
+        hedger (Hedger): Injected hedger used for hedged model calls.
+        x_cache_bypass (bool): Skip the response cache, from the `X-Cache-Bypass` header.
+        deadline (Deadline): Injected deadline, from the `X-Request-Timeout` header or
+            `LLM_API_REQUEST_TIMEOUT_SECONDS`.
+
+    Raises:
+        ModelCallingError: HTTP status code raised if both backends fail, without
+            having the API fall over.
+
+    Returns:
+        ORJSONResponse: Model JSON response from whichever backend answered first.
+    """
+    start_time = time.time()
+    try:
+        hedged_result = await hedger.call(
+            request_body.primary,
+            request_body.secondary,
+            request_body.user_search,
+            bypass_cache=x_cache_bypass,
+            deadline=deadline,
+        )
+    except MODEL_CALL_ERRORS as model_call_error:
+        raise ModelCallingError(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error calling model. {model_call_error}",
+        ) from model_call_error
+    result = hedged_result.result
+    response = search_response(result, request_body.user_search)
+    response.headers["X-Backend"] = result.target.backend
+    response.headers["X-Hedged"] = str(hedged_result.hedged).lower()
+    end_time = time.time()
+    logger.info(f"Hedged {result.target.model}: {end_time - start_time}s")
+    return response
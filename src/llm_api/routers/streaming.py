@@ -0,0 +1,179 @@
+"""Define router streaming model responses as Server-Sent Events."""
+
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+import orjson
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from llm_api.config import Backend
+from llm_api.routers.model_calling import InputDataSpec
+from llm_api.service import (
+    MODEL_CALL_ERRORS,
+    UNAVAILABLE_ERRORS,
+    BackendTarget,
+    ModelCallResult,
+    ModelService,
+    get_model_service,
+)
+
+router = APIRouter(prefix="/stream", tags=["streaming"])
+
+
+def format_event(event: str, data: Any) -> str:  # noqa: ANN401
+    """
+    Format a Server-Sent Event with a JSON payload.
+
+    Args:
+        event (str): Event name.
+        data (Any): JSON serialisable event payload.
+
+    Returns:
+        str: Event in the `text/event-stream` format.
+    """
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+async def generate_events(
+    service: ModelService,
+    target: BackendTarget,
+    user_search: str,
+    cached_result: ModelCallResult | None,
+) -> AsyncIterator[str]:
+    """
+    Generate the events streamed for a model call.
+
+    Model output is sent in "chunk" events as it arrives, with "entity" and
+    "connection" events as each object in it completes. The stream ends with a
+    "result" event carrying the parsed response, or an "error" event if the
+    call fails. Cached responses are sent as a single "result" event.
+
+    Args:
+        service (ModelService): Service used to call models.
+        target (BackendTarget): Model to call.
+        user_search (str): User's search as a string.
+        cached_result (ModelCallResult | None): Cached response, if any.
+
+    Yields:
+        str: Formatted Server-Sent Events.
+    """
+    start_time = time.time()
+    if cached_result is not None:
+        yield format_event("result", {**cached_result.response, "user_search": user_search})
+        return
+    try:
+        async for event in service.stream(target, user_search):
+            data = event.data
+            if event.event == "result":
+                data = {**data, "user_search": user_search}
+            yield format_event(event.event, data)
+    except MODEL_CALL_ERRORS as model_call_error:
+        yield format_event("error", {"detail": f"Error calling model. {model_call_error}"})
+    except UNAVAILABLE_ERRORS as unavailable_error:
+        yield format_event("error", {"detail": str(unavailable_error)})
+    end_time = time.time()
+    logger.info(f"Streamed {target.model}: {end_time - start_time}s")
+
+
+async def stream_model_response(
+    backend: Backend, user_search: str, service: ModelService, *, bypass_cache: bool
+) -> StreamingResponse:
+    """
+    Start streaming the response for a model call.
+
+    Args:
+        backend (Backend): Backend to send the search to.
+        user_search (str): User's search as a string.
+        service (ModelService): Service used to call models.
+        bypass_cache (bool): Skip the response cache lookup.
+
+    Raises:
+        CircuitOpenError: If the response is not cached and the backend's circuit
+            breaker is open, so the request fails before the stream starts.
+
+    Returns:
+        StreamingResponse: Response streaming Server-Sent Events.
+    """
+    target = service.resolve(backend)
+    cached_result = None if bypass_cache else await service.lookup(target, user_search)
+    if cached_result is None:
+        service.breaker(backend).check()
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "X-Cache": "hit" if cached_result is not None else "miss",
+    }
+    return StreamingResponse(
+        generate_events(service, target, user_search, cached_result),
+        media_type="text/event-stream",
+        headers=headers,
+    )
+
+
+@router.post("/call_model_openai", response_class=StreamingResponse)
+async def stream_model_openai(
+    request_body: InputDataSpec,
+    service: ModelService = Depends(get_model_service),  # noqa: B008
+    x_cache_bypass: bool = Header(default=False),  # noqa: FBT001
+) -> StreamingResponse:
+    """
+    Stream the response of an OpenAI language model to a user search.
+
+    Args:
+        request_body (InputDataSpec): Request body for post requests, containing user search.
+        service (ModelService): Injected service used to call models.
+        x_cache_bypass (bool): Skip the response cache, from the `X-Cache-Bypass` header.
+
+    Returns:
+        StreamingResponse: Server-Sent Events ending with the validated JSON response.
+    """
+    return await stream_model_response(
+        Backend.OPENAI, request_body.user_search, service, bypass_cache=x_cache_bypass
+    )
+
+
+@router.post("/call_model_bedrock", response_class=StreamingResponse)
+async def stream_model_bedrock(
+    request_body: InputDataSpec,
+    service: ModelService = Depends(get_model_service),  # noqa: B008
+    x_cache_bypass: bool = Header(default=False),  # noqa: FBT001
+) -> StreamingResponse:
+    """
+    Stream the response of the Claude v2 Large Language Model via AWS Bedrock.
+
+    Args:
+        request_body (InputDataSpec): Request body for post requests, containing user search.
+        service (ModelService): Injected service used to call models.
+        x_cache_bypass (bool): Skip the response cache, from the `X-Cache-Bypass` header.
+
+    Returns:
+        StreamingResponse: Server-Sent Events ending with the validated JSON response.
+    """
+    return await stream_model_response(
+        Backend.BEDROCK, request_body.user_search, service, bypass_cache=x_cache_bypass
+    )
+
+
+@router.post("/call_model_bedrock_instant", response_class=StreamingResponse)
+async def stream_model_bedrock_instant(
+    request_body: InputDataSpec,
+    service: ModelService = Depends(get_model_service),  # noqa: B008
+    x_cache_bypass: bool = Header(default=False),  # noqa: FBT001
+) -> StreamingResponse:
+    """
+    Stream the response of the Claude Instant v1.2 Large Language Model via AWS Bedrock.
+
+    Args:
+        request_body (InputDataSpec): Request body for post requests, containing user search.
+        service (ModelService): Injected service used to call models.
+        x_cache_bypass (bool): Skip the response cache, from the `X-Cache-Bypass` header.
+
+    Returns:
+        StreamingResponse: Server-Sent Events ending with the validated JSON response.
+    """
+    return await stream_model_response(
+        Backend.BEDROCK_INSTANT, request_body.user_search, service, bypass_cache=x_cache_bypass
+    )
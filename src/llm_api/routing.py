@@ -0,0 +1,247 @@
+"""Provides routing of model calls to the backend most likely to answer in time."""
+import random
+import time
+from dataclasses import dataclass, field
+from enum import StrEnum
+
+from fastapi import Request
+
+from llm_api.config import Backend, Settings
+from llm_api.resilience.retry import Deadline
+from llm_api.service import (
+    MODEL_CALL_ERRORS,
+    PARSE_ERRORS,
+    UNAVAILABLE_ERRORS,
+    BackendTarget,
+    ModelCallResult,
+    ModelService,
+)
+
+
+class CallOutcome(StrEnum):
+    """Define the outcomes of a model call recorded by the router."""
+
+    SUCCESS = "success"
+    ERROR = "error"
+    PARSE_FAILURE = "parse_failure"
+
+
+@dataclass
+class TargetStats:
+    """
+    Exponentially weighted moving averages describing recent calls to a model.
+
+    Attributes
+        latency_seconds (float | None): Latency of successful calls, or None before
+            the first one.
+        error_rate (float): Fraction of calls that failed before returning output.
+        parse_failure_rate (float): Fraction of calls whose output could not be parsed.
+        on_time_rate (float): Fraction of calls that succeeded within the target latency.
+        calls (int): Number of calls recorded.
+        checked_at (float): Monotonic time the model was last called or probed.
+    """
+
+    latency_seconds: float | None = None
+    error_rate: float = 0.0
+    parse_failure_rate: float = 0.0
+    on_time_rate: float = 0.0
+    calls: int = 0
+    checked_at: float = field(default_factory=time.monotonic)
+
+    def record(
+        self, outcome: CallOutcome, seconds: float, target_latency: float, smoothing: float
+    ) -> None:
+        """
+        Update the moving averages with the outcome of a call.
+
+        The first call sets each average outright.
+
+        Args:
+            outcome (CallOutcome): Outcome of the call.
+            seconds (float): Latency of the call in seconds.
+            target_latency (float): Latency in seconds a call should complete within.
+            smoothing (float): Weight given to the new call, between 0 and 1.
+        """
+        weight = smoothing if self.calls else 1.0
+
+        def update(average: float, value: float) -> float:
+            return (1 - weight) * average + weight * value
+
+        succeeded = outcome is CallOutcome.SUCCESS
+        if succeeded:
+            self.latency_seconds = update(self.latency_seconds or seconds, seconds)
+        self.error_rate = update(self.error_rate, float(outcome is CallOutcome.ERROR))
+        self.parse_failure_rate = update(
+            self.parse_failure_rate, float(outcome is CallOutcome.PARSE_FAILURE)
+        )
+        self.on_time_rate = update(
+            self.on_time_rate, float(succeeded and seconds <= target_latency)
+        )
+        self.calls += 1
+        self.checked_at = time.monotonic()
+
+
+class AdaptiveRouter:
+    """
+    Send each search to the backend most likely to answer within a target latency.
+
+    The router keeps moving averages of latency, error rate and parse failure
+    rate for the model each backend resolves to, and ranks backends by the
+    fraction of recent calls that succeeded within `LLM_API_ROUTING_TARGET_LATENCY_SECONDS`,
+    less the fractions that failed or could not be parsed, then by latency. A
+    failed call costs the time taken to fall back to the next backend, so a fast
+    backend that often fails ranks below a slower one that answers. Backends that
+    have not been called yet are tried first. If a call fails, or the backend's
+    circuit breaker is open or its quota used up, the next backend in the
+    ranking is tried. Responses served from a cache are not recorded, as they
+    say nothing about how the backend is performing.
+
+    To keep the averages for other backends current, a request is occasionally
+    sent to a backend other than the best one as a probe: at random with
+    probability `LLM_API_ROUTING_PROBE_RATE`, and whenever a backend has not
+    been called for `LLM_API_ROUTING_PROBE_INTERVAL_SECONDS`.
+    """
+
+    def __init__(self, service: ModelService, rng: random.Random | None = None) -> None:
+        """
+        Class constructor.
+
+        Args:
+            service (ModelService): Service used to call models.
+            rng (random.Random | None, optional): Random number generator used to
+                choose probes. Defaults to None, for a new generator.
+        """
+        self.service = service
+        self.stats: dict[tuple[Backend, str], TargetStats] = {}
+        self.probes = 0
+        self._random = rng or random.Random()
+
+    @property
+    def settings(self) -> Settings:
+        """
+        Return the settings the service's callers were built with.
+
+        Returns
+            Settings: Pydantic settings object
+        """
+        return self.service.callers.settings
+
+    def rank(self) -> list[BackendTarget]:
+        """
+        Rank the configured backends in the order they should be tried.
+
+        Returns
+            list[BackendTarget]: Backends resolved to their current models, best first,
+                unless a probe was chosen to go first.
+        """
+        targets = [self.service.resolve(backend) for backend in self.settings.routing_backends]
+        ranked = sorted(targets, key=self._score)
+        probe = self._choose_probe(ranked[1:])
+        if probe is not None:
+            ranked.remove(probe)
+            ranked.insert(0, probe)
+            self.probes += 1
+            self._stats(probe).checked_at = time.monotonic()
+        return ranked
+
+    async def call(
+        self, user_search: str, *, bypass_cache: bool = False, deadline: Deadline | None = None
+    ) -> ModelCallResult:
+        """
+        Return the response to a search from the best available backend.
+
+        Args:
+            user_search (str): User's search as a string.
+            bypass_cache (bool, optional): Skip the cache lookup. Defaults to False.
+            deadline (Deadline | None, optional): Deadline shared by every backend tried.
+                Defaults to None, for `LLM_API_REQUEST_TIMEOUT_SECONDS` from now.
+
+        Raises:
+            OpenaiModelCallError: If every backend fails and the last was an OpenAI model.
+            BedrockModelCallError: If every backend fails and the last was a Bedrock model.
+            CircuitOpenError: If every backend fails and the last one's circuit breaker is open.
+            RateLimitExceededError: If every backend fails and the last one's quota is used up.
+            DeadlineExceededError: If the deadline passes before a backend answers.
+
+        Returns:
+            ModelCallResult: Response of the first backend to succeed.
+        """
+        if deadline is None:
+            deadline = Deadline(self.settings.request_timeout_seconds)
+        model_call_error: Exception | None = None
+        for target in self.rank():
+            start_time = time.monotonic()
+            try:
+                result = await self.service.call(
+                    target.backend, user_search, bypass_cache=bypass_cache, deadline=deadline
+                )
+            except PARSE_ERRORS as parse_error:
+                self.record(target, CallOutcome.PARSE_FAILURE, time.monotonic() - start_time)
+                model_call_error = parse_error
+                continue
+            except MODEL_CALL_ERRORS as call_error:
+                self.record(target, CallOutcome.ERROR, time.monotonic() - start_time)
+                model_call_error = call_error
+                continue
+            except UNAVAILABLE_ERRORS as unavailable_error:
+                model_call_error = unavailable_error
+                continue
+            if not result.cache_hit:
+                self.record(target, CallOutcome.SUCCESS, time.monotonic() - start_time)
+            return result
+        raise model_call_error  # type: ignore[misc]
+
+    def record(self, target: BackendTarget, outcome: CallOutcome, seconds: float) -> None:
+        """
+        Record the outcome of a call to a backend.
+
+        Args:
+            target (BackendTarget): Model that was called.
+            outcome (CallOutcome): Outcome of the call.
+            seconds (float): Latency of the call in seconds.
+        """
+        settings = self.settings
+        self._stats(target).record(
+            outcome, seconds, settings.routing_target_latency_seconds, settings.routing_smoothing
+        )
+
+    def _stats(self, target: BackendTarget) -> TargetStats:
+        key = (target.backend, target.model)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = TargetStats()
+        return stats
+
+    def _score(self, target: BackendTarget) -> tuple[float, float]:
+        stats = self.stats.get((target.backend, target.model))
+        if stats is None or not stats.calls:
+            return (-float("inf"), 0.0)
+        score = stats.on_time_rate - stats.error_rate - stats.parse_failure_rate
+        return (-score, stats.latency_seconds or float("inf"))
+
+    def _choose_probe(self, candidates: list[BackendTarget]) -> BackendTarget | None:
+        if not candidates:
+            return None
+        now = time.monotonic()
+        interval = self.settings.routing_probe_interval_seconds
+        stale = [
+            target for target in candidates if now - self._stats(target).checked_at >= interval
+        ]
+        if stale:
+            return min(stale, key=lambda target: self._stats(target).checked_at)
+        if self._random.random() < self.settings.routing_probe_rate:
+            return self._random.choice(candidates)
+        return None
+
+
+def get_router(request: Request) -> AdaptiveRouter:
+    """
+    Return the adaptive router created during application startup.
+
+    Args:
+        request (Request): Incoming request, used to access application state.
+
+    Returns:
+        AdaptiveRouter: Router used for `/call_model` requests.
+    """
+    return request.app.state.adaptive_router
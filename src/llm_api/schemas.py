@@ -0,0 +1,77 @@
+"""Provides the response schema that model output is validated against."""
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class Entity(BaseModel):
+    """
+    An entity identified from a user search.
+
+    Attributes
+        uri (str): Entity name, used to refer to the entity in connections.
+        description (str): Short description of the entity.
+        wikipedia_url (str | None): Wikipedia page for the entity, if the model
+            is sure of one.
+    """
+
+    uri: str
+    description: str = ""
+    wikipedia_url: str | None = None
+
+
+class Connection(BaseModel):
+    """
+    A relationship between two entities.
+
+    Attributes
+        from_ (str): `uri` of the entity the connection starts from, serialised as `from`.
+        to (str): `uri` of the entity the connection leads to.
+        description (str): Paragraph describing the relationship.
+    """
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    from_: str = Field(alias="from")
+    to: str
+    description: str = ""
+
+
+class ModelResponse(BaseModel):
+    """
+    Entities and connections a model found for a user search.
+
+    Attributes
+        entities (list[Entity]): Entities relevant to the search.
+        connections (list[Connection]): Relationships between the entities.
+    """
+
+    entities: list[Entity]
+    connections: list[Connection] = []
+
+
+class SearchResponse(ModelResponse):
+    """
+    Model response to a user search, as returned by the API.
+
+    Attributes
+        user_search (str): The user search the response answers.
+    """
+
+    user_search: str
+
+
+def validate_model_output(model_output: dict[str, Any]) -> dict[str, Any]:
+    """
+    Check model output matches the response schema, keeping only the fields it defines.
+
+    Args:
+        model_output (dict[str, Any]): JSON object extracted from a model response.
+
+    Raises:
+        ValidationError: If the output does not match the schema.
+
+    Returns:
+        dict[str, Any]: The validated output, with defaults filled in.
+    """
+    return ModelResponse.model_validate(model_output).model_dump(by_alias=True)
@@ -0,0 +1,641 @@
+"""Provides the model calling service shared by API routes."""
+import asyncio
+import copy
+import functools
+import time
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from fastapi import Request
+from opentelemetry import trace
+
+from llm_api.backends.errors import (
+    BedrockModelCallError,
+    BedrockResponseParseError,
+    OpenaiModelCallError,
+    OpenaiResponseParseError,
+)
+from llm_api.backends.registry import CallerRegistry
+from llm_api.cache.keys import make_cache_key
+from llm_api.cache.memory import ResponseCache
+from llm_api.cache.shared import SharedCache
+from llm_api.cache.snapshot import SnapshotEntry
+from llm_api.coalesce import SingleFlight
+from llm_api.config import Backend, BedrockModel, Settings
+from llm_api.metrics import (
+    CACHE_LOOKUPS,
+    PARSE_FAILURES,
+    UPSTREAM_IN_FLIGHT,
+    observe_stage,
+    record_error,
+    record_extraction,
+)
+from llm_api.parsing.incremental import IncrementalResponseParser
+from llm_api.prompts import BEDROCK_PROMPT, OPENAI_PROMPT
+from llm_api.resilience.breaker import BreakerConfig, CircuitBreaker, CircuitOpenError
+from llm_api.resilience.ratelimit import (
+    Budget,
+    RateLimitExceededError,
+    SQLiteRateLimiter,
+)
+from llm_api.resilience.retry import (
+    Deadline,
+    DeadlineExceededError,
+    RetryPolicy,
+    call_with_retries,
+)
+from llm_api.tokens import TokenUsage, count_message_tokens, count_tokens
+from llm_api.tracing import tracer
+
+if TYPE_CHECKING:
+    from llm_api.cache.semantic import SemanticCache
+
+MODEL_CALL_ERRORS = (OpenaiModelCallError, BedrockModelCallError)
+PARSE_ERRORS = (OpenaiResponseParseError, BedrockResponseParseError)
+UNAVAILABLE_ERRORS = (CircuitOpenError, RateLimitExceededError)
+# Message a hedged call is cancelled with once the other backend has answered.
+HEDGE_LOST = "Hedged call lost to the other backend."
+
+
+@functools.cache
+def prompt_tokens(backend: Backend) -> int:
+    """
+    Count the tokens of a backend's prompt, excluding the search.
+
+    Counted on first use rather than on import, so OpenAI prompts are counted with
+    tiktoken once warming up has loaded it.
+
+    Args:
+        backend (Backend): Backend the prompt is sent to.
+
+    Returns:
+        int: Token count.
+    """
+    prompt = OPENAI_PROMPT if backend is Backend.OPENAI else BEDROCK_PROMPT
+    return count_message_tokens(prompt.system_prefix, backend)
+
+
+@dataclass(frozen=True)
+class BackendTarget:
+    """
+    The model a backend resolves to under the current settings.
+
+    Attributes
+        backend (Backend): Backend requests are sent to.
+        model (str): Model identifier.
+        temperature (float): Sampling temperature the model is called with.
+        prompt_version (str): Version of the prompt template sent to the model.
+    """
+
+    backend: Backend
+    model: str
+    temperature: float
+    prompt_version: str
+
+    @property
+    def scope(self) -> str:
+        """
+        Return what, besides the search, a response from this target depends on.
+
+        Returns
+            str: Model, temperature and prompt version.
+        """
+        return f"{self.model}\x1f{self.temperature!r}\x1f{self.prompt_version}"
+
+    def cache_key(self, user_search: str) -> str:
+        """
+        Build the cache key for a search sent to this target.
+
+        Args:
+            user_search (str): User's search as a string.
+
+        Returns:
+            str: Cache key.
+        """
+        return make_cache_key(user_search, self.model, self.temperature, self.prompt_version)
+
+
+@dataclass
+class ModelCallResult:
+    """
+    A model response with details of how it was produced.
+
+    Attributes
+        response (dict[str, Any]): Model JSON response as a dictionary.
+        target (BackendTarget): Model the response came from.
+        cache_tier (str | None): Cache tier the response was served from, one of
+            "memory", "shared" or "semantic", or None if the model was called.
+        coalesced (bool): Whether the response came from a model call made for an
+            identical concurrent request.
+        retries (int): Number of times the model call was retried.
+        usage (TokenUsage): Tokens sent to and generated by the model, summed over
+            every attempt. Responses from a cache used none, and coalesced responses
+            report the call they shared.
+    """
+
+    response: dict[str, Any]
+    target: BackendTarget
+    cache_tier: str | None = None
+    coalesced: bool = False
+    retries: int = 0
+    usage: TokenUsage = field(default_factory=TokenUsage)
+
+    @property
+    def cache_hit(self) -> bool:
+        """
+        Return whether the response was served from a cache.
+
+        Returns
+            bool: True if the response came from a cache.
+        """
+        return self.cache_tier is not None
+
+
+class UpstreamResponse(NamedTuple):
+    """
+    A response from a model call.
+
+    Attributes
+        response (dict[str, Any]): Model JSON response as a dictionary.
+        retries (int): Number of times the call was retried.
+        usage (TokenUsage): Tokens sent to and generated by the model, summed over
+            every attempt.
+    """
+
+    response: dict[str, Any]
+    retries: int
+    usage: TokenUsage
+
+
+class StreamEvent(NamedTuple):
+    """
+    An event in a streamed model response.
+
+    Attributes
+        event (str): One of "chunk", for a piece of model output text, "entity" or
+            "connection", for each object parsed from the output as soon as it is
+            complete, or "result", for the final validated response.
+        data (Any): Text for "chunk" events, otherwise a dictionary.
+    """
+
+    event: str
+    data: Any
+
+
+class ModelService:
+    """
+    Send user searches to model backends, caching their responses.
+
+    Responses are looked up in the worker's own cache, then in the cache shared
+    by all workers on the host, before the model is called. Shared cache hits
+    are copied into the worker's cache. If a semantic cache is given, searches
+    found in neither are answered with the cached response to an earlier search
+    of similar meaning. Concurrent requests for the same uncached response share
+    a single model call.
+
+    Calls to each backend pass through a circuit breaker, which fails them
+    fast with `CircuitOpenError` while the backend is failing or slow.
+    Transient failures are retried with backoff while the request's deadline
+    allows. Calls are held back, or shed with `RateLimitExceededError`, to keep
+    within any per-minute request and token quotas set for the backend.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        callers: CallerRegistry,
+        cache: ResponseCache,
+        shared_cache: SharedCache | None = None,
+        rate_limiter: SQLiteRateLimiter | None = None,
+        semantic_cache: "SemanticCache | None" = None,
+    ) -> None:
+        """
+        Class constructor.
+
+        Args:
+            callers (CallerRegistry): Registry of model callers shared across requests.
+            cache (ResponseCache): Cache of model responses held by this worker.
+            shared_cache (SharedCache | None, optional): Cache of model responses
+                shared between workers. Defaults to None.
+            rate_limiter (SQLiteRateLimiter | None, optional): Limiter enforcing quotas
+                across workers. Defaults to None, for no rate limiting.
+            semantic_cache (SemanticCache | None, optional): Index matching searches
+                to cached searches of similar meaning. Defaults to None.
+        """
+        self.callers = callers
+        self.cache = cache
+        self.shared_cache = shared_cache
+        self.rate_limiter = rate_limiter
+        self.semantic_cache = semantic_cache
+        self.in_flight: SingleFlight[UpstreamResponse] = SingleFlight()
+        self.breakers: dict[Backend, CircuitBreaker] = {}
+        self._breaker_settings: Settings | None = None
+        self._breaker_config = BreakerConfig()
+
+    def resolve(self, backend: Backend) -> BackendTarget:
+        """
+        Resolve the model a backend sends requests to under the current settings.
+
+        Args:
+            backend (Backend): Backend to resolve.
+
+        Returns:
+            BackendTarget: Model, temperature and prompt version for the backend.
+        """
+        settings = self.callers.settings
+        if backend is Backend.OPENAI:
+            return BackendTarget(
+                backend,
+                settings.openai_llm_name,
+                self.callers.openai.temperature,
+                OPENAI_PROMPT.version,
+            )
+        model = (
+            BedrockModel.CLAUDE_INSTANT
+            if backend is Backend.BEDROCK_INSTANT
+            else settings.aws_bedrock_model_id
+        )
+        return BackendTarget(
+            backend, model, self.callers.bedrock.temperature, BEDROCK_PROMPT.version
+        )
+
+    def breaker(self, backend: Backend) -> CircuitBreaker:
+        """
+        Return the circuit breaker for a backend, applying any reloaded thresholds.
+
+        Args:
+            backend (Backend): Backend the breaker protects.
+
+        Returns:
+            CircuitBreaker: Circuit breaker for the backend.
+        """
+        settings = self.callers.settings
+        if settings is not self._breaker_settings:
+            self._breaker_settings = settings
+            self._breaker_config = BreakerConfig.from_settings(settings)
+            for breaker in self.breakers.values():
+                breaker.config = self._breaker_config
+        if backend not in self.breakers:
+            self.breakers[backend] = CircuitBreaker(
+                f"{backend} backend", self._breaker_config, backend=backend
+            )
+        return self.breakers[backend]
+
+    async def call(
+        self,
+        backend: Backend,
+        user_search: str,
+        *,
+        bypass_cache: bool = False,
+        deadline: Deadline | None = None,
+    ) -> ModelCallResult:
+        """
+        Return the model response for a search, from the cache where possible.
+
+        Args:
+            backend (Backend): Backend to send the search to.
+            user_search (str): User's search as a string.
+            bypass_cache (bool, optional): Skip the cache lookup. The fresh response
+                still replaces any cached one. Defaults to False.
+            deadline (Deadline | None, optional): Deadline for the request. Defaults
+                to None, for `LLM_API_REQUEST_TIMEOUT_SECONDS` from now.
+
+        Raises:
+            OpenaiModelCallError: If calling an OpenAI model fails.
+            BedrockModelCallError: If calling a Bedrock model fails.
+            CircuitOpenError: If the backend's circuit breaker is open.
+            RateLimitExceededError: If the backend's quota would not allow the call in time.
+            DeadlineExceededError: If the deadline passes before the model answers.
+
+        Returns:
+            ModelCallResult: Model response and details of how it was produced.
+        """
+        with tracer.start_as_current_span("resolve_backend") as span:
+            target = self.resolve(backend)
+            span.set_attributes({"llm.backend": target.backend, "llm.model": target.model})
+        key = target.cache_key(user_search)
+        if not bypass_cache:
+            cached_result = await self.lookup(target, user_search)
+            if cached_result is not None:
+                return cached_result
+
+        if deadline is None:
+            deadline = Deadline(self.callers.settings.request_timeout_seconds)
+        try:
+            # A coalesced request may have a shorter deadline than the call it joined.
+            async with asyncio.timeout(deadline.remaining()):
+                (response, retries, usage), coalesced = await self.in_flight.do(
+                    key, lambda: self._fetch(target, user_search, deadline)
+                )
+        except TimeoutError as timeout_error:
+            message = f"Request deadline of {deadline.seconds}s exceeded."
+            deadline_error = DeadlineExceededError(message)
+            record_error(backend, deadline_error)
+            raise deadline_error from timeout_error
+        # Every coalesced request receives the same object, so each gets its own copy.
+        return ModelCallResult(
+            copy.deepcopy(response), target, coalesced=coalesced, retries=retries, usage=usage
+        )
+
+    async def lookup(self, target: BackendTarget, user_search: str) -> ModelCallResult | None:
+        """
+        Return a cached response for a search, checking each cache tier in turn.
+
+        Args:
+            target (BackendTarget): Model the response should come from.
+            user_search (str): User's search as a string.
+
+        Returns:
+            ModelCallResult | None: Cached response, or None if no tier holds one.
+        """
+        with tracer.start_as_current_span("cache_lookup") as span:
+            result = await self._lookup(target, user_search)
+            tier = "none" if result is None else result.cache_tier
+            span.set_attribute("llm.cache.tier", tier)
+            CACHE_LOOKUPS.labels(target.backend, tier).inc()
+        return result
+
+    async def _lookup(self, target: BackendTarget, user_search: str) -> ModelCallResult | None:
+        key = target.cache_key(user_search)
+        cached_response = self.cache.get(key)
+        if cached_response is not None:
+            return ModelCallResult(cached_response, target, cache_tier="memory")
+        if self.shared_cache is not None:
+            cached_response = await self.shared_cache.get(key)
+            if cached_response is not None:
+                self.cache.set(key, cached_response)
+                return ModelCallResult(cached_response, target, cache_tier="shared")
+        if self.semantic_cache is not None:
+            return await self._lookup_similar(self.semantic_cache, target, user_search)
+        return None
+
+    async def _lookup_similar(
+        self, semantic_cache: "SemanticCache", target: BackendTarget, user_search: str
+    ) -> ModelCallResult | None:
+        for match in semantic_cache.match(user_search, target.scope):
+            cached_response = self.cache.get(match.key)
+            if cached_response is None and self.shared_cache is not None:
+                cached_response = await self.shared_cache.get(match.key)
+                if cached_response is not None:
+                    self.cache.set(match.key, cached_response)
+            if cached_response is not None:
+                trace.get_current_span().set_attribute("llm.cache.similarity", match.similarity)
+                return ModelCallResult(cached_response, target, cache_tier="semantic")
+            semantic_cache.discard(match.key)
+        return None
+
+    async def stream(self, target: BackendTarget, user_search: str) -> AsyncIterator[StreamEvent]:
+        """
+        Stream a model response as it is generated, then cache the parsed result.
+
+        Streams bypass the cache lookup, so check `lookup` first.
+
+        Args:
+            target (BackendTarget): Model to call.
+            user_search (str): User's search as a string.
+
+        Raises:
+            OpenaiModelCallError: If calling an OpenAI model or parsing its output fails.
+            BedrockModelCallError: If calling a Bedrock model or parsing its output fails.
+            CircuitOpenError: If the backend's circuit breaker is open.
+            RateLimitExceededError: If the backend's quota would not allow the call in time.
+
+        Yields:
+            StreamEvent: A "chunk" event for each piece of model output, "entity" and
+                "connection" events as each object in the output completes, then a
+                "result" event with the parsed response.
+        """
+        chunks = []
+        parser = IncrementalResponseParser()
+        async for chunk in self._stream_upstream(target, user_search):
+            chunks.append(chunk)
+            yield StreamEvent("chunk", chunk)
+            for item in parser.feed(chunk):
+                yield StreamEvent(item.kind, item.value)
+        response = self._parse(target, "".join(chunks))
+        await self.store(target, user_search, response)
+        yield StreamEvent("result", response)
+
+    async def store(
+        self, target: BackendTarget, user_search: str, response: dict[str, Any]
+    ) -> None:
+        """
+        Cache a response in every tier, so later searches are answered without the model.
+
+        Args:
+            target (BackendTarget): Model the response came from.
+            user_search (str): User's search as a string.
+            response (dict[str, Any]): Model JSON response as a dictionary.
+        """
+        key = target.cache_key(user_search)
+        self.cache.set(key, response)
+        if self.shared_cache is not None:
+            await self.shared_cache.set(key, response)
+        if self.semantic_cache is not None:
+            self.semantic_cache.add(user_search, target.scope, key)
+
+    def load_snapshot(self, entries: Iterable[SnapshotEntry]) -> int:
+        """
+        Load saved responses into this worker's cache and semantic index.
+
+        The shared cache is left alone, as whatever saved the snapshot will have
+        filled it already on hosts that share it.
+
+        Args:
+            entries (Iterable[SnapshotEntry]): Responses read from a snapshot.
+
+        Returns:
+            int: Number of responses loaded.
+        """
+        count = 0
+        for entry in entries:
+            self.cache.set(entry.key, entry.response)
+            if self.semantic_cache is not None:
+                self.semantic_cache.add(entry.user_search, entry.scope, entry.key)
+            count += 1
+        return count
+
+    async def _fetch(
+        self, target: BackendTarget, user_search: str, deadline: Deadline
+    ) -> UpstreamResponse:
+        upstream_response = await self.call_upstream(target, user_search, deadline)
+        await self.store(target, user_search, upstream_response.response)
+        return upstream_response
+
+    async def call_upstream(
+        self, target: BackendTarget, user_search: str, deadline: Deadline
+    ) -> UpstreamResponse:
+        """
+        Call the model a target resolves to, bypassing any cache.
+
+        Rate limiting, throttling, connection and server errors are retried with
+        jittered exponential backoff, as long as the deadline leaves time to.
+
+        Args:
+            target (BackendTarget): Model to call.
+            user_search (str): User's search as a string.
+            deadline (Deadline): Deadline for the request.
+
+        Raises:
+            OpenaiModelCallError: If calling an OpenAI model fails.
+            BedrockModelCallError: If calling a Bedrock model fails.
+            CircuitOpenError: If the backend's circuit breaker is open.
+            RateLimitExceededError: If the backend's quota would not allow the call in time.
+            DeadlineExceededError: If the deadline passes before the model answers.
+
+        Returns:
+            UpstreamResponse: Model JSON response, the number of retries made and the
+                tokens used.
+        """
+        policy = RetryPolicy.from_settings(self.callers.settings)
+        usage = TokenUsage()
+        response, retries = await call_with_retries(
+            lambda: self._attempt(target, user_search, deadline, usage),
+            deadline,
+            policy,
+            MODEL_CALL_ERRORS,
+        )
+        return UpstreamResponse(response, retries, usage)
+
+    async def _limit_rate(self, target: BackendTarget, user_search: str, max_wait: float) -> None:
+        settings = self.callers.settings
+        budget = Budget(
+            settings.rate_limit_rpm.get(target.backend), settings.rate_limit_tpm.get(target.backend)
+        )
+        if self.rate_limiter is None or budget.unlimited:
+            return
+        tokens = (
+            prompt_tokens(target.backend)
+            + count_tokens(user_search, target.backend)
+            + settings.max_output_tokens
+        )
+        with tracer.start_as_current_span("rate_limit") as span:
+            waited = await self.rate_limiter.acquire(target.backend, budget, tokens, max_wait)
+            span.set_attribute("llm.rate_limit.waited_seconds", waited)
+
+    async def _attempt(
+        self, target: BackendTarget, user_search: str, deadline: Deadline, usage: TokenUsage
+    ) -> dict[str, Any]:
+        max_wait = min(self.callers.settings.rate_limit_max_wait_seconds, deadline.remaining())
+        breaker = self.breaker(target.backend)
+        try:
+            await self._limit_rate(target, user_search, max_wait)
+            breaker.acquire()
+        except UNAVAILABLE_ERRORS as unavailable_error:
+            record_error(target.backend, unavailable_error)
+            raise
+        start_time = time.monotonic()
+        try:
+            with UPSTREAM_IN_FLIGHT.labels(target.backend).track_inprogress():
+                response = await self._call_caller(target, user_search, usage)
+        except PARSE_ERRORS as parse_error:
+            # The backend answered, so bad output does not count against its health.
+            breaker.record(time.monotonic() - start_time, failed=False)
+            PARSE_FAILURES.labels(target.backend, target.model).inc()
+            record_error(target.backend, parse_error)
+            raise
+        except MODEL_CALL_ERRORS as model_call_error:
+            breaker.record(time.monotonic() - start_time, failed=True)
+            record_error(target.backend, model_call_error)
+            raise
+        except asyncio.CancelledError as cancelled_error:
+            if HEDGE_LOST in cancelled_error.args:
+                # The other backend answering first says nothing about this one.
+                breaker.release()
+            else:
+                # Cancelled at the deadline, the backend failed to answer in time.
+                # Otherwise the client left, and the call counts as slow if it was.
+                breaker.record(time.monotonic() - start_time, failed=deadline.remaining() <= 0)
+            raise
+        breaker.record(time.monotonic() - start_time, failed=False)
+        return response
+
+    async def _call_caller(
+        self, target: BackendTarget, user_search: str, usage: TokenUsage
+    ) -> dict[str, Any]:
+        if target.backend is Backend.OPENAI:
+            openai_caller = self.callers.openai
+            return await openai_caller.call_model(
+                openai_caller.generate_openai_prompt(), user_search, usage=usage
+            )
+        bedrock_caller = self.callers.bedrock
+        alternative_model = (
+            BedrockModel.CLAUDE_INSTANT if target.backend is Backend.BEDROCK_INSTANT else None
+        )
+        return await bedrock_caller.call_model(
+            bedrock_caller.generate_prompt(),
+            user_search,
+            alternative_model=alternative_model,
+            usage=usage,
+        )
+
+    async def _stream_upstream(self, target: BackendTarget, user_search: str) -> AsyncIterator[str]:
+        breaker = self.breaker(target.backend)
+        try:
+            await self._limit_rate(
+                target, user_search, self.callers.settings.rate_limit_max_wait_seconds
+            )
+            breaker.acquire()
+        except UNAVAILABLE_ERRORS as unavailable_error:
+            record_error(target.backend, unavailable_error)
+            raise
+        start_time = time.monotonic()
+        try:
+            with UPSTREAM_IN_FLIGHT.labels(target.backend).track_inprogress():
+                async for chunk in self._stream_caller(target, user_search):
+                    yield chunk
+        except MODEL_CALL_ERRORS as model_call_error:
+            breaker.record(time.monotonic() - start_time, failed=True)
+            record_error(target.backend, model_call_error)
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client left, and the call counts as slow if it was.
+            breaker.record(time.monotonic() - start_time, failed=False)
+            raise
+        breaker.record(time.monotonic() - start_time, failed=False)
+
+    def _stream_caller(self, target: BackendTarget, user_search: str) -> AsyncIterator[str]:
+        if target.backend is Backend.OPENAI:
+            openai_caller = self.callers.openai
+            return openai_caller.stream_model(openai_caller.generate_openai_prompt(), user_search)
+        bedrock_caller = self.callers.bedrock
+        alternative_model = (
+            BedrockModel.CLAUDE_INSTANT if target.backend is Backend.BEDROCK_INSTANT else None
+        )
+        return bedrock_caller.stream_model(
+            bedrock_caller.generate_prompt(), user_search, alternative_model=alternative_model
+        )
+
+    def _parse(self, target: BackendTarget, model_output: str) -> dict[str, Any]:
+        try:
+            with observe_stage(target.backend, target.model, "parse"):
+                if target.backend is Backend.OPENAI:
+                    extraction = self.callers.openai.parse_response(model_output)
+                else:
+                    extraction = self.callers.bedrock.parse_response(model_output)
+        except PARSE_ERRORS as parse_error:
+            PARSE_FAILURES.labels(target.backend, target.model).inc()
+            record_error(target.backend, parse_error)
+            raise
+        record_extraction(target.backend, target.model, extraction)
+        return extraction.value
+
+    async def aclose(self) -> None:
+        """Close the shared cache and rate limiter, if any."""
+        if self.shared_cache is not None:
+            await self.shared_cache.aclose()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aclose()
+
+
+def get_model_service(request: Request) -> ModelService:
+    """
+    Return the model service created during application startup.
+
+    Args:
+        request (Request): Incoming request, used to access application state.
+
+    Returns:
+        ModelService: Service used to call models.
+    """
+    return request.app.state.model_service
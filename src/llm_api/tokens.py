@@ -0,0 +1,148 @@
+"""Provides token counting for prompts and model output, and the limit on search length."""
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from langchain_core.messages import BaseMessage
+from loguru import logger
+
+from llm_api.config import Backend
+
+if TYPE_CHECKING:
+    from tiktoken import Encoding
+
+OPENAI_ENCODING = "cl100k_base"
+# Claude's tokenizer is not available locally. English averages about 3.5 characters
+# per Claude token, and about 4 per OpenAI token when tiktoken cannot be loaded.
+CHARS_PER_TOKEN = {Backend.OPENAI: 4.0, Backend.BEDROCK: 3.5, Backend.BEDROCK_INSTANT: 3.5}
+# Role markers around each message, and the tokens priming the model's reply.
+MESSAGE_OVERHEAD_TOKENS = {Backend.OPENAI: 4, Backend.BEDROCK: 3, Backend.BEDROCK_INSTANT: 3}
+REPLY_OVERHEAD_TOKENS = 3
+
+_openai_encoding: "Encoding | None" = None
+_openai_encoding_loaded = False
+
+
+class InputTooLongError(ValueError):
+    """Generate a custom exception for user searches longer than the configured limit."""
+
+    def __init__(self, tokens: int, max_tokens: int) -> None:
+        """
+        Class constructor.
+
+        Args:
+            tokens (int): Tokens counted in the search.
+            max_tokens (int): Most tokens a search may have.
+        """
+        self.tokens = tokens
+        self.max_tokens = max_tokens
+        message = f"Search is {tokens} tokens long, more than the limit of {max_tokens}."
+        super().__init__(message)
+
+
+@dataclass
+class TokenUsage:
+    """
+    Tokens sent to and generated by a model, summed over every call made for a request.
+
+    Attributes
+        prompt_tokens (int): Tokens in the prompts sent.
+        completion_tokens (int): Tokens in the model output received.
+    """
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def add(self, prompt_tokens: int, completion_tokens: int) -> None:
+        """
+        Count the tokens of another model call.
+
+        Args:
+            prompt_tokens (int): Tokens in the prompt sent.
+            completion_tokens (int): Tokens in the model output received.
+        """
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+
+def load_openai_encoding() -> None:
+    """
+    Load tiktoken's encoding for OpenAI models, so OpenAI tokens are counted exactly.
+
+    tiktoken downloads the encoding on first use unless it is in `TIKTOKEN_CACHE_DIR`,
+    so this is called while warming up rather than while serving a request. If it
+    cannot be loaded, tokens are estimated from the length of the text, and it is
+    not tried again.
+    """
+    global _openai_encoding, _openai_encoding_loaded  # noqa: PLW0603
+    if _openai_encoding_loaded:
+        return
+    _openai_encoding_loaded = True
+    try:
+        import tiktoken
+
+        _openai_encoding = tiktoken.get_encoding(OPENAI_ENCODING)
+    except Exception as encoding_error:  # noqa: BLE001
+        logger.warning(f"Estimating OpenAI tokens, as tiktoken is unavailable: {encoding_error}")
+
+
+def count_tokens(text: str, backend: Backend) -> int:
+    """
+    Count the tokens in a text for a backend's models.
+
+    Args:
+        text (str): Text to count.
+        backend (Backend): Backend the text is sent to or received from.
+
+    Returns:
+        int: Token count, estimated from the length of the text where no tokenizer
+            is loaded for the backend.
+    """
+    if backend is Backend.OPENAI and _openai_encoding is not None:
+        return len(_openai_encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN[backend])
+
+
+def count_message_tokens(messages: Sequence[BaseMessage], backend: Backend) -> int:
+    """
+    Count the tokens in a prompt, including the markers around each message.
+
+    Args:
+        messages (Sequence[BaseMessage]): Messages of the prompt.
+        backend (Backend): Backend the prompt is sent to.
+
+    Returns:
+        int: Token count.
+    """
+    return REPLY_OVERHEAD_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS[backend] + count_tokens(str(message.content), backend)
+        for message in messages
+    )
+
+
+def check_input_length(user_search: str, max_tokens: int) -> int:
+    """
+    Check a user search is short enough to send to any backend.
+
+    The search is counted for each backend and the largest count is used, so a
+    search accepted for one backend is accepted for all of them. Counts estimated
+    from its length are checked first, so a long search is rejected without
+    tokenizing it.
+
+    Args:
+        user_search (str): User's search as a string.
+        max_tokens (int): Most tokens a search may have.
+
+    Raises:
+        InputTooLongError: If the search has more tokens than allowed.
+
+    Returns:
+        int: Tokens counted in the search.
+    """
+    tokens = 0
+    for backend in sorted(Backend, key=lambda backend: backend is Backend.OPENAI):
+        tokens = max(tokens, count_tokens(user_search, backend))
+        if tokens > max_tokens:
+            raise InputTooLongError(tokens, max_tokens)
+    return tokens
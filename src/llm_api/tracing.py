@@ -0,0 +1,144 @@
+"""Provides OpenTelemetry tracing of requests through the API."""
+import os
+import sys
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from opentelemetry import propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode, format_trace_id
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from llm_api.config import Settings, TracingExporter
+
+if TYPE_CHECKING:
+    from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+
+tracer = trace.get_tracer("llm_api")
+
+
+def _format_span(span: "ReadableSpan") -> str:
+    return span.to_json(indent=None) + os.linesep
+
+
+def build_tracer_provider(settings: Settings) -> "TracerProvider | None":
+    """
+    Create a tracer provider exporting spans to the exporter selected in settings.
+
+    Both exporters write one JSON span per line and work offline: `console`
+    writes to standard error and `file` appends to `LLM_API_TRACING_FILE_PATH`.
+    Requires the optional `opentelemetry-sdk` dependency, installed with
+    `pip install llm-api[tracing]`.
+
+    Args:
+        settings (Settings): Pydantic settings object.
+
+    Returns:
+        TracerProvider | None: Tracer provider, or None if tracing is disabled.
+    """
+    if settings.tracing_exporter is TracingExporter.NONE:
+        return None
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    out = (
+        sys.stderr
+        if settings.tracing_exporter is TracingExporter.CONSOLE
+        else settings.tracing_file_path.open("a", encoding="utf-8")
+    )
+    provider = TracerProvider(resource=Resource.create({"service.name": "llm-api"}))
+    provider.add_span_processor(
+        BatchSpanProcessor(ConsoleSpanExporter(out=out, formatter=_format_span))
+    )
+    return provider
+
+
+def configure_tracing(settings: Settings) -> None:
+    """
+    Install the tracer provider selected in settings for this process.
+
+    A process can only install one tracer provider, so tracing settings are
+    read once at startup and not changed by a reload.
+
+    Args:
+        settings (Settings): Pydantic settings object.
+    """
+    provider = build_tracer_provider(settings)
+    if provider is not None:
+        trace.set_tracer_provider(provider)
+
+
+def flush_tracing() -> None:
+    """Export spans still waiting in the tracer provider's buffer, if tracing is enabled."""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "force_flush"):
+        provider.force_flush()
+
+
+def to_nanoseconds(timestamp: datetime) -> int:
+    """
+    Convert a timestamp to nanoseconds since the epoch, as spans record time.
+
+    Args:
+        timestamp (datetime): Timezone aware timestamp.
+
+    Returns:
+        int: Nanoseconds since the epoch.
+    """
+    return int(timestamp.timestamp() * 1e9)
+
+
+class TracingMiddleware:
+    """
+    Start a root span for each HTTP request.
+
+    A trace context sent with the request in a W3C `traceparent` header is
+    continued, so the request's spans join the caller's trace. The trace id is
+    returned in the `X-Trace-Id` response header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        Class constructor.
+
+        Args:
+            app (ASGIApp): Application to wrap.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Handle a request inside its root span.
+
+        Args:
+            scope (Scope): Connection scope.
+            receive (Receive): Receives request messages.
+            send (Send): Sends response messages.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        carrier = {
+            name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]
+        }
+        with tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": scope["method"], "url.path": scope["path"]},
+        ) as span:
+            span_context = span.get_span_context()
+
+            async def send_with_trace_id(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    span.set_attribute("http.response.status_code", status_code)
+                    if status_code >= 500:  # noqa: PLR2004
+                        span.set_status(Status(StatusCode.ERROR))
+                    if span_context.is_valid:
+                        trace_id = format_trace_id(span_context.trace_id).encode("latin-1")
+                        headers = [*message.get("headers", []), (b"x-trace-id", trace_id)]
+                        message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
@@ -0,0 +1,313 @@
+"""
+Pre-warm the response cache with answers to the most frequent searches in a query log.
+
+The log holds one search per line, either as plain text or as a JSON object with
+the search in a field, `user_search` by default, as written by most access
+loggers. Searches are ranked by how often they occur once normalised, as the
+cache normalises them, and the most frequent are sent to each backend through
+the same service the API uses. Responses already cached are not fetched again.
+
+Fresh responses are written to the shared cache, so on a host using it, workers
+answer them at once. Pass `--snapshot` to also save every response to a file,
+and point `LLM_API_CACHE_SNAPSHOT_PATH` at it to have each worker load it into
+its own cache on startup, for hosts not sharing a cache or after a deploy that
+clears it.
+
+Model calls are bounded by `--concurrency` and take their place in the rate
+limiter shared with any workers on the host, so warming stays within the
+backends' quotas alongside live traffic. Calls the rate limiter or a circuit
+breaker turns away are retried once it allows.
+
+Run with `python -m llm_api.warm queries.log --top 500 --snapshot snapshot.jsonl`.
+"""
+import argparse
+import asyncio
+import sys
+from collections import Counter
+from collections.abc import Coroutine, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import orjson
+from loguru import logger
+
+from llm_api.backends.registry import CallerRegistry
+from llm_api.cache.keys import normalise_search
+from llm_api.cache.memory import ResponseCache
+from llm_api.cache.shared import build_shared_cache
+from llm_api.cache.snapshot import SnapshotEntry, write_snapshot
+from llm_api.config import Backend, get_settings
+from llm_api.resilience.ratelimit import SQLiteRateLimiter
+from llm_api.resilience.retry import DeadlineExceededError
+from llm_api.service import MODEL_CALL_ERRORS, UNAVAILABLE_ERRORS, ModelService
+from llm_api.tokens import InputTooLongError, check_input_length
+
+# Times a call turned away by the rate limiter or a circuit breaker is tried.
+ATTEMPTS = 3
+
+
+class RankedQuery(NamedTuple):
+    """
+    A search from a query log, with how often it was made.
+
+    Attributes
+        user_search (str): The search, as first spelled in the log.
+        occurrences (int): Number of times the search was made, however spelled.
+    """
+
+    user_search: str
+    occurrences: int
+
+
+@dataclass
+class WarmReport:
+    """
+    Outcome of warming the cache.
+
+    Attributes
+        fetched (int): Responses fetched from a model.
+        cached (int): Responses found already cached.
+        skipped (int): Searches not sent, as they exceed `LLM_API_MAX_INPUT_TOKENS`.
+        failed (Counter[str]): Model calls that failed, counted by error type.
+        entries (list[SnapshotEntry]): Every response fetched or found, most
+            frequent search first.
+    """
+
+    fetched: int = 0
+    cached: int = 0
+    skipped: int = 0
+    failed: Counter[str] = field(default_factory=Counter)
+    entries: list[SnapshotEntry] = field(default_factory=list)
+
+    def summary(self) -> str:
+        """
+        Describe the outcome in a sentence or two.
+
+        Returns
+            str: Summary of the outcome.
+        """
+        failures = ", ".join(f"{error}: {count}" for error, count in self.failed.most_common())
+        summary = (
+            f"Warmed {len(self.entries)} responses: {self.fetched} fetched, "
+            f"{self.cached} already cached, {self.failed.total()} failed"
+        )
+        summary += f" ({failures})." if failures else "."
+        if self.skipped:
+            summary += f" Skipped {self.skipped} searches too long to send."
+        return summary
+
+
+def rank_queries(lines: Iterable[str], field_name: str = "user_search") -> list[RankedQuery]:
+    """
+    Count the searches in a query log, most frequent first.
+
+    Lines starting with "{" are read as JSON objects holding the search in a
+    field, and other lines as the search itself. Blank lines, and JSON lines
+    without the field, are ignored.
+
+    Args:
+        lines (Iterable[str]): Lines of the query log.
+        field_name (str, optional): Field holding the search in JSON lines.
+            Defaults to "user_search".
+
+    Returns:
+        list[RankedQuery]: Distinct searches, most frequent first.
+    """
+    counts: Counter[str] = Counter()
+    spellings: dict[str, str] = {}
+    for line in lines:
+        user_search = line.strip()
+        if user_search.startswith("{"):
+            try:
+                record = orjson.loads(user_search)
+            except orjson.JSONDecodeError:
+                continue
+            field_value = record.get(field_name) if isinstance(record, dict) else None
+            if not isinstance(field_value, str):
+                continue
+            user_search = field_value
+        normalised_search = normalise_search(user_search)
+        if not normalised_search:
+            continue
+        counts[normalised_search] += 1
+        spellings.setdefault(normalised_search, user_search.strip())
+    return [
+        RankedQuery(spellings[search], occurrences) for search, occurrences in counts.most_common()
+    ]
+
+
+async def warm_search(
+    service: ModelService,
+    semaphore: asyncio.Semaphore,
+    backend: Backend,
+    user_search: str,
+    report: WarmReport,
+) -> SnapshotEntry | None:
+    """
+    Fetch a search's response into the cache, unless it is cached already.
+
+    Args:
+        service (ModelService): Service used to call models.
+        semaphore (asyncio.Semaphore): Semaphore bounding concurrent model calls.
+        backend (Backend): Backend to send the search to.
+        user_search (str): User's search as a string.
+        report (WarmReport): Report the outcome is counted in.
+
+    Returns:
+        SnapshotEntry | None: The cached response, or None if the call failed.
+    """
+    async with semaphore:
+        for attempt in range(1, ATTEMPTS + 1):
+            try:
+                result = await service.call(backend, user_search)
+            except UNAVAILABLE_ERRORS as unavailable_error:
+                if attempt == ATTEMPTS:
+                    report.failed[type(unavailable_error).__name__] += 1
+                    logger.warning(f"Not warmed {backend} {user_search!r}. {unavailable_error}")
+                    return None
+                await asyncio.sleep(unavailable_error.retry_after)
+            except (*MODEL_CALL_ERRORS, DeadlineExceededError) as model_call_error:
+                report.failed[type(model_call_error).__name__] += 1
+                logger.warning(f"Not warmed {backend} {user_search!r}. {model_call_error}")
+                return None
+            else:
+                break
+    if result.cache_hit:
+        report.cached += 1
+    else:
+        report.fetched += 1
+    target = result.target
+    return SnapshotEntry(target.cache_key(user_search), target.scope, user_search, result.response)
+
+
+async def warm_cache(
+    service: ModelService,
+    queries: Iterable[RankedQuery],
+    backends: Iterable[Backend],
+    concurrency: int,
+) -> WarmReport:
+    """
+    Fetch the responses to searches from each backend into the cache.
+
+    Searches are sent in the order given, so the most frequent are warmed first
+    should warming be interrupted.
+
+    Args:
+        service (ModelService): Service used to call models.
+        queries (Iterable[RankedQuery]): Searches to warm, most frequent first.
+        backends (Iterable[Backend]): Backends to send each search to.
+        concurrency (int): Most model calls in flight at once.
+
+    Returns:
+        WarmReport: Outcome of warming, with the cached responses.
+    """
+    report = WarmReport()
+    semaphore = asyncio.Semaphore(concurrency)
+    max_input_tokens = service.callers.settings.max_input_tokens
+    backends = list(backends)
+    tasks: list[Coroutine[Any, Any, SnapshotEntry | None]] = []
+    for query in queries:
+        try:
+            check_input_length(query.user_search, max_input_tokens)
+        except InputTooLongError:
+            report.skipped += 1
+            continue
+        tasks.extend(
+            warm_search(service, semaphore, backend, query.user_search, report)
+            for backend in backends
+        )
+    entries = await asyncio.gather(*tasks)
+    report.entries = [entry for entry in entries if entry is not None]
+    return report
+
+
+async def run(queries: list[RankedQuery], backends: list[Backend], concurrency: int) -> WarmReport:
+    """
+    Warm the cache through a model service configured as the API's workers are.
+
+    The semantic cache is not used, so every search gets its own response rather
+    than that of a similar search, and the rate limiter is shared with workers.
+
+    Args:
+        queries (list[RankedQuery]): Searches to warm, most frequent first.
+        backends (list[Backend]): Backends to send each search to.
+        concurrency (int): Most model calls in flight at once.
+
+    Returns:
+        WarmReport: Outcome of warming, with the cached responses.
+    """
+    settings = get_settings()
+    callers = CallerRegistry(settings)
+    service = ModelService(
+        callers,
+        ResponseCache(settings.response_cache_ttl_seconds, settings.response_cache_max_bytes),
+        build_shared_cache(settings),
+        SQLiteRateLimiter(settings.rate_limit_path),
+    )
+    try:
+        return await warm_cache(service, queries, backends, concurrency)
+    finally:
+        await service.aclose()
+        await callers.aclose()
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line options.
+
+    Returns
+        argparse.Namespace: Parsed options.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m llm_api.warm",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("log", type=Path, help="Query log, as plain text or JSON lines.")
+    parser.add_argument("--top", type=int, default=100, help="Number of searches to warm.")
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        type=Backend,
+        default=None,
+        help="Backends to warm. Defaults to LLM_API_ROUTING_BACKENDS.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Most model calls in flight. Defaults to LLM_API_BATCH_CONCURRENCY.",
+    )
+    parser.add_argument("--snapshot", type=Path, default=None, help="File to save responses to.")
+    parser.add_argument(
+        "--field", default="user_search", help="Field holding the search in JSON lines."
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Warm the cache from a query log, print a summary and fail if any call failed."""
+    arguments = parse_arguments()
+    settings = get_settings()
+    with arguments.log.open(encoding="utf-8", errors="replace") as log_file:
+        queries = rank_queries(log_file, arguments.field)[: arguments.top]
+    report = asyncio.run(
+        run(
+            queries,
+            arguments.backends or settings.routing_backends,
+            arguments.concurrency or settings.batch_concurrency,
+        )
+    )
+    print(report.summary())  # noqa: T201
+    if arguments.snapshot is not None:
+        # Least frequent first, so a worker whose cache cannot hold them all
+        # evicts the rarest while loading.
+        saved = write_snapshot(arguments.snapshot, reversed(report.entries))
+        print(f"Saved {saved} responses to {arguments.snapshot}.")  # noqa: T201
+    if report.failed:
+        sys.exit(f"{report.failed.total()} model calls failed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Provides Gunicorn worker profiles and the Uvicorn worker the API is served by."""
+import os
+from typing import Any, NamedTuple
+
+from uvicorn.workers import UvicornWorker
+
+from llm_api.config import ServerProfile, ServerSettings
+
+
+class WorkerProfile(NamedTuple):
+    """
+    How many workers Gunicorn runs and how each is loaded and sized.
+
+    Attributes
+        workers (int): Number of worker processes.
+        worker_connections (int): Requests each worker serves at once before
+            answering 503.
+        preload (bool): Import the API once in the Gunicorn master, so workers share
+            its memory copy-on-write instead of each importing it.
+    """
+
+    workers: int
+    worker_connections: int
+    preload: bool
+
+
+def profile_defaults(profile: ServerProfile, cpu_count: int) -> WorkerProfile:
+    """
+    Return the worker options a profile uses on a host.
+
+    `async` runs one worker per CPU, as each worker's event loop can keep many
+    model calls in flight while it waits on the network. `lean` halves that and
+    lets each worker take more requests at once, for hosts short of memory.
+    `legacy` is the `2 * CPUs + 1` formula suited to synchronous workers, kept
+    for comparison.
+
+    Args:
+        profile (ServerProfile): Profile to apply.
+        cpu_count (int): Number of CPUs on the host.
+
+    Returns:
+        WorkerProfile: Worker options of the profile.
+    """
+    if profile is ServerProfile.LEAN:
+        return WorkerProfile(max(cpu_count // 2, 1), 2000, preload=True)
+    if profile is ServerProfile.LEGACY:
+        return WorkerProfile(cpu_count * 2 + 1, 1000, preload=False)
+    return WorkerProfile(cpu_count, 1000, preload=True)
+
+
+def resolve_profile(settings: ServerSettings, cpu_count: int | None = None) -> WorkerProfile:
+    """
+    Return the worker options to serve with, overriding the profile with any set explicitly.
+
+    Args:
+        settings (ServerSettings): Pydantic server settings object.
+        cpu_count (int | None, optional): Number of CPUs on the host. Defaults to None,
+            for the number available to this process.
+
+    Returns:
+        WorkerProfile: Worker options to serve with.
+    """
+    if cpu_count is None:
+        cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else 1
+    defaults = profile_defaults(settings.profile, cpu_count)
+    return WorkerProfile(
+        workers=settings.workers or defaults.workers,
+        worker_connections=settings.worker_connections or defaults.worker_connections,
+        preload=defaults.preload if settings.preload is None else settings.preload,
+    )
+
+
+class AsyncUvicornWorker(UvicornWorker):
+    """
+    Uvicorn worker using the configured event loop and HTTP parser.
+
+    Gunicorn's `worker_connections` bounds the requests each worker serves at once,
+    as it does for Gunicorn's own async workers. Requests beyond it are answered
+    with 503 rather than queued behind a saturated event loop.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        """
+        Class constructor.
+
+        Args:
+            *args (Any): Positional arguments passed by Gunicorn.
+            **kwargs (Any): Keyword arguments passed by Gunicorn.
+        """
+        settings = ServerSettings()
+        self.CONFIG_KWARGS = {"loop": str(settings.loop), "http": str(settings.http)}
+        super().__init__(*args, **kwargs)
+        self.config.limit_concurrency = self.cfg.worker_connections
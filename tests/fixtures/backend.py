@@ -5,7 +5,7 @@ from contextlib import asynccontextmanager
 import pytest
 from fastapi import FastAPI
 from pydantic import SecretStr
-from llm_api.config import BedrockModel, GPTModel, Settings
+from llm_api.config import BedrockModel, GPTModel, Settings, reload_settings
 from fastapi.testclient import TestClient
 from llm_api.main import app
 from httpx import AsyncClient, ASGITransport
@@ -48,6 +48,8 @@ def set_test_environment_variables(
     monkeypatch.setenv("LLM_API_AWS_ACCESS_KEY_ID", "a-fake-access-key-id")
     monkeypatch.setenv("LLM_API_AWS_SECRET_ACCESS_KEY", "a-fake-secret-access-key")
     monkeypatch.setenv("LLM_API_AWS_BEDROCK_MODEL_ID", "anthropic.claude-v2")
+    monkeypatch.setenv("LLM_API_SHARED_CACHE_BACKEND", "none")
+    reload_settings()
     yield
     monkeypatch.delenv("ENV")
     monkeypatch.delenv("LLM_API_OPENAI_API_KEY")
@@ -55,6 +57,7 @@ def set_test_environment_variables(
     monkeypatch.delenv("LLM_API_AWS_ACCESS_KEY_ID")
     monkeypatch.delenv("LLM_API_AWS_SECRET_ACCESS_KEY")
     monkeypatch.delenv("LLM_API_AWS_BEDROCK_MODEL_ID")
+    monkeypatch.delenv("LLM_API_SHARED_CACHE_BACKEND")
 
 @pytest.fixture
 def test_sync_client(set_test_environment_variables) -> Generator[TestClient, None, None]:
@@ -65,5 +68,7 @@ def test_sync_client(set_test_environment_variables) -> Generator[TestClient, No
 @pytest.fixture
 @asynccontextmanager
 async def test_async_client(set_test_environment_variables) -> AsyncGenerator[AsyncClient, None]:
-    async with AsyncClient(transport=ASGITransport(app=get_app()), base_url="http://test") as ac:
-        yield ac
+    test_app = get_app()
+    async with test_app.router.lifespan_context(test_app):
+        async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as ac:
+            yield ac
@@ -0,0 +1,77 @@
+import pytest
+from fastapi import status
+
+from llm_api.backends.openai import OpenaiCaller
+from llm_api.config import reload_settings
+from llm_api.main import app
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.fixture()
+def admin_token(monkeypatch):
+    token = "a-test-admin-token"
+    monkeypatch.setenv("LLM_API_ADMIN_TOKEN", token)
+    reload_settings()
+    return token
+
+
+@pytest.mark.asyncio
+async def test_admin_routes_disabled_without_token(test_async_client):
+    async with test_async_client as ac:
+        response = await ac.post("/admin/reload")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_admin_reload_rejects_wrong_token(admin_token, test_async_client):
+    async with test_async_client as ac:
+        response = await ac.post("/admin/reload", headers={"X-Admin-Token": "wrong"})
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_admin_reload_rebuilds_callers(admin_token, monkeypatch, test_async_client):
+    async with test_async_client as ac:
+        callers = app.state.callers
+        old_openai_caller = callers.openai
+        monkeypatch.setenv("LLM_API_OPENAI_API_KEY", "a-rotated-key")
+
+        response = await ac.post("/admin/reload", headers={"X-Admin-Token": admin_token})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert callers.openai is not old_openai_caller
+        assert callers.openai.settings.openai_api_key.get_secret_value() == "a-rotated-key"
+
+
+@pytest.mark.asyncio
+async def test_admin_reload_keeps_callers_on_invalid_settings(
+    admin_token, monkeypatch, test_async_client
+):
+    async with test_async_client as ac:
+        callers = app.state.callers
+        old_openai_caller = callers.openai
+        monkeypatch.setenv("LLM_API_OPENAI_LLM_NAME", "not-a-model")
+
+        response = await ac.post("/admin/reload", headers={"X-Admin-Token": admin_token})
+
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert callers.openai is old_openai_caller
+
+
+@pytest.mark.asyncio
+async def test_admin_cache_stats(admin_token, mocker, test_async_client):
+    mocker.patch.object(
+        OpenaiCaller, "call_model", return_value={"entities": [], "connections": []}
+    )
+    async with test_async_client as ac:
+        await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+        await ac.post("/call_model_openai", json={"user_search": "macbeth"})
+
+        response = await ac.get("/admin/cache", headers={"X-Admin-Token": admin_token})
+
+    assert response.json()["memory"]["hits"] == 1
+    assert response.json()["memory"]["misses"] == 1
+    assert response.json()["memory"]["entries"] == 1
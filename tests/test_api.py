@@ -1,10 +1,13 @@
 """API tests."""
+import asyncio
+
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 
 from llm_api.backends.bedrock import BedrockCaller, BedrockModelCallError
 from llm_api.backends.openai import OpenaiCaller, OpenaiModelCallError
+from llm_api.config import reload_settings
 from llm_api.main import app
 
 sync_client = TestClient(app)
@@ -87,3 +90,91 @@ async def test_call_model_bedrock_failure(mocker, test_async_client):
         response = await ac.post("/call_model_bedrock", json=payload)
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_call_model_cached(mocker, test_async_client):
+    model_output = {"entities": [{"uri": "Macbeth"}], "connections": []}
+    mocked_call = mocker.patch.object(OpenaiCaller, "call_model", return_value=model_output)
+    async with test_async_client as ac:
+        first = await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+        second = await ac.post("/call_model_openai", json={"user_search": "  macbeth "})
+
+        assert first.headers["X-Cache"] == "miss"
+        assert second.headers["X-Cache"] == "hit"
+        assert second.json()["entities"] == model_output["entities"]
+        assert second.json()["user_search"] == "  macbeth "
+        mocked_call.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_call_model_cache_bypass(mocker, test_async_client):
+    model_output = {"entities": [{"uri": "Macbeth"}], "connections": []}
+    mocked_call = mocker.patch.object(BedrockCaller, "call_model", return_value=model_output)
+    async with test_async_client as ac:
+        await ac.post("/call_model_bedrock", json={"user_search": "Macbeth"})
+        response = await ac.post(
+            "/call_model_bedrock", json={"user_search": "Macbeth"}, headers={"X-Cache-Bypass": "true"}
+        )
+
+        assert response.headers["X-Cache"] == "miss"
+        assert mocked_call.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_not_shared_between_models(mocker, test_async_client):
+    model_output = {"entities": [{"uri": "Macbeth"}], "connections": []}
+    mocked_call = mocker.patch.object(BedrockCaller, "call_model", return_value=model_output)
+    async with test_async_client as ac:
+        await ac.post("/call_model_bedrock", json={"user_search": "Macbeth"})
+        response = await ac.post("/call_model_bedrock_instant", json={"user_search": "Macbeth"})
+
+        assert response.headers["X-Cache"] == "miss"
+        assert mocked_call.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_call_model_served_from_shared_cache(mocker, monkeypatch, tmp_path, test_async_client):
+    monkeypatch.setenv("LLM_API_SHARED_CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("LLM_API_SHARED_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    reload_settings()
+    model_output = {"entities": [{"uri": "Macbeth"}], "connections": []}
+    mocked_call = mocker.patch.object(OpenaiCaller, "call_model", return_value=model_output)
+    async with test_async_client as ac:
+        await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+        app.state.model_service.cache.clear()
+
+        response = await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+
+        assert response.headers["X-Cache"] == "hit"
+        assert response.json()["entities"] == model_output["entities"]
+        mocked_call.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_requests_coalesced(mocker, test_async_client):
+    model_output = {"entities": [{"uri": "Macbeth"}], "connections": []}
+
+    async def slow_call(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return model_output
+
+    mocked_call = mocker.patch.object(BedrockCaller, "call_model", side_effect=slow_call)
+    async with test_async_client as ac:
+        searches = ["Macbeth", "macbeth", "  MACBETH"]
+        responses = await asyncio.gather(
+            *(ac.post("/call_model_bedrock", json={"user_search": search}) for search in searches)
+        )
+
+        mocked_call.assert_called_once()
+        assert [response.json()["user_search"] for response in responses] == searches
+
+
+def test_openapi_schema_describes_search_response():
+    schema = sync_client.get("/openapi.json").json()
+
+    operation = schema["paths"]["/call_model_openai"]["post"]
+    response_schema = operation["responses"]["200"]["content"]["application/json"]["schema"]
+    assert response_schema == {"$ref": "#/components/schemas/SearchResponse"}
+    connection = schema["components"]["schemas"]["Connection"]
+    assert connection["required"] == ["from", "to"]
@@ -1,6 +1,7 @@
 import json
 
 import pytest
+from botocore.exceptions import ClientError
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.exceptions import LangChainException
 from langchain.schema.messages import HumanMessage
@@ -11,8 +12,8 @@ pytest_plugins = ("pytest_asyncio",)
 
 
 def test_bedrock_caller_load_settings(mocker, mock_settings):
-    mocked_boto3_client = mocker.patch(
-        "llm_api.backends.bedrock.BedrockCaller.get_boto3_client"
+    mocked_runtime_client = mocker.patch(
+        "llm_api.backends.bedrock.BedrockCaller.get_runtime_client"
     )
     mocked_bedrock_client = mocker.patch(
         "llm_api.backends.bedrock.BedrockCaller.get_client"
@@ -22,7 +23,7 @@ def test_bedrock_caller_load_settings(mocker, mock_settings):
     expected_test_key = mock_settings.aws_secret_access_key.get_secret_value()
 
     assert caller.settings.aws_secret_access_key.get_secret_value() == expected_test_key
-    mocked_boto3_client.assert_called_once()
+    mocked_runtime_client.assert_called_once()
     mocked_bedrock_client.assert_called_once()
 
 
@@ -34,7 +35,7 @@ def test_generate_openai_prompt_success():
 
     prompt_output = prompt_output.format_messages(text=user_input)
 
-    expected_prompt_elements = 5
+    expected_prompt_elements = 2
     assert len(prompt_output) == expected_prompt_elements
     assert isinstance(prompt_output[-1], HumanMessage)
     assert prompt_output[-1].content == user_input
@@ -88,36 +89,71 @@ async def test_call_model_success(mocker, mock_settings):
 
 
 @pytest.mark.asyncio
-async def test_call_model_failure_index_error(mocker, mock_settings):
+async def test_call_model_without_code_fences(mocker, mock_settings):
     caller = BedrockCaller(mock_settings)
     mocked_result = {
         "entities": [
-            {
-                "uri": "William Shakespeare",
-                "description": "English playwright, poet, and actor",
-                "wikipedia_url": "https://en.wikipedia.org/wiki/William_Shakespeare",
-            },
-            {
-                "uri": "Globe Theatre",
-                "description": "Theatre in London associated with William Shakespeare",
-                "wikipedia_url": "https://en.wikipedia.org/wiki/Globe_Theatre",
-            },
+            {"uri": "William Shakespeare", "description": "Playwright", "wikipedia_url": None},
         ],
         "connections": [
-            {
-                "from": "William Shakespeare",
-                "to": "Globe Theatre",
-                "label": "performed plays at",
-            },
+            {"from": "William Shakespeare", "to": "Globe Theatre", "description": "Acted there"},
         ],
-        "user_search": "Who is Shakespeare?",
     }
-    mocked_result = "Test json" + json.dumps(mocked_result)
+    mocker.patch(
+        "langchain.schema.runnable.base.RunnableSequence.ainvoke",
+        return_value="Test json" + json.dumps(mocked_result) + " I hope this helps!",
+    )
+
+    response = await caller.call_model(caller.generate_prompt(), "Who is Shakespeare?")
+
+    assert response == mocked_result
+
+
+@pytest.mark.asyncio
+async def test_call_model_repairs_prompt_example_format(mocker, mock_settings):
+    caller = BedrockCaller(mock_settings)
+    mocked_result = """```json
+    {'entities': [{'uri': 'Lady Macbeth', 'description': 'Macbeth's wife',},],
+    'connections': [{'from': 'Lady Macbeth' 'to': 'Macbeth' 'description': 'Married'}
+    ```"""
     mocker.patch(
         "langchain.schema.runnable.base.RunnableSequence.ainvoke",
         return_value=mocked_result,
     )
-    expected_error_message = "Unable to parse model output as expected."
+
+    response = await caller.call_model(caller.generate_prompt(), "Who is Macbeth?")
+
+    assert response == {
+        "entities": [
+            {"uri": "Lady Macbeth", "description": "Macbeth's wife", "wikipedia_url": None}
+        ],
+        "connections": [{"from": "Lady Macbeth", "to": "Macbeth", "description": "Married"}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_call_model_reasks_for_unreadable_output(mocker, mock_settings):
+    caller = BedrockCaller(mock_settings)
+    mocked_client_call = mocker.patch(
+        "langchain.schema.runnable.base.RunnableSequence.ainvoke",
+        side_effect=["I cannot answer in JSON.", '{"entities": [], "connections": []}'],
+    )
+
+    response = await caller.call_model(caller.generate_prompt(), "Who is Shakespeare?")
+
+    assert response == {"entities": [], "connections": []}
+    reask_inputs = mocked_client_call.call_args.args[0]
+    assert reask_inputs["model_output"] == "I cannot answer in JSON."
+
+
+@pytest.mark.asyncio
+async def test_call_model_failure_json_decode_error(mocker, mock_settings):
+    caller = BedrockCaller(mock_settings.model_copy(update={"parse_reask": False}))
+    mocked_client_call = mocker.patch(
+        "langchain.schema.runnable.base.RunnableSequence.ainvoke",
+        return_value="Test ```json\n{entities: [Shakespeare]}\n```",
+    )
+    expected_error_message = "Error decoding model output."
 
     user_template = "{text}"
     test_prompt = ChatPromptTemplate.from_messages(
@@ -132,39 +168,19 @@ async def test_call_model_failure_index_error(mocker, mock_settings):
     with pytest.raises(BedrockModelCallError) as exception:
         await caller.call_model(test_prompt, test_search)
     assert expected_error_message in str(exception.value)
+    mocked_client_call.assert_called_once()
 
 
 @pytest.mark.asyncio
-async def test_call_model_failure_json_decode_error(mocker, mock_settings):
+async def test_call_model_failure_api_error(mocker, mock_settings):
     caller = BedrockCaller(mock_settings)
-    mocked_result = {
-        "entities": [
-            {
-                "uri": "William Shakespeare",
-                "description": "English playwright, poet, and actor",
-                "wikipedia_url": "https://en.wikipedia.org/wiki/William_Shakespeare",
-            },
-            {
-                "uri": "Globe Theatre",
-                "description": "Theatre in London associated with William Shakespeare",
-                "wikipedia_url": "https://en.wikipedia.org/wiki/Globe_Theatre",
-            },
-        ],
-        "connections": [
-            {
-                "from": "William Shakespeare",
-                "to": "Globe Theatre",
-                "label": "performed plays at",
-            },
-        ],
-        "user_search": "Who is Shakespeare?",
-    }
-    mocked_result = "Test ```json," + json.dumps(mocked_result) + "```"
-    mocker.patch(
-        "langchain.schema.runnable.base.RunnableSequence.ainvoke",
-        return_value=mocked_result,
+
+    mocked_client_call = mocker.patch(
+        "langchain.schema.runnable.base.RunnableSequence.ainvoke"
     )
-    expected_error_message = "Error decoding model output."
+    expected_error_message = "Error calling model."
+
+    mocked_client_call.side_effect = ValueError()
 
     user_template = "{text}"
     test_prompt = ChatPromptTemplate.from_messages(
@@ -178,19 +194,20 @@ async def test_call_model_failure_json_decode_error(mocker, mock_settings):
 
     with pytest.raises(BedrockModelCallError) as exception:
         await caller.call_model(test_prompt, test_search)
+
     assert expected_error_message in str(exception.value)
 
 
 @pytest.mark.asyncio
-async def test_call_model_failure_api_error(mocker, mock_settings):
+async def test_call_model_failure_langchain_error(mocker, mock_settings):
     caller = BedrockCaller(mock_settings)
 
     mocked_client_call = mocker.patch(
         "langchain.schema.runnable.base.RunnableSequence.ainvoke"
     )
-    expected_error_message = "Error calling model."
+    expected_error_message = "Error sending prompt to LLM."
 
-    mocked_client_call.side_effect = ValueError()
+    mocked_client_call.side_effect = LangChainException()
 
     user_template = "{text}"
     test_prompt = ChatPromptTemplate.from_messages(
@@ -209,15 +226,19 @@ async def test_call_model_failure_api_error(mocker, mock_settings):
 
 
 @pytest.mark.asyncio
-async def test_call_model_failure_langchain_error(mocker, mock_settings):
+async def test_call_model_failure_client_error(mocker, mock_settings):
     caller = BedrockCaller(mock_settings)
 
     mocked_client_call = mocker.patch(
         "langchain.schema.runnable.base.RunnableSequence.ainvoke"
     )
-    expected_error_message = "Error sending prompt to LLM."
+    expected_error_message = "Error calling model."
 
-    mocked_client_call.side_effect = LangChainException()
+    client_error = ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Too many requests"}},
+        "InvokeModel",
+    )
+    mocked_client_call.side_effect = client_error
 
     user_template = "{text}"
     test_prompt = ChatPromptTemplate.from_messages(
@@ -233,3 +254,4 @@ async def test_call_model_failure_langchain_error(mocker, mock_settings):
         await caller.call_model(test_prompt, test_search)
 
     assert expected_error_message in str(exception.value)
+    assert exception.value.__cause__ is client_error
@@ -0,0 +1,229 @@
+import json
+import struct
+import zlib
+
+import httpx
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+
+from benchmarks.fake_upstream import encode_event
+from llm_api.backends.bedrock_runtime import AsyncBedrockLLM, BedrockRuntimeClient
+from llm_api.resilience.retry import is_retryable
+
+pytest_plugins = ("pytest_asyncio",)
+
+MODEL_ID = "anthropic.claude-v2"
+
+
+def exception_event(exception_type, message):
+    headers = b""
+    for name, value in (
+        (":exception-type", exception_type),
+        (":content-type", "application/json"),
+        (":message-type", "exception"),
+    ):
+        headers += struct.pack("!B", len(name)) + name.encode()
+        headers += struct.pack("!BH", 7, len(value)) + value.encode()
+    body = json.dumps({"message": message}).encode()
+    prelude = struct.pack("!II", 16 + len(headers) + len(body), len(headers))
+    event = prelude + struct.pack("!I", zlib.crc32(prelude)) + headers + body
+    return event + struct.pack("!I", zlib.crc32(event))
+
+
+def runtime_client(handler):
+    client = BedrockRuntimeClient("key-id", "secret", "us-east-1")
+    client.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.sync_http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_invoke_signs_request():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"completion": "Macbeth", "stop_reason": "stop"})
+
+    client = runtime_client(handler)
+    response = await client.invoke(MODEL_ID, {"prompt": "\n\nHuman: Macbeth"})
+
+    (request,) = requests
+    assert response["completion"] == "Macbeth"
+    assert str(request.url) == (
+        f"https://bedrock-runtime.us-east-1.amazonaws.com/model/{MODEL_ID}/invoke"
+    )
+    assert request.headers["Authorization"].startswith("AWS4-HMAC-SHA256 Credential=key-id/")
+    assert "/us-east-1/bedrock/aws4_request" in request.headers["Authorization"]
+    assert "X-Amz-Date" in request.headers
+    assert json.loads(request.content) == {"prompt": "\n\nHuman: Macbeth"}
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_invoke_raises_retryable_client_error():
+    def handler(request):  # noqa: ARG001
+        return httpx.Response(
+            429,
+            json={"message": "Too many requests"},
+            headers={"x-amzn-ErrorType": "ThrottlingException:http://internal.amazon.com/"},
+        )
+
+    client = runtime_client(handler)
+    with pytest.raises(ClientError) as exc_info:
+        await client.invoke(MODEL_ID, {"prompt": "Macbeth"})
+
+    assert exc_info.value.response["Error"]["Code"] == "ThrottlingException"
+    assert exc_info.value.response["Error"]["Message"] == "Too many requests"
+    assert is_retryable(exc_info.value)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("transport_error", "expected_error"),
+    [
+        (httpx.ReadTimeout("timed out"), ReadTimeoutError),
+        (httpx.ConnectError("refused"), EndpointConnectionError),
+    ],
+)
+async def test_invoke_translates_transport_errors(transport_error, expected_error):
+    def handler(request):  # noqa: ARG001
+        raise transport_error
+
+    client = runtime_client(handler)
+    with pytest.raises(expected_error) as exc_info:
+        await client.invoke(MODEL_ID, {"prompt": "Macbeth"})
+
+    assert is_retryable(exc_info.value)
+
+
+def test_invoke_sync_signs_request_and_raises_client_error():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(200, json={"completion": "Macbeth", "stop_reason": "stop"})
+        return httpx.Response(
+            429,
+            json={"message": "Too many requests"},
+            headers={"x-amzn-ErrorType": "ThrottlingException"},
+        )
+
+    client = runtime_client(handler)
+
+    assert client.invoke_sync(MODEL_ID, {"prompt": "Macbeth"})["completion"] == "Macbeth"
+    assert requests[0].headers["Authorization"].startswith("AWS4-HMAC-SHA256 Credential=key-id/")
+    with pytest.raises(ClientError) as exc_info:
+        client.invoke_sync(MODEL_ID, {"prompt": "Macbeth"})
+    assert exc_info.value.response["Error"]["Code"] == "ThrottlingException"
+    assert is_retryable(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_invoke_stream_decodes_chunks():
+    events = b"".join(
+        encode_event({"completion": text, "stop_reason": None}) for text in ("Mac", "beth")
+    )
+
+    def handler(request):
+        assert request.url.path.endswith("/invoke-with-response-stream")
+        return httpx.Response(200, content=events)
+
+    client = runtime_client(handler)
+    chunks = [chunk async for chunk in client.invoke_stream(MODEL_ID, {"prompt": "Macbeth"})]
+
+    assert [chunk["completion"] for chunk in chunks] == ["Mac", "beth"]
+
+
+@pytest.mark.asyncio
+async def test_invoke_stream_raises_exception_events():
+    events = encode_event({"completion": "Mac"}) + exception_event(
+        "modelStreamErrorException", "Model stopped"
+    )
+
+    def handler(request):  # noqa: ARG001
+        return httpx.Response(200, content=events)
+
+    client = runtime_client(handler)
+    chunks = []
+    with pytest.raises(ClientError) as exc_info:
+        async for chunk in client.invoke_stream(MODEL_ID, {"prompt": "Macbeth"}):
+            chunks.append(chunk)
+
+    assert chunks == [{"completion": "Mac"}]
+    assert exc_info.value.response["Error"]["Code"] == "modelStreamErrorException"
+
+
+class DroppedStream(httpx.AsyncByteStream):
+    def __init__(self, data):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+        raise httpx.RemoteProtocolError("peer closed connection")
+
+
+@pytest.mark.asyncio
+async def test_invoke_stream_translates_dropped_connection():
+    def handler(request):  # noqa: ARG001
+        return httpx.Response(200, stream=DroppedStream(encode_event({"completion": "Mac"})))
+
+    client = runtime_client(handler)
+    chunks = []
+    with pytest.raises(EndpointConnectionError) as exc_info:
+        async for chunk in client.invoke_stream(MODEL_ID, {"prompt": "Macbeth"}):
+            chunks.append(chunk)
+
+    assert chunks == [{"completion": "Mac"}]
+    assert is_retryable(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_llm_builds_anthropic_body_and_streams():
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        if request.url.path.endswith("/invoke"):
+            return httpx.Response(200, json={"completion": " Macbeth"})
+        return httpx.Response(200, content=encode_event({"completion": " Macbeth"}))
+
+    llm = AsyncBedrockLLM(
+        client=runtime_client(handler),
+        model_id=MODEL_ID,
+        model_kwargs={"max_tokens_to_sample": 16},
+    )
+
+    assert await llm.ainvoke("Macbeth") == " Macbeth"
+    assert [chunk async for chunk in llm.astream("Macbeth")] == [" Macbeth"]
+    assert bodies[0]["prompt"] == "\n\nHuman: Macbeth\n\nAssistant:"
+    assert bodies[0]["max_tokens_to_sample"] == 16
+
+
+@pytest.mark.asyncio
+async def test_llm_sends_output_limit():
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json={"completion": " Macbeth"})
+
+    llm = AsyncBedrockLLM(client=runtime_client(handler), model_id=MODEL_ID, max_tokens=32)
+
+    await llm.ainvoke("Macbeth")
+
+    assert bodies[0]["max_tokens_to_sample"] == 32
+
+
+def test_llm_calls_model_synchronously():
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json={"content": [{"type": "text", "text": "Macbeth"}]})
+
+    llm = AsyncBedrockLLM(client=runtime_client(handler), model_id=MODEL_ID, max_tokens=32)
+
+    assert llm.invoke("Macbeth") == "Macbeth"
+    assert bodies[0]["max_tokens_to_sample"] == 32
@@ -30,7 +30,7 @@ def test_generate_openai_prompt_success():
 
     prompt_output = prompt_output.format_messages(text=user_input)
 
-    expected_prompt_elements = 5
+    expected_prompt_elements = 2
     assert len(prompt_output) == expected_prompt_elements
     assert isinstance(prompt_output[-1], HumanMessage)
     assert prompt_output[-1].content == user_input
@@ -173,3 +173,53 @@ async def test_call_model_failure_api_error(mocker, mock_settings):
         await caller.call_model(test_prompt, test_search)
 
     assert str(exception.value) == expected_error_message
+
+
+@pytest.mark.asyncio
+async def test_call_model_failure_json_decode_error(mocker, mock_settings):
+    caller = OpenaiCaller(mock_settings)
+    mocker.patch(
+        "langchain.schema.runnable.base.RunnableSequence.ainvoke",
+        return_value=AIMessage(content="not json"),
+    )
+
+    with pytest.raises(OpenaiModelCallError) as exception:
+        await caller.call_model(OpenaiCaller.generate_openai_prompt(), "Who is Shakespeare?")
+
+    assert "Error decoding model output." in str(exception.value)
+
+
+@pytest.mark.asyncio
+async def test_stream_model_failure_rate_limit_error(mocker, mock_settings):
+    caller = OpenaiCaller(mock_settings)
+    mocked_response = mocker.patch("httpx.Response")
+
+    async def astream(*args, **kwargs):
+        raise openai.RateLimitError("Slow down", response=mocked_response, body=None)
+        yield
+
+    mocker.patch(
+        "langchain.schema.runnable.base.RunnableSequence.astream", side_effect=astream
+    )
+
+    with pytest.raises(OpenaiModelCallError) as exception:
+        async for _ in caller.stream_model(
+            OpenaiCaller.generate_openai_prompt(), "Who is Shakespeare?"
+        ):
+            pass
+
+    assert str(exception.value) == "Rate limit exceeded. Slow down"
+
+
+@pytest.mark.asyncio
+async def test_call_model_failure_schema_mismatch(mocker, mock_settings):
+    caller = OpenaiCaller(mock_settings.model_copy(update={"parse_reask": False}))
+    mocker.patch(
+        "langchain.schema.runnable.base.RunnableSequence.ainvoke",
+        return_value=AIMessage(content='{"entities": [{"description": "No uri"}]}'),
+    )
+
+    with pytest.raises(OpenaiModelCallError) as exception:
+        await caller.call_model(OpenaiCaller.generate_openai_prompt(), "Who is Shakespeare?")
+
+    assert "does not match the response schema" in str(exception.value)
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from llm_api.backends.bedrock import BedrockCaller
+from llm_api.backends.openai import OpenaiCaller
+from llm_api.backends.registry import CallerRegistry
+from llm_api.config import BedrockModel, ProviderWarmup
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def test_registry_builds_each_caller_once(mock_settings):
+    registry = CallerRegistry(mock_settings)
+
+    assert isinstance(registry.openai, OpenaiCaller)
+    assert isinstance(registry.bedrock, BedrockCaller)
+    assert registry.openai.settings is mock_settings
+    assert registry.bedrock.settings is mock_settings
+
+
+def test_bedrock_alternative_model_does_not_replace_default_client(mock_settings):
+    caller = BedrockCaller(mock_settings)
+    default_client = caller.client
+
+    instant_client = caller.get_model_client(BedrockModel.CLAUDE_INSTANT)
+
+    assert caller.client is default_client
+    assert caller.get_model_client(BedrockModel.CLAUDE_INSTANT) is instant_client
+    assert caller.get_model_client(mock_settings.aws_bedrock_model_id) is default_client
+
+
+def test_registry_builds_callers_on_first_use(mock_settings):
+    registry = CallerRegistry(mock_settings)
+
+    assert registry._openai is None
+    assert registry._bedrock is None
+    assert registry.openai is registry.openai
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("warmup", "built"),
+    [
+        (ProviderWarmup.LAZY, False),
+        (ProviderWarmup.BACKGROUND, True),
+        (ProviderWarmup.EAGER, True),
+    ],
+)
+async def test_registry_warm_up(mock_settings, warmup, built):
+    registry = CallerRegistry(mock_settings)
+
+    await registry.warm_up(warmup)
+
+    assert (registry._openai is not None) is built
+    assert (registry._bedrock is not None) is built
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_registry_aclose_closes_clients(mock_settings):
+    registry = CallerRegistry(mock_settings)
+    registry.warm()
+
+    await registry.aclose()
+
+    assert registry.openai.http_client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_callers_shared_across_requests(mocker, test_async_client):
+    model_output = {"entities": [], "connections": []}
+    mocked_call = mocker.patch.object(
+        OpenaiCaller, "call_model", autospec=True, return_value=model_output
+    )
+    async with test_async_client as ac:
+        await ac.post("/call_model_openai", json={"user_search": "symbolism in macbeth"})
+        await ac.post("/call_model_openai", json={"user_search": "imagery in macbeth"})
+
+    first_caller, second_caller = (call.args[0] for call in mocked_call.call_args_list)
+    assert first_caller is second_caller
+
+
+@pytest.mark.asyncio
+async def test_registry_reload_closes_retired_callers(mock_settings):
+    registry = CallerRegistry(mock_settings)
+    old_openai_caller = registry.openai
+    new_settings = mock_settings.model_copy(update={"reload_grace_seconds": 0})
+
+    await registry.reload(new_settings)
+    await asyncio.gather(*registry._retiring)
+
+    assert registry.openai is not old_openai_caller
+    assert registry.settings is new_settings
+    assert old_openai_caller.http_client.is_closed
+    assert not registry.openai.http_client.is_closed
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_registry_reload_leaves_unused_callers_unbuilt(mock_settings):
+    registry = CallerRegistry(mock_settings)
+    old_openai_caller = registry.openai
+    new_settings = mock_settings.model_copy(update={"reload_grace_seconds": 0})
+
+    await registry.reload(new_settings)
+    await asyncio.gather(*registry._retiring)
+
+    assert registry._bedrock is None
+    assert registry.openai is not old_openai_caller
+    assert registry.bedrock.settings is new_settings
+    await registry.aclose()
@@ -0,0 +1,108 @@
+"""Batch API tests."""
+import asyncio
+import json
+
+import pytest
+from fastapi import status
+
+from llm_api.backends.bedrock import BedrockCaller, BedrockModelCallError
+from llm_api.backends.openai import OpenaiCaller
+from llm_api.config import reload_settings
+from llm_api.routers.batch import BatchInputSpec, call_model_batch
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def model_output(user_search):
+    return {
+        "entities": [{"uri": user_search, "description": "", "wikipedia_url": None}],
+        "connections": [],
+    }
+
+
+@pytest.mark.asyncio
+async def test_batch_returns_results_in_order(mocker, test_async_client):
+    async def call_model(prompt_template, user_search, **kwargs):
+        if user_search == "fails":
+            raise BedrockModelCallError("upstream failed")
+        await asyncio.sleep(0.01 if user_search == "slow" else 0)
+        return model_output(user_search)
+
+    mocker.patch.object(BedrockCaller, "call_model", side_effect=call_model)
+    searches = ["slow", "fails", "fast"]
+    async with test_async_client as ac:
+        payload = {"backend": "bedrock", "items": [{"user_search": s} for s in searches]}
+        response = await ac.post("/call_model_batch", json=payload)
+
+    results = response.json()["results"]
+    assert response.status_code == status.HTTP_200_OK
+    assert [result["user_search"] for result in results] == searches
+    assert results[0]["response"] == model_output("slow")
+    assert results[1]["response"] is None
+    assert "upstream failed" in results[1]["error"]
+    assert results[2]["response"] == model_output("fast")
+
+
+@pytest.mark.asyncio
+async def test_batch_streams_ndjson_as_results_finish(mocker, test_async_client):
+    async def call_model(prompt_template, user_search, usage=None):
+        await asyncio.sleep(0.05 if user_search == "slow" else 0)
+        return model_output(user_search)
+
+    mocker.patch.object(OpenaiCaller, "call_model", side_effect=call_model)
+    async with test_async_client as ac:
+        payload = {"items": [{"user_search": "slow"}, {"user_search": "fast"}], "stream": True}
+        response = await ac.post("/call_model_batch", json=payload)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [line["index"] for line in lines] == [1, 0]
+
+
+@pytest.mark.asyncio
+async def test_batch_stream_calls_models_once_read(mocker, mock_settings):
+    result = mocker.Mock(response=model_output("Macbeth"), cache_hit=False)
+    service = mocker.Mock(call=mocker.AsyncMock(return_value=result))
+    request_body = BatchInputSpec(items=[{"user_search": "Macbeth"}], stream=True)
+
+    response = await call_model_batch(request_body, service, asyncio.Semaphore(1), mock_settings)
+    await asyncio.sleep(0)
+
+    service.call.assert_not_called()
+    lines = [line async for line in response.body_iterator]
+    assert json.loads(lines[0])["response"] == model_output("Macbeth")
+
+
+@pytest.mark.asyncio
+async def test_batch_concurrency_bounded(mocker, monkeypatch, test_async_client):
+    monkeypatch.setenv("LLM_API_BATCH_CONCURRENCY", "2")
+    reload_settings()
+    in_flight = 0
+    peak = 0
+
+    async def call_model(prompt_template, user_search, usage=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return model_output(user_search)
+
+    mocker.patch.object(OpenaiCaller, "call_model", side_effect=call_model)
+    async with test_async_client as ac:
+        payload = {"items": [{"user_search": f"search {i}"} for i in range(6)]}
+        response = await ac.post("/call_model_batch", json=payload)
+
+    assert len(response.json()["results"]) == 6
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_size_limited(monkeypatch, test_async_client):
+    monkeypatch.setenv("LLM_API_BATCH_MAX_ITEMS", "1")
+    reload_settings()
+    async with test_async_client as ac:
+        payload = {"items": [{"user_search": "a"}, {"user_search": "b"}]}
+        response = await ac.post("/call_model_batch", json=payload)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
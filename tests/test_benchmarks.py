@@ -0,0 +1,124 @@
+"""Benchmark harness tests."""
+import base64
+import json
+import math
+
+import httpx
+import pytest
+from botocore.eventstream import EventStreamBuffer
+
+from benchmarks.fake_upstream import FakeUpstream, UpstreamProfile, build_app, encode_event
+from benchmarks.import_time import LAZY_MODULES, ImportTime, measure, median_seconds, parse_importtime
+from benchmarks.load import percentile, run_load
+from llm_api.backends.bedrock import BedrockCaller
+from llm_api.backends.openai import OpenaiCaller
+
+pytest_plugins = ("pytest_asyncio",)
+
+INSTANT = UpstreamProfile(latency_median_seconds=0)
+
+
+def upstream_client(upstream):
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=build_app(upstream)), base_url="http://upstream"
+    )
+
+
+def test_percentile():
+    values = [0.1 * index for index in range(1, 101)]
+
+    assert percentile(values, 0.5) == pytest.approx(5.0)
+    assert percentile(values, 0.99) == pytest.approx(9.9)
+    assert math.isnan(percentile([], 0.5))
+
+
+@pytest.mark.asyncio
+async def test_openai_caller_parses_stand_in_response(mock_settings):
+    settings = mock_settings.model_copy(update={"openai_base_url": "http://upstream/v1"})
+    caller = OpenaiCaller(settings)
+    await caller.aclose()
+    caller.http_client = upstream_client(FakeUpstream(INSTANT, INSTANT))
+    caller.client = caller.get_client()
+
+    response = await caller.call_model(caller.generate_openai_prompt(), "Macbeth")
+
+    assert response["entities"][0]["uri"] == "Macbeth 0"
+    await caller.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stand_in_failure_rates():
+    failing = UpstreamProfile(latency_median_seconds=0, error_rate=1)
+    malformed = UpstreamProfile(latency_median_seconds=0, malformed_rate=1)
+    body = {"model": "gpt-4-1106-preview", "messages": [{"role": "user", "content": "Macbeth"}]}
+    async with upstream_client(FakeUpstream(failing, malformed)) as client:
+        openai_response = await client.post("/v1/chat/completions", json=body)
+        bedrock_response = await client.post(
+            "/model/anthropic.claude-v2/invoke", json={"prompt": "\n\nHuman: Macbeth"}
+        )
+
+    assert openai_response.status_code == 500
+    assert "```" not in bedrock_response.json()["completion"]
+
+
+def test_stand_in_encodes_bedrock_event_stream():
+    buffer = EventStreamBuffer()
+    buffer.add_data(encode_event({"completion": "Macbeth", "stop_reason": None}))
+
+    (message,) = list(buffer)
+    chunk = json.loads(base64.b64decode(json.loads(message.payload)["bytes"]))
+
+    assert message.headers[":event-type"] == "chunk"
+    assert chunk["completion"] == "Macbeth"
+
+
+@pytest.mark.asyncio
+async def test_run_load_reports_every_request(mocker, test_async_client):
+    mocker.patch.object(
+        OpenaiCaller, "call_model", return_value={"entities": [], "connections": []}
+    )
+    async with test_async_client as ac:
+        result = await run_load(
+            ac, "/call_model_openai", ["Macbeth", "Hamlet"], concurrency=4, requests=20
+        )
+
+    summary = result.summary()
+    assert summary["requests"] == 20
+    assert summary["statuses"] == {"200": 20}
+    assert summary["p50"] <= summary["p95"] <= summary["p99"]
+    assert result.throughput > 0
+
+
+@pytest.mark.asyncio
+async def test_bedrock_caller_parses_stand_in_response(mock_settings):
+    settings = mock_settings.model_copy(update={"aws_bedrock_endpoint_url": "http://upstream"})
+    caller = BedrockCaller(settings)
+    await caller.aclose()
+    caller.runtime_client.http_client = upstream_client(FakeUpstream(INSTANT, INSTANT))
+
+    response = await caller.call_model(caller.generate_prompt(), "Macbeth")
+    chunks = [chunk async for chunk in caller.stream_model(caller.generate_prompt(), "Macbeth")]
+
+    assert response["entities"][0]["uri"] == "Macbeth 0"
+    assert "Macbeth 0" in "".join(chunks)
+    await caller.aclose()
+
+
+def test_parse_importtime():
+    output = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   llm_api.config\n"
+        "import time:      2000 |       2120 | llm_api.main\n"
+    )
+
+    times = parse_importtime(output)
+
+    assert times[-1] == ImportTime("llm_api.main", 2000, 2120)
+    assert median_seconds([times], "llm_api.main") == pytest.approx(0.00212)
+
+
+def test_main_does_not_import_provider_sdks():
+    imported = {time.module for time in measure("llm_api.main")}
+
+    assert "llm_api.main" in imported
+    assert imported.isdisjoint(LAZY_MODULES)
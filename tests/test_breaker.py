@@ -0,0 +1,190 @@
+"""Circuit breaker tests."""
+import asyncio
+
+import pytest
+from fastapi import status
+from prometheus_client import REGISTRY
+
+from llm_api.backends.openai import OpenaiCaller, OpenaiModelCallError, OpenaiResponseParseError
+from llm_api.config import reload_settings
+from llm_api.resilience.breaker import (
+    BreakerConfig,
+    BreakerState,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture()
+def breaker(clock):
+    config = BreakerConfig(min_calls=4, open_seconds=10.0, half_open_calls=2, slow_call_seconds=5.0)
+    return CircuitBreaker("test backend", config, clock=clock)
+
+
+def call(breaker, seconds=1.0, *, failed=False):
+    breaker.acquire()
+    breaker.record(seconds, failed=failed)
+
+
+def test_breaker_trips_on_failure_rate(breaker):
+    call(breaker, failed=True)
+    call(breaker)
+    call(breaker, failed=True)
+    assert breaker.state is BreakerState.CLOSED
+
+    call(breaker)
+
+    assert breaker.state is BreakerState.OPEN
+    assert breaker.trips == 1
+    with pytest.raises(CircuitOpenError) as circuit_open_error:
+        breaker.acquire()
+    assert circuit_open_error.value.retry_after == 10.0
+
+
+def test_breaker_trips_on_slow_calls(breaker):
+    for _ in range(4):
+        call(breaker, seconds=6.0)
+
+    assert breaker.state is BreakerState.OPEN
+
+
+def test_breaker_forgets_calls_outside_window(breaker, clock):
+    for _ in range(3):
+        call(breaker, failed=True)
+    clock.now += 61
+
+    call(breaker, failed=True)
+
+    assert breaker.state is BreakerState.CLOSED
+
+
+def test_half_open_breaker_closes_after_successful_probes(breaker, clock):
+    for _ in range(4):
+        call(breaker, failed=True)
+    clock.now += 10
+
+    assert breaker.state is BreakerState.HALF_OPEN
+    breaker.acquire()
+    breaker.acquire()
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    breaker.record(1.0, failed=False)
+    breaker.record(1.0, failed=False)
+
+    assert breaker.state is BreakerState.CLOSED
+
+
+def test_breaker_reports_state_and_trips_in_metrics(clock):
+    def sample(name):
+        return REGISTRY.get_sample_value(name, {"backend": "metrics"}) or 0
+
+    config = BreakerConfig(min_calls=2, open_seconds=10.0, half_open_calls=1)
+    breaker = CircuitBreaker("metrics backend", config, clock=clock, backend="metrics")
+    trips = sample("llm_api_breaker_trips_total")
+
+    assert sample("llm_api_breaker_state") == 0
+    call(breaker, failed=True)
+    call(breaker, failed=True)
+    assert sample("llm_api_breaker_state") == 2
+    assert sample("llm_api_breaker_trips_total") == trips + 1
+
+    clock.now += 10.0
+    assert breaker.state is BreakerState.HALF_OPEN
+    assert sample("llm_api_breaker_state") == 1
+    call(breaker)
+
+    assert sample("llm_api_breaker_state") == 0
+
+
+def test_half_open_breaker_reopens_on_failed_probe(breaker, clock):
+    for _ in range(4):
+        call(breaker, failed=True)
+    clock.now += 10
+
+    call(breaker, failed=True)
+
+    assert breaker.state is BreakerState.OPEN
+    assert breaker.trips == 2
+
+
+def test_cancelled_probe_releases_its_slot(breaker, clock):
+    for _ in range(4):
+        call(breaker, failed=True)
+    clock.now += 10
+    breaker.acquire()
+    breaker.acquire()
+
+    breaker.release()
+
+    breaker.acquire()
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_fast_with_503(monkeypatch, mocker, test_async_client):
+    monkeypatch.setenv("LLM_API_BREAKER_MIN_CALLS", "2")
+    reload_settings()
+    mock_call_model = mocker.patch.object(
+        OpenaiCaller, "call_model", side_effect=OpenaiModelCallError("upstream failed")
+    )
+    async with test_async_client as ac:
+        for user_search in ("Macbeth", "Hamlet"):
+            response = await ac.post("/call_model_openai", json={"user_search": user_search})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = await ac.post("/call_model_openai", json={"user_search": "Othello"})
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "30"
+    assert mock_call_model.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_parse_failures_do_not_trip_breaker(monkeypatch, mocker, test_async_client):
+    monkeypatch.setenv("LLM_API_BREAKER_MIN_CALLS", "2")
+    reload_settings()
+    mocker.patch.object(
+        OpenaiCaller, "call_model", side_effect=OpenaiResponseParseError("bad output")
+    )
+    async with test_async_client as ac:
+        for user_search in ("Macbeth", "Hamlet", "Othello"):
+            response = await ac.post("/call_model_openai", json={"user_search": user_search})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_backend_hanging_past_deadline_trips_breaker(monkeypatch, mocker, test_async_client):
+    monkeypatch.setenv("LLM_API_BREAKER_MIN_CALLS", "2")
+    reload_settings()
+
+    async def hang(*args, **kwargs):  # noqa: ARG001
+        await asyncio.sleep(60)
+
+    mock_call_model = mocker.patch.object(OpenaiCaller, "call_model", side_effect=hang)
+    async with test_async_client as ac:
+        for user_search in ("Macbeth", "Hamlet"):
+            response = await ac.post(
+                "/call_model_openai",
+                json={"user_search": user_search},
+                headers={"X-Request-Timeout": "0.05"},
+            )
+            assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+
+        response = await ac.post("/call_model_openai", json={"user_search": "Othello"})
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert mock_call_model.call_count == 2
@@ -0,0 +1,71 @@
+import pytest
+
+from llm_api.cache.keys import make_cache_key, normalise_search
+from llm_api.cache.memory import ResponseCache
+
+RESPONSE = {"entities": [{"uri": "Macbeth"}], "connections": []}
+
+
+def test_normalise_search():
+    assert normalise_search("  Imagery   in\tMACBETH\n") == "imagery in macbeth"
+    assert normalise_search("Café") == normalise_search("Café")
+    assert normalise_search("STRASSE") == normalise_search("straße")
+
+
+def test_cache_key_varies_with_model_temperature_and_prompt():
+    key = make_cache_key("macbeth", "gpt-4", 0.2, "v1")
+
+    assert key == make_cache_key(" Macbeth ", "gpt-4", 0.2, "v1")
+    assert key != make_cache_key("macbeth", "claude", 0.2, "v1")
+    assert key != make_cache_key("macbeth", "gpt-4", 0.5, "v1")
+    assert key != make_cache_key("macbeth", "gpt-4", 0.2, "v2")
+
+
+def test_cache_hit_returns_copy():
+    cache = ResponseCache(ttl_seconds=60, max_bytes=10_000)
+    cache.set("key", RESPONSE)
+
+    first = cache.get("key")
+    first["user_search"] = "mutated"
+
+    assert cache.get("key") == RESPONSE
+    assert cache.stats.hits == 2
+    assert cache.get("missing") is None
+    assert cache.stats.misses == 1
+
+
+def test_cache_expires_entries(mocker):
+    clock = mocker.patch("llm_api.cache.memory.time.monotonic", return_value=100.0)
+    cache = ResponseCache(ttl_seconds=10, max_bytes=10_000)
+    cache.set("key", RESPONSE)
+
+    clock.return_value = 110.0
+
+    assert cache.get("key") is None
+    assert cache.stats.expirations == 1
+    assert len(cache) == 0
+    assert cache.size_bytes == 0
+
+
+def test_cache_evicts_least_recently_used():
+    probe = ResponseCache(ttl_seconds=60, max_bytes=10_000)
+    probe.set("key-a", RESPONSE)
+    cache = ResponseCache(ttl_seconds=60, max_bytes=probe.size_bytes * 2)
+    cache.set("key-a", RESPONSE)
+    cache.set("key-b", RESPONSE)
+
+    cache.get("key-a")
+    cache.set("key-c", RESPONSE)
+
+    assert cache.get("key-b") is None
+    assert cache.get("key-a") == RESPONSE
+    assert cache.get("key-c") == RESPONSE
+    assert cache.stats.evictions == 1
+    assert cache.size_bytes <= cache.max_bytes
+
+
+def test_cache_skips_oversized_responses():
+    cache = ResponseCache(ttl_seconds=60, max_bytes=10)
+    cache.set("key", RESPONSE)
+
+    assert len(cache) == 0
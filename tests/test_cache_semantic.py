@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+from llm_api.backends.openai import OpenaiCaller
+from llm_api.cache.semantic import HashingEmbedder, SemanticCache
+from llm_api.config import reload_settings
+from llm_api.main import app
+
+pytest_plugins = ("pytest_asyncio",)
+
+RESPONSE = {"entities": [{"uri": "French Revolution"}], "connections": []}
+
+
+def test_embedder_ignores_word_order_and_stop_words():
+    embedder = HashingEmbedder(dimensions=512)
+
+    vector = embedder.embed("french revolution causes")
+
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+    assert np.array_equal(vector, embedder.embed("Causes of the French Revolution"))
+    assert float(vector @ embedder.embed("Macbeth themes")) < 0.2
+    assert not embedder.embed("of the").any()
+
+
+def test_match_uses_threshold_and_scope():
+    cache = SemanticCache(threshold=0.9, max_entries=8, dimensions=512)
+    cache.add("french revolution causes", "gpt-4", "key-french")
+    cache.add("american revolution causes", "gpt-4", "key-american")
+
+    (match,) = cache.match("the causes of the French Revolution", "gpt-4")
+
+    assert match.key == "key-french"
+    assert match.similarity == pytest.approx(1.0)
+    assert cache.match("russian revolution causes", "gpt-4") == []
+    assert cache.match("french revolution causes", "claude") == []
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_embedder_anchors_numbers_short_words_and_negations():
+    embedder = HashingEmbedder(dimensions=512)
+
+    assert embedder.anchors("Causes of World War 1") == {"1"}
+    assert embedder.anchors("vitamin b12 vs vitamin d") == {"b12", "vs", "d"}
+    assert embedder.anchors("why isn't the verdict not guilty") == {"isn't", "not"}
+    assert embedder.anchors("Shakespeare's tragedies") == set()
+
+
+@pytest.mark.parametrize(
+    ("indexed_search", "user_search"),
+    [
+        ("world war 1", "world war 2"),
+        ("vitamin d deficiency", "vitamin b12 deficiency"),
+        ("guilty verdict", "not guilty verdict"),
+    ],
+)
+def test_match_requires_same_anchors(indexed_search, user_search):
+    cache = SemanticCache(threshold=0.88, max_entries=8, dimensions=256)
+    cache.add(indexed_search, "gpt-4", "key")
+
+    assert cache.match(user_search, "gpt-4") == []
+    assert cache.match(indexed_search.upper(), "gpt-4")[0].key == "key"
+
+
+def test_match_serves_rephrasings_above_default_threshold():
+    cache = SemanticCache(threshold=0.88, max_entries=8, dimensions=256)
+    cache.add("world war 1 causes", "gpt-4", "key-war")
+    cache.add("shakespeare tragedies", "gpt-4", "key-shakespeare")
+    cache.add("french revolution causes", "gpt-4", "key-french")
+
+    assert cache.match("Causes of World War 1", "gpt-4")[0].key == "key-war"
+    assert cache.match("Shakespeare's tragedies", "gpt-4")[0].key == "key-shakespeare"
+    assert cache.match("what caused the french revolution", "gpt-4")[0].key == "key-french"
+    assert cache.match("French Revolution", "gpt-4") == []
+
+
+def test_full_index_evicts_least_recently_used(mocker):
+    clock = mocker.patch("llm_api.cache.semantic.time.monotonic", return_value=1.0)
+    cache = SemanticCache(threshold=0.9, max_entries=2, dimensions=512)
+    cache.add("macbeth", "gpt-4", "key-macbeth")
+    clock.return_value = 2.0
+    cache.add("hamlet", "gpt-4", "key-hamlet")
+    clock.return_value = 3.0
+    cache.match("Macbeth", "gpt-4")
+
+    cache.add("othello", "gpt-4", "key-othello")
+
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+    assert cache.match("hamlet", "gpt-4") == []
+    assert cache.match("macbeth", "gpt-4")[0].key == "key-macbeth"
+
+
+def test_discard_frees_row_for_reuse():
+    cache = SemanticCache(threshold=0.9, max_entries=1, dimensions=512)
+    cache.add("macbeth", "gpt-4", "key-macbeth")
+
+    cache.discard("key-macbeth")
+    cache.add("hamlet", "gpt-4", "key-hamlet")
+
+    assert cache.match("macbeth", "gpt-4") == []
+    assert cache.match("hamlet", "gpt-4")[0].key == "key-hamlet"
+    assert (cache.stats.expirations, cache.stats.evictions) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_paraphrased_search_served_from_semantic_cache(
+    mocker, monkeypatch, test_async_client
+):
+    monkeypatch.setenv("LLM_API_SEMANTIC_CACHE_ENABLED", "true")
+    reload_settings()
+    mocked_call = mocker.patch.object(OpenaiCaller, "call_model", return_value=RESPONSE)
+
+    async with test_async_client as ac:
+        first = await ac.post(
+            "/call_model_openai", json={"user_search": "french revolution causes"}
+        )
+        second = await ac.post(
+            "/call_model_openai", json={"user_search": "Causes of the French Revolution"}
+        )
+        app.state.model_service.cache.clear()
+        third = await ac.post(
+            "/call_model_openai", json={"user_search": "causes of the french revolution?"}
+        )
+
+    assert first.headers["X-Cache"] == "miss"
+    assert second.headers["X-Cache"] == "hit"
+    assert second.json()["user_search"] == "Causes of the French Revolution"
+    assert third.headers["X-Cache"] == "miss"
+    assert mocked_call.call_count == 2
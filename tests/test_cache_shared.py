@@ -0,0 +1,85 @@
+import time
+
+import fakeredis
+import pytest
+
+from llm_api.cache.shared import RedisSharedCache, SQLiteSharedCache, build_shared_cache
+from llm_api.config import SharedCacheBackend
+
+pytest_plugins = ("pytest_asyncio",)
+
+RESPONSE = {"entities": [{"uri": "Macbeth"}], "connections": []}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_shared_between_connections(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    writer = SQLiteSharedCache(path, ttl_seconds=60, max_entries=10)
+    reader = SQLiteSharedCache(path, ttl_seconds=60, max_entries=10)
+
+    await writer.set("key", RESPONSE)
+
+    assert await reader.get("key") == RESPONSE
+    assert await reader.get("missing") is None
+    assert reader.stats.hits == 1
+    assert reader.stats.misses == 1
+    await writer.aclose()
+    await reader.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_survives_reopening(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = SQLiteSharedCache(path, ttl_seconds=60, max_entries=10)
+    await cache.set("key", RESPONSE)
+    await cache.aclose()
+
+    reopened = SQLiteSharedCache(path, ttl_seconds=60, max_entries=10)
+
+    assert await reopened.get("key") == RESPONSE
+    await reopened.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_expires_and_prunes(mocker, tmp_path):
+    clock = mocker.patch("llm_api.cache.shared.time.time", return_value=time.time())
+    cache = SQLiteSharedCache(tmp_path / "cache.sqlite3", ttl_seconds=10, max_entries=2)
+    cache.prune_interval = 4
+    await cache.set("old", RESPONSE)
+    clock.return_value += 20
+
+    assert await cache.get("old") is None
+
+    for key in ("a", "b", "c"):
+        await cache.set(key, RESPONSE)
+
+    assert cache.stats.expirations == 1
+    assert cache.stats.evictions == 1
+    assert await cache.get("a") is None
+    assert await cache.get("c") == RESPONSE
+    await cache.aclose()
+
+
+@pytest.mark.asyncio
+async def test_redis_cache():
+    cache = RedisSharedCache(fakeredis.FakeAsyncRedis(), ttl_seconds=60)
+
+    await cache.set("key", RESPONSE)
+
+    assert await cache.get("key") == RESPONSE
+    assert await cache.get("missing") is None
+    assert await cache.client.pttl(cache.key_prefix + "key") > 0
+    await cache.aclose()
+
+
+def test_build_shared_cache(mock_settings, tmp_path):
+    disabled = mock_settings.model_copy(update={"shared_cache_backend": SharedCacheBackend.NONE})
+    sqlite = mock_settings.model_copy(
+        update={
+            "shared_cache_backend": SharedCacheBackend.SQLITE,
+            "shared_cache_path": tmp_path / "cache.sqlite3",
+        }
+    )
+
+    assert build_shared_cache(disabled) is None
+    assert isinstance(build_shared_cache(sqlite), SQLiteSharedCache)
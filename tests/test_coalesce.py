@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from llm_api.coalesce import SingleFlight
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_call():
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"calls": calls}
+
+    waiters = [asyncio.create_task(single_flight.do("key", call)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert [joined for _, joined in results] == [False, True, True, True, True]
+    assert all(result is results[0][0] for result, _ in results)
+    assert single_flight.coalesced == 4
+    assert len(single_flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_shared_by_all_waiters():
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def call():
+        await release.wait()
+        raise ValueError("upstream failed")
+
+    waiters = [asyncio.create_task(single_flight.do("key", call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_call():
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def call():
+        await release.wait()
+        return "result"
+
+    leader = asyncio.create_task(single_flight.do("key", call))
+    follower = asyncio.create_task(single_flight.do("key", call))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await follower == ("result", True)
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_call_cancelled_when_no_waiters_remain():
+    single_flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def call():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(single_flight.do("key", call))
+    await asyncio.sleep(0)
+    waiter.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    await asyncio.sleep(0)
+    assert len(single_flight) == 0
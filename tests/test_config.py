@@ -0,0 +1,29 @@
+import pytest
+from pydantic import ValidationError
+
+from llm_api.config import get_settings, reload_settings
+
+
+def test_get_settings_is_cached():
+    assert get_settings() is get_settings()
+
+
+def test_reload_settings_swaps_in_new_settings(monkeypatch):
+    original = get_settings()
+    monkeypatch.setenv("LLM_API_OPENAI_API_KEY", "a-rotated-key")
+
+    reloaded = reload_settings()
+
+    assert reloaded is not original
+    assert get_settings() is reloaded
+    assert reloaded.openai_api_key.get_secret_value() == "a-rotated-key"
+
+
+def test_reload_settings_keeps_current_settings_when_invalid(monkeypatch):
+    original = get_settings()
+    monkeypatch.setenv("LLM_API_OPENAI_LLM_NAME", "not-a-model")
+
+    with pytest.raises(ValidationError):
+        reload_settings()
+
+    assert get_settings() is original
@@ -0,0 +1,133 @@
+"""Hedged model call tests."""
+import asyncio
+
+import pytest
+from fastapi import status
+
+from llm_api.backends.bedrock import BedrockCaller, BedrockModelCallError
+from llm_api.backends.openai import OpenaiCaller, OpenaiModelCallError
+from llm_api.config import Backend, reload_settings
+from llm_api.hedging import MIN_LATENCY_SAMPLES, Hedger, LatencyWindow
+from llm_api.main import app
+from llm_api.resilience.breaker import CircuitBreaker
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.fixture()
+def hedge_delay(monkeypatch):
+    monkeypatch.setenv("LLM_API_HEDGE_DELAY_SECONDS", "0.05")
+    reload_settings()
+
+
+def model_output(backend):
+    return {"entities": [{"uri": backend}], "connections": []}
+
+
+def test_latency_window_quantile():
+    window = LatencyWindow(size=10)
+    assert window.quantile(0.9) is None
+
+    for seconds in range(1, 21):
+        window.record(seconds)
+
+    assert len(window) == 10
+    assert window.quantile(0.9) == 19
+    assert window.quantile(0.5) == 15
+
+
+@pytest.mark.asyncio
+async def test_hedge_delay_follows_primary_latency(test_async_client):
+    async with test_async_client:
+        hedger: Hedger = app.state.hedger
+        assert hedger.delay(Backend.OPENAI) == hedger.settings.hedge_initial_delay_seconds
+
+        for _ in range(MIN_LATENCY_SAMPLES):
+            hedger._record(Backend.OPENAI, 0.5)
+
+        assert hedger.delay(Backend.OPENAI) == 0.5
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged(hedge_delay, mocker, test_async_client):
+    mocker.patch.object(OpenaiCaller, "call_model", return_value=model_output("openai"))
+    mock_bedrock = mocker.patch.object(BedrockCaller, "call_model")
+    async with test_async_client as ac:
+        response = await ac.post("/call_model_hedged", json={"user_search": "Macbeth"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Hedged"] == "false"
+    assert response.headers["X-Backend"] == "openai"
+    assert response.json()["entities"] == [{"uri": "openai"}]
+    mock_bedrock.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_loses_to_secondary(hedge_delay, mocker, test_async_client):
+    primary_cancelled = asyncio.Event()
+
+    async def slow_call_model(prompt_template, user_search, usage=None):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            primary_cancelled.set()
+            raise
+
+    mocker.patch.object(OpenaiCaller, "call_model", side_effect=slow_call_model)
+    mocker.patch.object(BedrockCaller, "call_model", return_value=model_output("bedrock"))
+    release = mocker.spy(CircuitBreaker, "release")
+    record = mocker.spy(CircuitBreaker, "record")
+    async with test_async_client as ac:
+        response = await ac.post("/call_model_hedged", json={"user_search": "Macbeth"})
+        stats = app.state.hedger.stats
+        primary_breaker = app.state.model_service.breaker(Backend.OPENAI)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Hedged"] == "true"
+    assert response.headers["X-Backend"] == "bedrock_instant"
+    assert response.json()["entities"] == [{"uri": "bedrock"}]
+    assert primary_cancelled.is_set()
+    # Losing the race does not count against the primary's health.
+    assert [call.args[0] for call in release.call_args_list] == [primary_breaker]
+    assert primary_breaker not in [call.args[0] for call in record.call_args_list]
+    assert (stats.calls, stats.hedged, stats.secondary_wins) == (1, 1, 1)
+    assert stats.win_rate == 1.0
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_falls_back_to_secondary(hedge_delay, mocker, test_async_client):
+    mocker.patch.object(
+        OpenaiCaller, "call_model", side_effect=OpenaiModelCallError("upstream failed")
+    )
+    mocker.patch.object(BedrockCaller, "call_model", return_value=model_output("bedrock"))
+    async with test_async_client as ac:
+        response = await ac.post("/call_model_hedged", json={"user_search": "Macbeth"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Backend"] == "bedrock_instant"
+
+
+@pytest.mark.asyncio
+async def test_hedged_call_fails_if_both_backends_fail(hedge_delay, mocker, test_async_client):
+    mocker.patch.object(
+        OpenaiCaller, "call_model", side_effect=OpenaiModelCallError("primary failed")
+    )
+    mocker.patch.object(
+        BedrockCaller, "call_model", side_effect=BedrockModelCallError("secondary failed")
+    )
+    async with test_async_client as ac:
+        response = await ac.post("/call_model_hedged", json={"user_search": "Macbeth"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "primary failed" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_hedged_call_rejects_same_backends(test_async_client):
+    async with test_async_client as ac:
+        response = await ac.post(
+            "/call_model_hedged",
+            json={"user_search": "Macbeth", "primary": "bedrock", "secondary": "bedrock"},
+        )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,129 @@
+"""Metrics tests."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import status
+from langchain_core.language_models import FakeListChatModel
+from prometheus_client import REGISTRY
+
+from llm_api.backends.openai import OpenaiCaller, OpenaiResponseParseError
+
+pytest_plugins = ("pytest_asyncio",)
+
+MODEL_OUTPUT = {"entities": [{"uri": "Macbeth"}], "connections": []}
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def stage_count(stage, backend="openai", model="gpt-4-1106-preview"):
+    return sample(
+        "llm_api_stage_duration_seconds_count", backend=backend, model=model, stage=stage
+    )
+
+
+@pytest.mark.asyncio
+async def test_call_model_records_stage_durations(mocker, mock_settings):
+    mocker.patch.object(
+        OpenaiCaller,
+        "get_client",
+        return_value=FakeListChatModel(responses=[json.dumps(MODEL_OUTPUT)]),
+    )
+    caller = OpenaiCaller(mock_settings)
+    before = {stage: stage_count(stage) for stage in ("prompt", "upstream", "parse")}
+
+    await caller.call_model(caller.generate_openai_prompt(), "Macbeth")
+
+    for stage, count in before.items():
+        assert stage_count(stage) == count + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_count_cache_lookups(mocker, test_async_client):
+    mocker.patch.object(OpenaiCaller, "call_model", return_value=MODEL_OUTPUT)
+    misses = sample("llm_api_cache_lookups_total", backend="openai", tier="none")
+    hits = sample("llm_api_cache_lookups_total", backend="openai", tier="memory")
+    async with test_async_client as ac:
+        await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+        await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+
+        response = await ac.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "llm_api_stage_duration_seconds" in response.text
+    assert sample("llm_api_cache_lookups_total", backend="openai", tier="none") == misses + 1
+    assert sample("llm_api_cache_lookups_total", backend="openai", tier="memory") == hits + 1
+    assert sample("llm_api_requests_in_flight") == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_count_parse_failures(mocker, test_async_client):
+    mocker.patch.object(
+        OpenaiCaller, "call_model", side_effect=OpenaiResponseParseError("Bad output.")
+    )
+    failures = sample("llm_api_parse_failures_total", backend="openai", model="gpt-4-1106-preview")
+    errors = sample("llm_api_errors_total", backend="openai", error="OpenaiResponseParseError")
+    async with test_async_client as ac:
+        response = await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert (
+        sample("llm_api_parse_failures_total", backend="openai", model="gpt-4-1106-preview")
+        == failures + 1
+    )
+    assert (
+        sample("llm_api_errors_total", backend="openai", error="OpenaiResponseParseError")
+        == errors + 1
+    )
+    assert sample("llm_api_upstream_in_flight", backend="openai") == 0
+
+
+@pytest.mark.asyncio
+async def test_call_model_records_parse_outcomes(mocker, mock_settings):
+    repaired_output = "{'entities': [{'uri': 'Macbeth'},], 'connections': []}"
+    mocker.patch.object(
+        OpenaiCaller,
+        "get_client",
+        return_value=FakeListChatModel(
+            responses=[json.dumps(MODEL_OUTPUT), repaired_output, "Sorry.", repaired_output]
+        ),
+    )
+    caller = OpenaiCaller(mock_settings)
+    labels = {"backend": "openai", "model": "gpt-4-1106-preview"}
+    before = {
+        outcome: sample("llm_api_parse_outcomes_total", outcome=outcome, **labels)
+        for outcome in ("clean", "repaired", "reasked")
+    }
+    repair = {"backend": "openai", "repair": "trailing_comma"}
+    trailing_commas = sample("llm_api_parse_repairs_total", **repair)
+
+    for _ in range(3):
+        response = await caller.call_model(caller.generate_openai_prompt(), "Macbeth")
+        assert [entity["uri"] for entity in response["entities"]] == ["Macbeth"]
+
+    for outcome, count in before.items():
+        assert sample("llm_api_parse_outcomes_total", outcome=outcome, **labels) == count + 1
+    assert sample("llm_api_parse_repairs_total", **repair) == trailing_commas + 2
+
+
+def test_gunicorn_config_enables_multiprocess_metrics(tmp_path):
+    script = (
+        "import llm_api.gunicorn_conf\n"
+        "from prometheus_client import values\n"
+        "from llm_api.metrics import TOKENS\n"
+        "TOKENS.labels('openai', 'gpt-4', 'prompt').inc()\n"
+        "print(values.ValueClass.__name__)\n"
+    )
+    env = {**os.environ, "TMPDIR": str(tmp_path)}
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.split()[-1] == "MmapedValue"
+    assert list((tmp_path / "llm_api_metrics").glob("counter_*.db"))
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from llm_api.parsing.extract import JsonExtractionError, extract_json
+
+RESPONSE = {
+    "entities": [
+        {"uri": "Macbeth", "description": "A {tragedy} by \"Shakespeare\"", "year": 1606},
+        {"uri": "Lady Macbeth", "description": "Macbeth's wife"},
+    ],
+    "connections": [{"from": "Lady Macbeth", "to": "Macbeth", "description": "Married"}],
+}
+
+
+def test_valid_json_needs_no_repair():
+    extraction = extract_json(json.dumps(RESPONSE))
+
+    assert extraction.value == RESPONSE
+    assert not extraction.repaired
+
+
+def test_ignores_prose_and_code_fences():
+    text = "Here is {your} JSON:\n```json\n" + json.dumps(RESPONSE) + "\n```\nThanks {}"
+
+    extraction = extract_json(text)
+
+    assert extraction.value == RESPONSE
+    assert not extraction.repaired
+
+
+def test_repairs_single_quotes_and_commas():
+    text = """{'entities': [{'uri': 'Lady Macbeth', 'description': 'Macbeth's wife',},],
+    'connections': [{'from': 'Lady Macbeth' 'to': 'Macbeth' 'note': 'said "hi"'}]}"""
+
+    extraction = extract_json(text)
+
+    assert extraction.value == {
+        "entities": [{"uri": "Lady Macbeth", "description": "Macbeth's wife"}],
+        "connections": [{"from": "Lady Macbeth", "to": "Macbeth", "note": 'said "hi"'}],
+    }
+    assert set(extraction.repairs) == {"single_quotes", "trailing_comma", "missing_comma"}
+
+
+def test_repairs_python_literals():
+    extraction = extract_json('{"linked": True, "url": None, "flags": [False]}')
+
+    assert extraction.value == {"linked": True, "url": None, "flags": [False]}
+    assert extraction.repairs == ("python_literal",)
+
+
+@pytest.mark.parametrize(
+    ("cut", "expected"),
+    [
+        ('"Lady Macbeth", "descr', {"entities": [RESPONSE["entities"][0]]}),
+        ('"Lady Mac', {"entities": [RESPONSE["entities"][0]]}),
+        ("", {"entities": [RESPONSE["entities"][0]]}),
+    ],
+)
+def test_truncated_output_keeps_complete_items(cut, expected):
+    text = json.dumps(RESPONSE)
+    text = text[: text.index('"Lady Macbeth"')] + cut
+
+    extraction = extract_json(text)
+
+    assert extraction.value == expected
+    assert extraction.repairs == ("truncated",)
+
+
+def test_truncated_after_key_keeps_empty_collection():
+    extraction = extract_json('{"entities": [{"uri": "Macbeth"}], "connections": [')
+
+    assert extraction.value == {"entities": [{"uri": "Macbeth"}], "connections": []}
+
+
+@pytest.mark.parametrize("text", ["no json here", "{entities: none}", "{'a' 'b'}"])
+def test_unrecoverable_output_raises(text):
+    with pytest.raises(JsonExtractionError):
+        extract_json(text)
@@ -0,0 +1,82 @@
+import json
+
+from llm_api.parsing.incremental import IncrementalResponseParser, ParsedItem
+from llm_api.schemas import validate_model_output
+
+RESPONSE = {
+    "entities": [
+        {"uri": "Macbeth", "description": "A {tragedy} by \"Shakespeare\"", "tags": [{"a": 1}]},
+        {"uri": "Lady Macbeth", "description": "Macbeth's wife"},
+    ],
+    "connections": [{"from": "Lady Macbeth", "to": "Macbeth", "description": "Married"}],
+}
+VALIDATED = validate_model_output(RESPONSE)
+
+
+def feed_in_chunks(parser, text, size):
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start : start + size]))
+    return items
+
+
+def test_emits_each_object_as_it_closes():
+    parser = IncrementalResponseParser()
+    text = json.dumps(RESPONSE)
+    first_entity_end = text.index("}]}") + 3
+
+    assert parser.feed(text[: first_entity_end - 1]) == []
+    assert parser.feed(text[first_entity_end - 1 : first_entity_end]) == [
+        ParsedItem("entity", VALIDATED["entities"][0])
+    ]
+
+
+def test_parses_any_chunking():
+    expected = [
+        *(ParsedItem("entity", entity) for entity in VALIDATED["entities"]),
+        *(ParsedItem("connection", connection) for connection in VALIDATED["connections"]),
+    ]
+    for size in (1, 3, 7, 1000):
+        parser = IncrementalResponseParser()
+        assert feed_in_chunks(parser, json.dumps(RESPONSE, indent=2), size) == expected
+        assert parser.done
+
+
+def test_tolerates_code_fence_and_prose():
+    parser = IncrementalResponseParser()
+    text = "Here is your JSON:\n```json\n" + json.dumps(RESPONSE) + "\n```\nThanks {}"
+
+    items = feed_in_chunks(parser, text, 5)
+
+    assert [item.kind for item in items] == ["entity", "entity", "connection"]
+
+
+def test_accepts_single_quoted_objects():
+    parser = IncrementalResponseParser()
+
+    items = parser.feed("{'entities': [{'uri': 'Macbeth', 'description': 'A play'}]}")
+
+    assert items == [
+        ParsedItem("entity", {"uri": "Macbeth", "description": "A play", "wikipedia_url": None})
+    ]
+
+
+def test_ignores_other_keys():
+    parser = IncrementalResponseParser()
+
+    items = parser.feed('{"notes": [{"a": 1}], "entities": [{"uri": "Macbeth"}]}')
+
+    assert items == [
+        ParsedItem("entity", {"uri": "Macbeth", "description": "", "wikipedia_url": None})
+    ]
+
+
+def test_skips_objects_failing_validation():
+    parser = IncrementalResponseParser()
+
+    items = parser.feed(
+        '{"entities": [{"description": "No uri"}, {"uri": "Macbeth"}],'
+        ' "connections": [{"from": "Macbeth"}]}'
+    )
+
+    assert [item.value["uri"] for item in items] == ["Macbeth"]
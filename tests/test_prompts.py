@@ -0,0 +1,50 @@
+import pytest
+from langchain.schema.messages import HumanMessage, SystemMessage
+
+from llm_api.backends.bedrock import BedrockCaller
+from llm_api.backends.openai import OpenaiCaller
+from llm_api.prompts import BEDROCK_PROMPT, OPENAI_PROMPT, build_prompt, prompt_registry
+from llm_api.schemas import ModelResponse
+
+
+def test_prompt_templates_built_once():
+    assert OpenaiCaller.generate_openai_prompt() is OpenaiCaller.generate_openai_prompt()
+    assert BedrockCaller.generate_prompt() is BedrockCaller.generate_prompt()
+
+
+def test_formatting_reuses_rendered_system_prefix():
+    messages = OPENAI_PROMPT.template.format_messages(text="Who is Shakespeare?")
+
+    assert tuple(messages[:-1]) == OPENAI_PROMPT.system_prefix
+    assert all(
+        formatted is cached
+        for formatted, cached in zip(messages[:-1], OPENAI_PROMPT.system_prefix, strict=True)
+    )
+    assert isinstance(messages[-1], HumanMessage)
+    assert messages[-1].content == "Who is Shakespeare?"
+
+
+@pytest.mark.parametrize("prompt", [OPENAI_PROMPT, BEDROCK_PROMPT])
+def test_system_prefix_is_rendered(prompt):
+    example = prompt.system_prefix[-1].content.splitlines()[-1]
+
+    assert "{{" not in example
+    assert ModelResponse.model_validate_json(example).entities[0].uri == "entity name"
+
+
+def test_prompt_version_detects_changes():
+    prompt = build_prompt("test", [("system", "You are a test system")])
+    same_prompt = build_prompt("test", [("system", "You are a test system")])
+    changed_prompt = build_prompt("test", [("system", "You are a changed test system")])
+
+    assert prompt.version == same_prompt.version
+    assert prompt.version != changed_prompt.version
+    assert isinstance(prompt.system_prefix[0], SystemMessage)
+
+
+def test_registry_versions():
+    assert prompt_registry.get("openai") is OPENAI_PROMPT
+    assert prompt_registry.versions == {
+        "openai": OPENAI_PROMPT.version,
+        "bedrock": BEDROCK_PROMPT.version,
+    }
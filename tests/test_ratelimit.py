@@ -0,0 +1,115 @@
+"""Rate limiter tests."""
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi import status
+
+from llm_api.backends.openai import OpenaiCaller
+from llm_api.config import reload_settings
+from llm_api.resilience.ratelimit import (
+    Budget,
+    RateLimitExceededError,
+    SQLiteRateLimiter,
+)
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest_asyncio.fixture()
+async def limiter(tmp_path):
+    limiter = SQLiteRateLimiter(tmp_path / "ratelimit.sqlite3")
+    yield limiter
+    await limiter.aclose()
+
+
+@pytest.mark.asyncio
+async def test_requests_per_minute_budget_sheds_excess_calls(limiter):
+    budget = Budget(requests_per_minute=2)
+
+    assert await limiter.acquire("openai", budget, tokens=1, max_wait=0) == 0
+    assert await limiter.acquire("openai", budget, tokens=1, max_wait=0) == 0
+    with pytest.raises(RateLimitExceededError) as rate_limit_error:
+        await limiter.acquire("openai", budget, tokens=1, max_wait=0)
+
+    assert 0 < rate_limit_error.value.retry_after <= 30
+    assert limiter.shed == 1
+
+
+@pytest.mark.asyncio
+async def test_tokens_per_minute_budget_waits_for_refill(limiter):
+    budget = Budget(tokens_per_minute=6000)
+
+    await limiter.acquire("bedrock", budget, tokens=6000, max_wait=0)
+    waited = await limiter.acquire("bedrock", budget, tokens=5, max_wait=1)
+
+    assert 0 < waited < 1
+
+
+@pytest.mark.asyncio
+async def test_waiting_calls_are_served_in_arrival_order(limiter):
+    budget = Budget(tokens_per_minute=6000)
+    await limiter.acquire("bedrock", budget, tokens=6000, max_wait=0)
+    served = []
+
+    async def acquire(label, tokens):
+        await limiter.acquire("bedrock", budget, tokens=tokens, max_wait=2)
+        served.append(label)
+
+    # The small call would fit first, but must not overtake the earlier large one.
+    await asyncio.gather(acquire("large", 50), acquire("small", 5))
+
+    assert served == ["large", "small"]
+
+
+@pytest.mark.asyncio
+async def test_queued_call_shed_if_head_waits_too_long(limiter):
+    budget = Budget(tokens_per_minute=6000)
+    await limiter.acquire("bedrock", budget, tokens=6000, max_wait=0)
+    head = asyncio.create_task(limiter.acquire("bedrock", budget, tokens=50, max_wait=2))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(RateLimitExceededError) as rate_limit_error:
+        await limiter.acquire("bedrock", budget, tokens=1, max_wait=0.1)
+
+    assert rate_limit_error.value.retry_after > 0.1
+    await head
+
+
+@pytest.mark.asyncio
+async def test_workers_share_budget(limiter, tmp_path):
+    other_worker = SQLiteRateLimiter(tmp_path / "ratelimit.sqlite3")
+    budget = Budget(requests_per_minute=1)
+
+    await limiter.acquire("openai", budget, tokens=1, max_wait=0)
+    with pytest.raises(RateLimitExceededError):
+        await other_worker.acquire("openai", budget, tokens=1, max_wait=0)
+    await other_worker.aclose()
+
+
+@pytest.mark.asyncio
+async def test_backends_have_separate_budgets(limiter):
+    budget = Budget(requests_per_minute=1)
+
+    await limiter.acquire("openai", budget, tokens=1, max_wait=0)
+    await limiter.acquire("bedrock", budget, tokens=1, max_wait=0)
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_requests_get_429(monkeypatch, tmp_path, mocker, test_async_client):
+    monkeypatch.setenv("LLM_API_RATE_LIMIT_RPM", '{"openai": 1}')
+    monkeypatch.setenv("LLM_API_RATE_LIMIT_MAX_WAIT_SECONDS", "0")
+    monkeypatch.setenv("LLM_API_RATE_LIMIT_PATH", str(tmp_path / "ratelimit.sqlite3"))
+    reload_settings()
+    mock_call_model = mocker.patch.object(
+        OpenaiCaller, "call_model", return_value={"entities": [], "connections": []}
+    )
+    async with test_async_client as ac:
+        response = await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await ac.post("/call_model_openai", json={"user_search": "Hamlet"})
+
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.headers["Retry-After"] == "60"
+    mock_call_model.assert_called_once()
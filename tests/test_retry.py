@@ -0,0 +1,166 @@
+"""Deadline and retry tests."""
+import asyncio
+import random
+
+import httpx
+import openai
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import status
+
+from llm_api.backends.bedrock import BedrockModelCallError
+from llm_api.backends.openai import OpenaiCaller, OpenaiModelCallError, OpenaiResponseParseError
+from llm_api.config import reload_settings
+from llm_api.resilience.retry import (
+    Deadline,
+    DeadlineExceededError,
+    RetryPolicy,
+    call_with_retries,
+    is_retryable,
+)
+
+pytest_plugins = ("pytest_asyncio",)
+
+FAST_RETRIES = RetryPolicy(max_retries=3, base_delay_seconds=0.001, max_delay_seconds=0.001)
+
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status.HTTP_429_TOO_MANY_REQUESTS, request=request)
+    try:
+        raise openai.RateLimitError("Slow down", response=response, body=None)
+    except openai.RateLimitError as error:
+        try:
+            raise OpenaiModelCallError("Rate limit exceeded.") from error
+        except OpenaiModelCallError as model_call_error:
+            return model_call_error
+
+
+def bedrock_error(code):
+    client_error = ClientError({"Error": {"Code": code, "Message": code}}, "InvokeModel")
+    try:
+        raise BedrockModelCallError("Error calling model.") from client_error
+    except BedrockModelCallError as model_call_error:
+        return model_call_error
+
+
+def test_is_retryable_follows_cause_chain():
+    assert is_retryable(rate_limit_error())
+    assert is_retryable(bedrock_error("ThrottlingException"))
+    assert not is_retryable(bedrock_error("ValidationException"))
+    assert not is_retryable(OpenaiResponseParseError("bad output"))
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay_seconds=1.0, max_delay_seconds=4.0)
+    rng = random.Random(0)
+
+    delays = [policy.backoff(retry, rng) for retry in range(10)]
+
+    assert all(0 <= delay <= min(4.0, 2**retry) for retry, delay in enumerate(delays))
+    assert len(set(delays)) == len(delays)
+
+
+@pytest.mark.asyncio
+async def test_retryable_errors_are_retried():
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise rate_limit_error()
+        return "response"
+
+    result = await call_with_retries(call, Deadline(5), FAST_RETRIES, (OpenaiModelCallError,))
+
+    assert result == ("response", 2)
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_limit():
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        raise rate_limit_error()
+
+    with pytest.raises(OpenaiModelCallError):
+        await call_with_retries(call, Deadline(5), FAST_RETRIES, (OpenaiModelCallError,))
+
+    assert attempts == 4
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_are_not_retried():
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        raise OpenaiResponseParseError("bad output")
+
+    with pytest.raises(OpenaiResponseParseError):
+        await call_with_retries(call, Deadline(5), FAST_RETRIES, (OpenaiModelCallError,))
+
+    assert attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_when_backoff_would_pass_deadline():
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        raise rate_limit_error()
+
+    policy = RetryPolicy(base_delay_seconds=10.0, max_delay_seconds=10.0)
+    with pytest.raises(OpenaiModelCallError):
+        await call_with_retries(
+            call, Deadline(1), policy, (OpenaiModelCallError,), rng=random.Random(1)
+        )
+
+    assert attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_attempts_are_bounded_by_deadline():
+    async def call():
+        await asyncio.sleep(10)
+
+    with pytest.raises(DeadlineExceededError):
+        await call_with_retries(call, Deadline(0.01), FAST_RETRIES, (OpenaiModelCallError,))
+
+
+@pytest.mark.asyncio
+async def test_retries_reported_in_response_header(monkeypatch, mocker, test_async_client):
+    monkeypatch.setenv("LLM_API_RETRY_BASE_DELAY_SECONDS", "0.001")
+    reload_settings()
+    mocker.patch.object(
+        OpenaiCaller,
+        "call_model",
+        side_effect=[rate_limit_error(), {"entities": [], "connections": []}],
+    )
+    async with test_async_client as ac:
+        response = await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Upstream-Retries"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_request_timeout_header_sets_deadline(mocker, test_async_client):
+    async def slow_call_model(prompt_template, user_search, usage=None):
+        await asyncio.sleep(10)
+
+    mocker.patch.object(OpenaiCaller, "call_model", side_effect=slow_call_model)
+    async with test_async_client as ac:
+        response = await ac.post(
+            "/call_model_openai",
+            json={"user_search": "Macbeth"},
+            headers={"X-Request-Timeout": "0.05"},
+        )
+
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
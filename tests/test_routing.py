@@ -0,0 +1,125 @@
+"""Adaptive routing tests."""
+import pytest
+from fastapi import status
+
+from llm_api.backends.bedrock import BedrockCaller, BedrockModelCallError
+from llm_api.backends.openai import OpenaiCaller, OpenaiResponseParseError
+from llm_api.config import Backend, reload_settings
+from llm_api.main import app
+from llm_api.routing import AdaptiveRouter, CallOutcome, TargetStats
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.fixture()
+def no_random_probes(monkeypatch):
+    monkeypatch.setenv("LLM_API_ROUTING_PROBE_RATE", "0")
+    reload_settings()
+
+
+def model_output(backend):
+    return {"entities": [{"uri": backend}], "connections": []}
+
+
+def test_target_stats_moving_averages():
+    stats = TargetStats()
+
+    stats.record(CallOutcome.SUCCESS, 2.0, target_latency=3.0, smoothing=0.5)
+    assert (stats.latency_seconds, stats.on_time_rate, stats.error_rate) == (2.0, 1.0, 0.0)
+
+    stats.record(CallOutcome.SUCCESS, 4.0, target_latency=3.0, smoothing=0.5)
+    assert (stats.latency_seconds, stats.on_time_rate) == (3.0, 0.5)
+
+    stats.record(CallOutcome.PARSE_FAILURE, 1.0, target_latency=3.0, smoothing=0.5)
+    assert stats.latency_seconds == 3.0
+    assert (stats.on_time_rate, stats.parse_failure_rate) == (0.25, 0.5)
+    assert stats.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_router_prefers_backend_meeting_target_latency(no_random_probes, test_async_client):
+    async with test_async_client:
+        router: AdaptiveRouter = app.state.adaptive_router
+        openai, bedrock, bedrock_instant = (
+            router.service.resolve(backend) for backend in Backend
+        )
+        router.record(openai, CallOutcome.SUCCESS, 30.0)
+        router.record(bedrock, CallOutcome.ERROR, 1.0)
+        assert router.rank()[0] == bedrock_instant
+
+        router.record(bedrock_instant, CallOutcome.SUCCESS, 5.0)
+        assert router.rank() == [bedrock_instant, openai, bedrock]
+
+
+@pytest.mark.asyncio
+async def test_router_ranks_unreliable_backend_below_slower_one(
+    no_random_probes, test_async_client
+):
+    async with test_async_client:
+        router: AdaptiveRouter = app.state.adaptive_router
+        openai, bedrock, bedrock_instant = (
+            router.service.resolve(backend) for backend in Backend
+        )
+        router.record(openai, CallOutcome.SUCCESS, 1.0)
+        router.record(openai, CallOutcome.PARSE_FAILURE, 1.0)
+        for seconds in (1.0, 30.0, 30.0):
+            router.record(bedrock, CallOutcome.SUCCESS, seconds)
+        router.record(bedrock_instant, CallOutcome.ERROR, 1.0)
+
+        assert router.rank() == [bedrock, openai, bedrock_instant]
+
+
+@pytest.mark.asyncio
+async def test_router_probes_stale_backends(no_random_probes, test_async_client):
+    async with test_async_client:
+        router: AdaptiveRouter = app.state.adaptive_router
+        openai, bedrock, bedrock_instant = (
+            router.service.resolve(backend) for backend in Backend
+        )
+        for target in (openai, bedrock, bedrock_instant):
+            router.record(target, CallOutcome.SUCCESS, 1.0)
+        router.stats[(bedrock.backend, bedrock.model)].checked_at -= 3600
+
+        assert router.rank()[0] == bedrock
+        assert router.probes == 1
+        assert router.rank()[0] == openai
+
+
+@pytest.mark.asyncio
+async def test_call_model_fails_over_and_records_errors(
+    no_random_probes, mocker, test_async_client
+):
+    mocker.patch.object(
+        OpenaiCaller, "call_model", side_effect=OpenaiResponseParseError("bad output")
+    )
+
+    async def call_model(prompt_template, user_search, alternative_model=None, usage=None):
+        if alternative_model is None:
+            raise BedrockModelCallError("upstream failed")
+        return model_output("bedrock_instant")
+
+    mocker.patch.object(BedrockCaller, "call_model", side_effect=call_model)
+    async with test_async_client as ac:
+        response = await ac.post("/call_model", json={"user_search": "Macbeth"})
+        stats = {backend: stats for (backend, _), stats in app.state.adaptive_router.stats.items()}
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Backend"] == "bedrock_instant"
+    assert response.json()["entities"] == [{"uri": "bedrock_instant"}]
+    assert stats[Backend.OPENAI].parse_failure_rate == 1.0
+    assert stats[Backend.BEDROCK].error_rate == 1.0
+    assert stats[Backend.BEDROCK_INSTANT].on_time_rate == 1.0
+
+
+@pytest.mark.asyncio
+async def test_call_model_fails_if_every_backend_fails(mocker, test_async_client):
+    mocker.patch.object(
+        OpenaiCaller, "call_model", side_effect=OpenaiResponseParseError("bad output")
+    )
+    mocker.patch.object(
+        BedrockCaller, "call_model", side_effect=BedrockModelCallError("upstream failed")
+    )
+    async with test_async_client as ac:
+        response = await ac.post("/call_model", json={"user_search": "Macbeth"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
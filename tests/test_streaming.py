@@ -0,0 +1,98 @@
+"""Streaming API tests."""
+import json
+
+import pytest
+from langchain.schema.messages import AIMessageChunk
+
+from llm_api.backends.bedrock import BedrockCaller
+
+pytest_plugins = ("pytest_asyncio",)
+
+MODEL_OUTPUT = {
+    "entities": [
+        {
+            "uri": "Macbeth",
+            "description": "Play by William Shakespeare",
+            "wikipedia_url": "https://en.wikipedia.org/wiki/Macbeth",
+        }
+    ],
+    "connections": [],
+}
+
+
+def parse_events(body: str) -> list[tuple[str, object]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append((event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))))
+    return events
+
+
+def mock_astream(mocker, chunks):
+    async def astream(*args, **kwargs):
+        for chunk in chunks:
+            yield chunk
+
+    return mocker.patch(
+        "langchain.schema.runnable.base.RunnableSequence.astream", side_effect=astream
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_openai(mocker, test_async_client):
+    text = json.dumps(MODEL_OUTPUT)
+    mock_astream(mocker, [AIMessageChunk(content=text[:20]), AIMessageChunk(content=text[20:])])
+    async with test_async_client as ac:
+        payload = {"user_search": "imagery in macbeth"}
+        response = await ac.post("/stream/call_model_openai", json=payload)
+
+    events = parse_events(response.text)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["X-Cache"] == "miss"
+    assert events[:2] == [("chunk", text[:20]), ("chunk", text[20:])]
+    assert events[-1] == ("result", {**MODEL_OUTPUT, "user_search": payload["user_search"]})
+
+
+@pytest.mark.asyncio
+async def test_stream_bedrock_then_cached(mocker, test_async_client):
+    text = "Here is the JSON ```json\n" + json.dumps(MODEL_OUTPUT) + "\n```"
+    mocked_astream = mock_astream(mocker, [text[:30], text[30:]])
+    async with test_async_client as ac:
+        payload = {"user_search": "imagery in macbeth"}
+        streamed = await ac.post("/stream/call_model_bedrock", json=payload)
+        cached = await ac.post("/stream/call_model_bedrock", json=payload)
+        response = await ac.post("/call_model_bedrock", json=payload)
+
+    assert parse_events(streamed.text)[-1][1]["entities"] == MODEL_OUTPUT["entities"]
+    assert cached.headers["X-Cache"] == "hit"
+    assert parse_events(cached.text) == [
+        ("result", {**MODEL_OUTPUT, "user_search": payload["user_search"]})
+    ]
+    assert response.headers["X-Cache"] == "hit"
+    mocked_astream.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_error_event(mocker, test_async_client):
+    mock_astream(mocker, ["no json here"])
+    async with test_async_client as ac:
+        response = await ac.post(
+            "/stream/call_model_bedrock_instant", json={"user_search": "imagery in macbeth"}
+        )
+
+    event, data = parse_events(response.text)[-1]
+    assert event == "error"
+    assert "Error decoding model output." in data["detail"]
+
+
+@pytest.mark.asyncio
+async def test_stream_emits_entities_progressively(mocker, test_async_client):
+    text = "```json\n" + json.dumps(MODEL_OUTPUT) + "\n```"
+    split = text.index("}") + 1
+    mock_astream(mocker, [text[:split], text[split:]])
+    async with test_async_client as ac:
+        response = await ac.post("/stream/call_model_bedrock", json={"user_search": "macbeth"})
+
+    events = parse_events(response.text)
+    assert [event for event, _ in events] == ["chunk", "entity", "chunk", "result"]
+    assert events[1][1] == MODEL_OUTPUT["entities"][0]
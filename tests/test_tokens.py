@@ -0,0 +1,116 @@
+"""Token accounting tests."""
+import pytest
+from fastapi import status
+from langchain.schema.messages import AIMessage
+from langchain_core.messages import HumanMessage
+
+from llm_api.backends.bedrock import BedrockCaller
+from llm_api.config import Backend, reload_settings
+from llm_api.prompts import BEDROCK_PROMPT
+from llm_api.tokens import (
+    InputTooLongError,
+    TokenUsage,
+    check_input_length,
+    count_message_tokens,
+    count_tokens,
+)
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def test_count_tokens_estimates_without_tokenizer():
+    assert count_tokens("", Backend.BEDROCK) == 0
+    assert count_tokens("Macbeth", Backend.BEDROCK) == 2
+    assert count_tokens("Macbeth and Banquo", Backend.BEDROCK_INSTANT) == 6
+
+
+def test_count_message_tokens_includes_message_overhead():
+    messages = [*BEDROCK_PROMPT.system_prefix, HumanMessage(content="Macbeth")]
+
+    tokens = count_message_tokens(messages, Backend.BEDROCK)
+
+    content_tokens = sum(count_tokens(str(m.content), Backend.BEDROCK) for m in messages)
+    assert tokens > content_tokens
+
+
+def test_check_input_length_uses_largest_count():
+    user_search = "a" * 35
+
+    assert check_input_length(user_search, max_tokens=10) == 10
+    with pytest.raises(InputTooLongError) as input_error:
+        check_input_length(user_search + "a", max_tokens=10)
+
+    assert input_error.value.tokens == 11
+    assert isinstance(input_error.value, ValueError)
+
+
+def test_check_input_length_rejects_long_search_without_tokenizing(mocker):
+    encoding = mocker.patch("llm_api.tokens._openai_encoding")
+
+    with pytest.raises(InputTooLongError):
+        check_input_length("Macbeth " * 1000, max_tokens=10)
+
+    encoding.encode.assert_not_called()
+
+
+def test_token_usage_accumulates():
+    usage = TokenUsage()
+
+    usage.add(100, 20)
+    usage.add(150, 30)
+
+    assert usage == TokenUsage(prompt_tokens=250, completion_tokens=50)
+
+
+@pytest.mark.asyncio
+async def test_call_model_limits_output_and_counts_reask(mocker, mock_settings):
+    caller = BedrockCaller(mock_settings.model_copy(update={"max_output_tokens": 300}))
+    mocker.patch(
+        "langchain.schema.runnable.base.RunnableSequence.ainvoke",
+        side_effect=["Not JSON.", '{"entities": [], "connections": []}'],
+    )
+    usage = TokenUsage()
+
+    await caller.call_model(caller.generate_prompt(), "Who is Shakespeare?", usage=usage)
+
+    assert caller.client.max_tokens == 300
+    first_prompt_tokens = count_message_tokens(
+        BEDROCK_PROMPT.template.format_messages(text="Who is Shakespeare?"), Backend.BEDROCK
+    )
+    assert usage.prompt_tokens > 2 * first_prompt_tokens
+    assert usage.completion_tokens == count_tokens("Not JSON.", Backend.BEDROCK) + count_tokens(
+        '{"entities": [], "connections": []}', Backend.BEDROCK
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_reports_token_usage(mocker, test_async_client):
+    mocker.patch(
+        "langchain.schema.runnable.base.RunnableSequence.ainvoke",
+        return_value=AIMessage(
+            content='{"entities": [], "connections": []}',
+            usage_metadata={"input_tokens": 180, "output_tokens": 12, "total_tokens": 192},
+        ),
+    )
+    async with test_async_client as ac:
+        response = await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+        cached_response = await ac.post("/call_model_openai", json={"user_search": "Macbeth"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Prompt-Tokens"] == "180"
+    assert response.headers["X-Completion-Tokens"] == "12"
+    assert cached_response.headers["X-Prompt-Tokens"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_long_search_rejected_before_model_call(mocker, monkeypatch, test_async_client):
+    monkeypatch.setenv("LLM_API_MAX_INPUT_TOKENS", "8")
+    reload_settings()
+    mocked_call = mocker.patch("langchain.schema.runnable.base.RunnableSequence.ainvoke")
+
+    async with test_async_client as ac:
+        response = await ac.post("/call_model_bedrock", json={"user_search": "Macbeth " * 10})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert "limit of 8" in response.text
+    mocked_call.assert_not_called()
@@ -0,0 +1,84 @@
+"""Tracing tests."""
+import json
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from llm_api.backends.openai import OpenaiCaller
+from llm_api.config import TracingExporter
+from llm_api.tracing import build_tracer_provider
+
+pytest_plugins = ("pytest_asyncio",)
+
+MODEL_OUTPUT = {"entities": [{"uri": "Macbeth"}], "connections": []}
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture(scope="module")
+def span_exporter():
+    exporter = InMemorySpanExporter()
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider()
+        trace.set_tracer_provider(provider)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return exporter
+
+
+@pytest.mark.asyncio
+async def test_request_spans_continue_incoming_trace(span_exporter, mocker, test_async_client):
+    mocker.patch.object(
+        OpenaiCaller,
+        "get_client",
+        return_value=FakeListChatModel(responses=[json.dumps(MODEL_OUTPUT)]),
+    )
+    span_exporter.clear()
+    async with test_async_client as ac:
+        response = await ac.post(
+            "/call_model_openai",
+            json={"user_search": "Macbeth"},
+            headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"},
+        )
+
+    assert response.headers["X-Trace-Id"] == TRACE_ID
+    spans = {span.name: span for span in span_exporter.get_finished_spans()}
+    assert {
+        "POST /call_model_openai",
+        "resolve_backend",
+        "cache_lookup",
+        "openai.call_model",
+        "chain.ainvoke",
+        "prompt",
+        "upstream",
+        "parse",
+    } <= spans.keys()
+    assert all(span.context.trace_id == int(TRACE_ID, 16) for span in spans.values())
+    assert spans["prompt"].parent.span_id == spans["chain.ainvoke"].context.span_id
+    assert spans["openai.call_model"].attributes["llm.model"] == "gpt-4-1106-preview"
+    assert spans["prompt"].attributes["llm.prompt.chars"] > len("Macbeth")
+    assert spans["upstream"].attributes["llm.response.chars"] == len(json.dumps(MODEL_OUTPUT))
+    assert spans["POST /call_model_openai"].attributes["llm.cache.tier"] == "none"
+
+
+def test_file_exporter_writes_json_lines(mock_settings, tmp_path):
+    settings = mock_settings.model_copy(
+        update={
+            "tracing_exporter": TracingExporter.FILE,
+            "tracing_file_path": tmp_path / "traces.jsonl",
+        }
+    )
+    provider = build_tracer_provider(settings)
+    with provider.get_tracer("test").start_as_current_span("request"):
+        pass
+    provider.force_flush()
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["request"]
+
+
+def test_tracing_disabled_by_default(mock_settings):
+    assert build_tracer_provider(mock_settings) is None
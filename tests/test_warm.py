@@ -0,0 +1,106 @@
+"""Cache pre-warming tests."""
+import asyncio
+
+import pytest
+
+from llm_api.backends.openai import OpenaiCaller, OpenaiModelCallError
+from llm_api.backends.registry import CallerRegistry
+from llm_api.cache.memory import ResponseCache
+from llm_api.cache.snapshot import SnapshotEntry, read_snapshot, write_snapshot
+from llm_api.config import Backend, get_settings, reload_settings
+from llm_api.resilience.ratelimit import RateLimitExceededError
+from llm_api.service import ModelCallResult, ModelService
+from llm_api.warm import RankedQuery, rank_queries, run, warm_search, WarmReport
+
+pytest_plugins = ("pytest_asyncio",)
+
+RESPONSE = {"entities": [{"uri": "Macbeth"}], "connections": []}
+
+
+def test_rank_queries_reads_text_and_json_lines():
+    lines = [
+        "Macbeth\n",
+        '{"user_search": "macbeth ", "status": 200}\n',
+        "\n",
+        '{"path": "/ping"}\n',
+        "Hamlet\n",
+        "{not json\n",
+        "MACBETH\n",
+    ]
+
+    assert rank_queries(lines) == [RankedQuery("Macbeth", 3), RankedQuery("Hamlet", 1)]
+    assert rank_queries(['{"q": "Othello"}'], field_name="q") == [RankedQuery("Othello", 1)]
+
+
+@pytest.mark.asyncio
+async def test_run_fetches_each_search_once(mocker, monkeypatch, tmp_path):
+    monkeypatch.setenv("LLM_API_RATE_LIMIT_PATH", str(tmp_path / "ratelimit.sqlite3"))
+    monkeypatch.setenv("LLM_API_MAX_INPUT_TOKENS", "8")
+    reload_settings()
+    mocked_call = mocker.patch.object(
+        OpenaiCaller,
+        "call_model",
+        side_effect=[RESPONSE, OpenaiModelCallError("Error calling model.")],
+    )
+    queries = [RankedQuery("Macbeth", 3), RankedQuery("Hamlet", 2), RankedQuery("Lear " * 10, 1)]
+
+    report = await run(queries, [Backend.OPENAI], concurrency=1)
+
+    assert (report.fetched, report.cached, report.skipped) == (1, 0, 1)
+    assert report.failed == {"OpenaiModelCallError": 1}
+    (entry,) = report.entries
+    assert (entry.user_search, entry.response) == ("Macbeth", RESPONSE)
+    assert mocked_call.call_count == 2
+    assert "1 fetched" in report.summary()
+
+
+@pytest.mark.asyncio
+async def test_warm_search_waits_out_rate_limit(mocker):
+    service = ModelService(CallerRegistry(get_settings()), ResponseCache(60, 1024 * 1024))
+    target = service.resolve(Backend.OPENAI)
+    mocker.patch.object(
+        ModelService,
+        "call",
+        side_effect=[
+            RateLimitExceededError("openai backend", 0.0),
+            ModelCallResult(RESPONSE, target, cache_tier="shared"),
+        ],
+    )
+    report = WarmReport()
+
+    entry = await warm_search(service, asyncio.Semaphore(1), Backend.OPENAI, "Macbeth", report)
+
+    assert entry == SnapshotEntry(target.cache_key("Macbeth"), target.scope, "Macbeth", RESPONSE)
+    assert (report.fetched, report.cached, report.failed.total()) == (0, 1, 0)
+
+
+def test_snapshot_round_trip_skips_bad_lines(tmp_path):
+    path = tmp_path / "snapshot.jsonl"
+    entries = [SnapshotEntry("key-macbeth", "scope", "Macbeth", RESPONSE)]
+
+    assert write_snapshot(path, entries) == 1
+    with path.open("a") as snapshot_file:
+        snapshot_file.write('{"key": "truncated"}\n{"key":')
+
+    assert read_snapshot(path) == entries
+    assert read_snapshot(tmp_path / "missing.jsonl") == []
+
+
+@pytest.mark.asyncio
+async def test_worker_loads_snapshot_at_startup(mocker, monkeypatch, tmp_path, test_async_client):
+    service = ModelService(CallerRegistry(get_settings()), ResponseCache(60, 1024 * 1024))
+    target = service.resolve(Backend.OPENAI)
+    path = tmp_path / "snapshot.jsonl"
+    write_snapshot(
+        path, [SnapshotEntry(target.cache_key("Macbeth"), target.scope, "Macbeth", RESPONSE)]
+    )
+    monkeypatch.setenv("LLM_API_CACHE_SNAPSHOT_PATH", str(path))
+    reload_settings()
+    mocked_call = mocker.patch.object(OpenaiCaller, "call_model")
+
+    async with test_async_client as ac:
+        response = await ac.post("/call_model_openai", json={"user_search": "macbeth"})
+
+    assert response.headers["X-Cache"] == "hit"
+    assert response.json()["entities"] == RESPONSE["entities"]
+    mocked_call.assert_not_called()
@@ -0,0 +1,48 @@
+import logging
+import os
+
+import pytest
+from gunicorn.config import Config
+
+from llm_api.config import EventLoop, HttpProtocol, ServerProfile, ServerSettings
+from llm_api.workers import AsyncUvicornWorker, WorkerProfile, profile_defaults, resolve_profile
+
+
+@pytest.mark.parametrize(
+    ("profile", "expected"),
+    [
+        (ServerProfile.ASYNC, WorkerProfile(8, 1000, preload=True)),
+        (ServerProfile.LEAN, WorkerProfile(4, 2000, preload=True)),
+        (ServerProfile.LEGACY, WorkerProfile(17, 1000, preload=False)),
+    ],
+)
+def test_profile_defaults(profile, expected):
+    assert profile_defaults(profile, cpu_count=8) == expected
+
+
+def test_lean_profile_keeps_one_worker():
+    assert profile_defaults(ServerProfile.LEAN, cpu_count=1).workers == 1
+
+
+def test_resolve_profile_prefers_explicit_settings(monkeypatch):
+    monkeypatch.setenv("LLM_API_SERVER_PROFILE", "lean")
+    monkeypatch.setenv("LLM_API_SERVER_WORKERS", "3")
+    monkeypatch.setenv("LLM_API_SERVER_PRELOAD", "false")
+
+    profile = resolve_profile(ServerSettings(), cpu_count=8)
+
+    assert profile == WorkerProfile(3, 2000, preload=False)
+
+
+def test_worker_applies_loop_http_and_concurrency_limit(monkeypatch):
+    monkeypatch.setenv("LLM_API_SERVER_LOOP", EventLoop.ASYNCIO)
+    monkeypatch.setenv("LLM_API_SERVER_HTTP", HttpProtocol.H11)
+    cfg = Config()
+    cfg.set("worker_connections", 50)
+    log = type("Log", (), {"error_log": logging.getLogger(), "access_log": logging.getLogger()})
+
+    worker = AsyncUvicornWorker(0, os.getpid(), [], None, 30, cfg, log)
+
+    assert worker.config.loop == "asyncio"
+    assert worker.config.http == "h11"
+    assert worker.config.limit_concurrency == 50